@@ -1,17 +1,19 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from src.api.v1.backend import router as backend
+from src.api.v1.backend import RequestBodyLimitMiddleware, router as backend
+from src.utils.logging_config import setup_logging
 
-from src.data.db.base import init_db
+setup_logging("api")
 
 app = FastAPI()
 
+# Добавлен раньше CORS, поэтому выполняется внутри него: ответ 413 получает заголовки CORS
+app.add_middleware(RequestBodyLimitMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_methods=["*"]
 )
 
-app.include_router(backend)
-init_db()
\ No newline at end of file
+app.include_router(backend)
\ No newline at end of file
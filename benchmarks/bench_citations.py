@@ -0,0 +1,137 @@
+"""
+Бенчмарк записи цитат: create_citation на каждый span против bulk_create_citations пачками,
+и компактное хранилище citation_stores против строк citations: запись, загрузка, объем.
+
+Запуск: python -m benchmarks.bench_citations [--pages 100] [--batch 500]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+_DB_DIR = tempfile.mkdtemp(prefix="obligate_bench_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_DB_DIR, 'bench.db')}")
+
+import pymupdf
+
+from benchmarks.corpus import generate_contract, write_pdf
+from src.data.db.base import SessionLocal, engine, init_db
+from src.data.db.models import Citation
+from src.data.db.packed_citations import PackedCitations
+from src.repositories.contract_repo import ContractRepository
+
+
+def build_pdf(pages: int, seed: int = 0) -> str:
+    """Синтетический договор из benchmarks.corpus на pages страниц (шрифт с кириллицей)"""
+    return write_pdf(generate_contract(seed, pages), os.path.join(_DB_DIR, f"synthetic_{pages}.pdf"))
+
+
+def extract_spans(file_path: str, document_id: int) -> list:
+    """Извлекает spans так же, как PDF-ветка process_document"""
+    rows = []
+    doc = pymupdf.open(file_path)
+    paragraph_index = 0
+    for page_num in range(len(doc)):
+        for block in doc.load_page(page_num).get_text("dict")["blocks"]:  # type: ignore
+            if block["type"] == 0:
+                run_index = 0
+                for line in block["lines"]:
+                    for span in line["spans"]:
+                        span_text = span["text"].strip()
+                        if span_text:
+                            rows.append({
+                                "document_id": document_id,
+                                "text": span_text,
+                                "page": page_num + 1,
+                                "bbox": list(span["bbox"]),
+                                "paragraph_index": paragraph_index,
+                                "run_index": run_index,
+                            })
+                            run_index += 1
+                paragraph_index += 1
+    doc.close()
+    return rows
+
+
+def bench_per_row(rows: list) -> float:
+    db = SessionLocal()
+    repo = ContractRepository(db)
+    started = time.perf_counter()
+    for row in rows:
+        repo.create_citation(**row)
+    elapsed = time.perf_counter() - started
+    db.close()
+    return elapsed
+
+
+def bench_bulk(rows: list, batch_size: int) -> float:
+    db = SessionLocal()
+    repo = ContractRepository(db)
+    started = time.perf_counter()
+    for i in range(0, len(rows), batch_size):
+        repo.bulk_create_citations(rows[i:i + batch_size], commit=False)
+    db.commit()
+    elapsed = time.perf_counter() - started
+    db.close()
+    return elapsed
+
+
+def bench_packed(rows: list) -> float:
+    db = SessionLocal()
+    repo = ContractRepository(db)
+    started = time.perf_counter()
+    repo.save_citation_store(1, PackedCitations.from_citations(rows))
+    elapsed = time.perf_counter() - started
+    db.close()
+    return elapsed
+
+
+def bench_load(load) -> float:
+    """Время загрузки всех цитат документа с обходом текстов"""
+    db = SessionLocal()
+    repo = ContractRepository(db)
+    started = time.perf_counter()
+    load(repo)
+    elapsed = time.perf_counter() - started
+    db.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+
+    init_db()
+
+    rows = extract_spans(build_pdf(args.pages), document_id=1)
+    per_row = bench_per_row(rows)
+
+    db = SessionLocal()
+    db.query(Citation).delete()
+    db.commit()
+    db.close()
+
+    bulk = bench_bulk(rows, args.batch)
+    packed = bench_packed(rows)
+
+    load_rows = bench_load(lambda repo: [(c.id, c.text, c.bbox) for c in repo.get_citations_by_document(1)])
+    load_packed = bench_load(lambda repo: list(repo.get_citation_store(1).iter_texts()))
+    db = SessionLocal()
+    rows_size = sum(len(c.text.encode()) + len(json.dumps(c.bbox)) + 4 * 5 for c in db.query(Citation))
+    packed_size = ContractRepository(db).get_citation_store(1).nbytes
+    db.close()
+
+    print(f"Страниц: {args.pages}, цитат: {len(rows)}, БД: {engine.url}")
+    print(f"create_citation по одной:     {per_row:.3f} с")
+    print(f"bulk_create_citations({args.batch}): {bulk:.3f} с")
+    print(f"Ускорение: x{per_row / bulk:.1f}")
+    print(f"save_citation_store:          {packed:.3f} с")
+    print(f"Загрузка get_citations_by_document: {load_rows:.3f} с, get_citation_store: {load_packed:.3f} с")
+    print(f"Объем данных: строки citations ~{rows_size} байт, citation_stores {packed_size} байт")
+
+
+if __name__ == "__main__":
+    main()
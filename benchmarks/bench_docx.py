@@ -0,0 +1,126 @@
+"""
+Бенчмарк разбора DOCX: python-docx (дерево объектов всего документа) против потокового
+разбора word/document.xml (lxml.iterparse): время, пиковая память процесса, число цитат.
+Каждый бэкенд запускается в отдельном процессе, чтобы пиковая память одного не влияла на другой.
+
+Запуск: python -m benchmarks.bench_docx [--pages 1000] [--lines 30] [--table-every 5]
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+import zipfile
+from xml.sax.saxutils import escape
+
+from docx import Document
+
+from src.extractors import docx_extractor
+
+LINE = "Исполнитель обязуется оказать услуги по договору № {n} на сумму 1 000 000 руб. до 31.12.2024"
+_W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+
+def _paragraph(*runs: str, page_break: bool = False) -> str:
+    body = "".join(f'<w:r><w:t xml:space="preserve">{escape(text)}</w:t></w:r>' for text in runs)
+    if page_break:
+        body += '<w:r><w:br w:type="page"/></w:r>'
+    return f"<w:p>{body}</w:p>"
+
+
+def _cell(paragraphs: str, props: str = "") -> str:
+    return f"<w:tc><w:tcPr>{props}</w:tcPr>{paragraphs}</w:tc>"
+
+
+def _table(n: int) -> str:
+    """Таблица реквизитов: ячейка по двум колонкам (gridSpan) и ячейка по двум строкам (vMerge)"""
+    rows = [
+        _cell(_paragraph(f"Реквизиты сторон к договору № {n}"), '<w:gridSpan w:val="2"/>')
+        + _cell(_paragraph(f"Подписи № {n}"), '<w:vMerge w:val="restart"/>'),
+        _cell(_paragraph(f"Заказчик № {n}", f"ООО «Ромашка-{n}»") + _paragraph(f"ИНН 7701234567 КПП 770101001 № {n}"))
+        + _cell(_paragraph(f"Исполнитель № {n}", f"АО «Лютик-{n}»") + _paragraph(f"ИНН 7707654321 № {n}"))
+        + _cell(_paragraph(), "<w:vMerge/>"),
+    ]
+    grid = '<w:tblGrid><w:gridCol/><w:gridCol/><w:gridCol/></w:tblGrid>'
+    return "<w:tbl>" + grid + "".join(f"<w:tr>{row}</w:tr>" for row in rows) + "</w:tbl>"
+
+
+def build_docx(pages: int, lines: int, table_every: int, directory: str) -> str:
+    """
+    Синтетический DOCX: на странице lines параграфов по два run и разрыв страницы,
+    каждые table_every страниц — таблица с объединенными ячейками. document.xml пишется напрямую,
+    остальные части пакета берутся из шаблона python-docx
+    """
+    template = os.path.join(directory, "template.docx")
+    Document().save(template)
+    path = os.path.join(directory, f"synthetic_{pages}.docx")
+    with zipfile.ZipFile(template) as src, zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as dst:
+        for item in src.infolist():
+            if item.filename != "word/document.xml":
+                dst.writestr(item, src.read(item.filename))
+        with dst.open("word/document.xml", "w") as xml:
+            xml.write(f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                      f'<w:document xmlns:w="{_W_NS}"><w:body>'.encode())
+            for page in range(pages):
+                chunk = [_paragraph(f"{page * lines + i + 1}.", LINE.format(n=page * lines + i)) for i in range(lines)]
+                if table_every and page % table_every == 0:
+                    chunk.append(_table(page))
+                chunk.append(_paragraph(page_break=True))
+                xml.write("".join(chunk).encode())
+            xml.write(b"<w:sectPr/></w:body></w:document>")
+    return path
+
+
+def _measure(backend: str, file_path: str, queue) -> None:
+    # Выполняется в отдельном процессе: импорт бэкенда до замера, затем пик RSS относительно исходного
+    parse = docx_extractor.iter_docx_citations if backend == "stream" else docx_extractor.iter_python_docx_citations
+    if backend != "stream":
+        import docx  # noqa: F401
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    count = 0
+    seen = set()
+    duplicates = 0
+    for citation in parse(file_path):
+        # Тексты в синтетическом документе уникальны, повтор — дубль объединенной ячейки
+        count += 1
+        duplicates += citation["text"] in seen
+        seen.add(citation["text"])
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((elapsed, (peak - baseline) / 1024, count, duplicates))
+
+
+def run_backend(backend: str, file_path: str) -> tuple:
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=_measure, args=(backend, file_path, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--lines", type=int, default=30, help="параграфов на странице")
+    parser.add_argument("--table-every", type=int, default=5, help="таблица с объединенными ячейками каждые N страниц")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="obligate_bench_")
+    file_path = build_docx(args.pages, args.lines, args.table_every, directory)
+    print(f"DOCX: {args.pages} страниц, {os.path.getsize(file_path) / 2 ** 20:.1f} МБ")
+
+    results = {}
+    for backend in ("python-docx", "stream"):
+        elapsed, memory, count, duplicates = results[backend] = run_backend(backend, file_path)
+        print(f"{backend:12} {elapsed:6.2f} с, пик памяти +{memory:7.1f} МБ, цитат {count}, "
+              f"повторов текста: {duplicates}")
+    print(f"Ускорение: x{results['python-docx'][0] / results['stream'][0]:.1f}, "
+          f"память: x{results['python-docx'][1] / max(results['stream'][1], 0.1):.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Микробенчмарк извлечения полей: прежние find_* (каждая функция заново склеивает текст и сканирует его)
+против одного прохода find_party.extract_fields на синтетическом договоре.
+
+Запуск: python -m benchmarks.bench_find_party [--pages 200]
+"""
+import argparse
+import re
+import time
+
+from src.docs_checker.utils_checker import find_party
+
+PAGE_LINES = [
+    "ООО «Ромашка», именуемое в дальнейшем Исполнитель, в лице директора",
+    "и ИП Петров Петр Петрович, именуемый в дальнейшем Заказчик, заключили договор",
+    "от 15 мая 2023 года о нижеследующем. Срок действия до 31.12.2024",
+    "Стоимость услуг составляет 1 000 000 руб. включая НДС",
+    "ИНН 7701234567 КПП 770101001 р/с 40702810900000012345 БИК 044525225",
+] + ["Исполнитель обязуется оказать услуги надлежащего качества в установленный срок"] * 35
+
+
+def build_data(pages: int) -> list:
+    """Данные в формате check_file: [([строка], id цитаты), ...]"""
+    data = []
+    for _ in range(pages):
+        for line in PAGE_LINES:
+            for word in line.split(" "):
+                data.append(([word], len(data) + 1))
+    return data
+
+
+# Реализация до перехода на единый проход — для сравнения
+def _legacy_flatten(data):
+    text = ""
+    char_to_id = []
+    for token, tid in data:
+        token = token[0]
+        if text:
+            text += " "
+            char_to_id.append(None)
+        for ch in token:
+            text += ch
+            char_to_id.append(tid)
+    return text, char_to_id
+
+
+def _legacy_scan(data, pattern, flags=0):
+    text, char_to_id = _legacy_flatten(data)
+    return [{m.group(): sorted(set(i for i in char_to_id[m.start():m.end()] if i))}
+            for m in re.finditer(pattern, text, flags)]
+
+
+def legacy_all(data):
+    parties = _legacy_scan(data, f"(?:{find_party.PARTY_PATTERN})", re.IGNORECASE)
+    dates = _legacy_scan(data, find_party.DATE_PATTERN)
+    amounts = _legacy_scan(data, find_party.AMOUNT_PATTERN)
+    text, char_to_id = _legacy_flatten(data)
+    requisites = {key: [{m.group(): sorted(set(i for i in char_to_id[m.start():m.end()] if i))}
+                        for m in re.finditer(pat, text)]
+                  for key, pat in find_party.REQUISITE_PATTERNS.items()}
+    return parties, dates, amounts, requisites
+
+
+def current_all(data):
+    return (find_party.find_parties(data), find_party.find_dates(data),
+            find_party.find_amounts(data), find_party.find_requisites(data))
+
+
+def timed(func, data, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(data)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    data = build_data(args.pages)
+    legacy = timed(legacy_all, data, args.repeat)
+    wrappers = timed(current_all, data, args.repeat)
+    single = timed(find_party.extract_fields, data, args.repeat)
+
+    print(f"Страниц: {args.pages}, токенов: {len(data)}")
+    print(f"прежние find_* (4 склейки, 7 проходов): {legacy:.3f} с")
+    print(f"find_* на TextIndex:                   {wrappers:.3f} с")
+    print(f"extract_fields (1 склейка, 1 проход):  {single:.3f} с  (x{legacy / single:.1f})")
+
+
+if __name__ == "__main__":
+    main()
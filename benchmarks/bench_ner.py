@@ -0,0 +1,62 @@
+"""
+Пропускная способность NER на CPU (документов в минуту).
+Сравнивает прогон документов по одному и упаковку окон многих документов в общие батчи.
+
+Запуск: python -m benchmarks.bench_ner --model <путь к модели> [--documents 20] [--pages 10] [--threads 1]
+        [--onnx model.int8.onnx]  — --model тогда указывает на каталог экспорта onnx_export
+"""
+import argparse
+import time
+
+from benchmarks.bench_find_party import build_data
+from src.docs_checker.ner.inference import NER_BATCH_SIZE, NerModel
+from src.docs_checker.utils_checker.windows import iter_windows
+
+
+def build_documents(documents: int, pages: int) -> dict:
+    """Окна синтетических документов в формате check_file"""
+    result = {}
+    for document_id in range(1, documents + 1):
+        citations = ((cid, token[0]) for token, cid in build_data(pages))
+        result[document_id] = list(iter_windows(citations))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", required=True)
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--batch", type=int, default=NER_BATCH_SIZE)
+    parser.add_argument("--onnx", default="")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.onnx:
+        from src.docs_checker.ner.onnx_backend import OnnxNerModel
+        model = OnnxNerModel(args.model, onnx_file=args.onnx, threads=args.threads, batch_size=args.batch)
+    else:
+        model = NerModel(args.model, threads=args.threads, batch_size=args.batch)
+    load_time = time.perf_counter() - started
+
+    documents = build_documents(args.documents, args.pages)
+    windows = sum(len(w) for w in documents.values())
+
+    started = time.perf_counter()
+    for document_id, document_windows in documents.items():
+        model.predict_documents({document_id: document_windows})
+    one_by_one = time.perf_counter() - started
+
+    started = time.perf_counter()
+    model.predict_documents(documents)
+    packed = time.perf_counter() - started
+
+    print(f"Загрузка модели: {load_time:.2f} с, потоков: {args.threads}, батч: {args.batch}")
+    print(f"Документов: {args.documents} по {args.pages} стр., окон: {windows}")
+    print(f"по одному документу: {args.documents / one_by_one * 60:.1f} док/мин")
+    print(f"общие батчи:         {args.documents / packed * 60:.1f} док/мин")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Бенчмарк Redis: клиент на каждый вызов (как прежний get_redis_session) против общего пула процесса
+при конкурентных корутинах, и отдельные GET/SET против pipeline.
+Нужен запущенный Redis (HOST_REDIS, PORT_REDIS, при необходимости USER_REDIS / PASS_REDIS).
+
+Запуск: python -m benchmarks.bench_redis [--concurrency 50] [--ops 20] [--keys 1000]
+"""
+import argparse
+import asyncio
+import time
+
+from redis.asyncio import Redis
+
+from src.utils import redis_client
+
+PREFIX = "obligate:bench:"
+
+
+async def per_call_client(i: int, ops: int) -> None:
+    """Новый клиент со своим пулом на каждую операцию и закрытие после нее"""
+    for n in range(ops):
+        kwargs = redis_client._connection_kwargs()
+        kwargs.pop("timeout")  # параметр блокирующего пула
+        r = Redis(**kwargs)
+        try:
+            await r.set(f"{PREFIX}{i}:{n}", n, ex=60)
+            await r.get(f"{PREFIX}{i}:{n}")
+        finally:
+            await r.aclose()
+
+
+async def pooled_client(i: int, ops: int) -> None:
+    """Общий асинхронный клиент процесса"""
+    r = redis_client.get_async_redis()
+    for n in range(ops):
+        await r.set(f"{PREFIX}{i}:{n}", n, ex=60)
+        await r.get(f"{PREFIX}{i}:{n}")
+
+
+async def run_concurrent(worker, concurrency: int, ops: int) -> float:
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i, ops) for i in range(concurrency)))
+    return time.perf_counter() - started
+
+
+def bench_batch(keys: int) -> tuple:
+    r = redis_client.get_redis()
+    items = {f"{PREFIX}batch:{n}": n for n in range(keys)}
+
+    started = time.perf_counter()
+    for key, value in items.items():
+        r.set(key, value, ex=60)
+    for key in items:
+        r.get(key)
+    single = time.perf_counter() - started
+
+    started = time.perf_counter()
+    redis_client.pipeline_set(items, ex=60)
+    redis_client.pipeline_get(items)
+    pipelined = time.perf_counter() - started
+    return single, pipelined
+
+
+async def main_async(args) -> None:
+    total = args.concurrency * args.ops
+    per_call = await run_concurrent(per_call_client, args.concurrency, args.ops)
+    await pooled_client(0, 1)  # создание пула не входит в замер
+    pooled = await run_concurrent(pooled_client, args.concurrency, args.ops)
+    await redis_client.aclose_redis()
+
+    print(f"Корутин: {args.concurrency}, операций SET+GET: {total}")
+    print(f"Клиент на вызов: {per_call:.3f} с ({total / per_call:.0f} оп/с)")
+    print(f"Общий пул:       {pooled:.3f} с ({total / pooled:.0f} оп/с)")
+    print(f"Ускорение: x{per_call / pooled:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--ops", type=int, default=20)
+    parser.add_argument("--keys", type=int, default=1000)
+    args = parser.parse_args()
+
+    asyncio.run(main_async(args))
+
+    single, pipelined = bench_batch(args.keys)
+    print(f"Ключей: {args.keys}; отдельные SET/GET: {single:.3f} с, pipeline_set/pipeline_get: {pipelined:.3f} с")
+    print(f"Ускорение: x{single / pipelined:.1f}")
+
+    r = redis_client.get_redis()
+    for key in r.scan_iter(f"{PREFIX}*"):
+        r.delete(key)
+    redis_client.close_redis()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Бенчмарк отправки напоминаний на локальном фейковом Bot API с лимитами как у Telegram
+(1 сообщение в секунду в чат, общий лимит в секунду; превышение — 429 с retry_after).
+Сравнивает прежнюю отправку по одному сообщению на напоминание и чат с ReminderSender.
+
+Запуск: python -m benchmarks.bench_telegram [--reminders 60] [--chats 5] [--chat-rate 1] [--text-size 400]
+"""
+import argparse
+import asyncio
+import os
+import time
+from collections import defaultdict
+
+from aiohttp import web
+
+os.environ.setdefault("BOT_TOKEN", "123456:fake-token")
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+from src.utils.bot_for_remind import ReminderSender
+
+PORT = 8181
+
+
+class FakeBotApi:
+    """sendMessage с ограничениями частоты: глобальным за секунду и не чаще раза в секунду на чат"""
+
+    def __init__(self, global_rate: int, chat_interval: float = 1.0):
+        self.global_rate = global_rate
+        self.chat_interval = chat_interval
+        self.last_by_chat = {}
+        self.window = defaultdict(int)
+        self.accepted = defaultdict(list)
+        self.rejected = 0
+        self.message_id = 0
+
+    async def send_message(self, request: web.Request) -> web.Response:
+        data = await request.post() if request.content_type != "application/json" else await request.json()
+        chat_id = int(data["chat_id"])
+        now = time.monotonic()
+        second = int(now)
+        last = self.last_by_chat.get(chat_id)
+        if (last is not None and now - last < self.chat_interval) or self.window[second] >= self.global_rate:
+            self.rejected += 1
+            return web.json_response({"ok": False, "error_code": 429, "description": "Too Many Requests: retry after 1",
+                                      "parameters": {"retry_after": 1}})
+        self.last_by_chat[chat_id] = now
+        self.window[second] += 1
+        self.message_id += 1
+        self.accepted[chat_id].append(data["text"])
+        return web.json_response({"ok": True, "result": {
+            "message_id": self.message_id, "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"}, "text": data["text"],
+        }})
+
+
+async def run_case(name: str, send, api: FakeBotApi) -> None:
+    started = time.perf_counter()
+    delivered, failed = await send()
+    elapsed = time.perf_counter() - started
+    messages = sum(len(texts) for texts in api.accepted.values())
+    print(f"{name}: {elapsed:.2f} с, доставлено напоминаний {delivered}, не доставлено {failed}, "
+          f"сообщений {messages}, ответов 429: {api.rejected}")
+
+
+async def main_async(args) -> None:
+    api = FakeBotApi(global_rate=args.global_rate)
+    app = web.Application()
+    app.router.add_post("/bot{token}/sendMessage", api.send_message)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", PORT).start()
+
+    bot = Bot(os.environ["BOT_TOKEN"],
+              session=AiohttpSession(api=TelegramAPIServer.from_base(f"http://127.0.0.1:{PORT}")))
+    chats = list(range(1, args.chats + 1))
+    filler = " Условия оплаты по договору." * (args.text_size // 28)
+    reminders = [(i, f"Напоминание {i}: оплата по договору № {i}.{filler}") for i in range(args.reminders)]
+
+    async def sequential():
+        # Прежний вариант: каждое напоминание отдельным сообщением в каждый чат по очереди, без повторов
+        delivered = failed = 0
+        for _, text in reminders:
+            try:
+                for chat_id in chats:
+                    await bot.send_message(chat_id=chat_id, text=text)
+                delivered += 1
+            except Exception:
+                failed += 1
+        return delivered, failed
+
+    async def concurrent():
+        report = await ReminderSender(bot, global_rate=args.global_rate, chat_rate=args.chat_rate).send(reminders, chats)
+        return len(report.delivered), len(report.failed)
+
+    print(f"Напоминаний: {args.reminders}, чатов: {args.chats}, глобальный лимит: {args.global_rate}/с")
+    await run_case("По одному", sequential, api)
+    await asyncio.sleep(1.5)
+    api.__init__(args.global_rate)
+    await run_case("ReminderSender", concurrent, api)
+
+    await bot.session.close()
+    await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reminders", type=int, default=60)
+    parser.add_argument("--chats", type=int, default=5)
+    parser.add_argument("--global-rate", type=int, default=30)
+    parser.add_argument("--chat-rate", type=float, default=1, help="лимит ReminderSender на чат; >1 — проверка RetryAfter")
+    parser.add_argument("--text-size", type=int, default=400, help="длина текста напоминания, символов")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Генератор синтетического корпуса договоров на русском языке для бенчмарков: PDF и DOCX заданного размера
+со сторонами (ООО/АО/ИП), датами, суммами и реквизитами ИНН/КПП/ОГРН с верными контрольными цифрами —
+в стиле примеров data/train.json. Один и тот же seed дает один и тот же корпус.
+
+Запуск: python -m benchmarks.corpus --out <каталог> [--documents 10] [--pages 20] [--seed 0] [--formats pdf docx]
+"""
+import argparse
+import os
+import random
+from datetime import date, timedelta
+from typing import List, NamedTuple, Optional, Sequence
+
+import pymupdf
+from docx import Document
+from docx.enum.text import WD_BREAK
+
+LINES_PER_PAGE = 40
+# Встроенный в PyMuPDF шрифт с кириллицей и «елочками» (helv кириллицу не содержит)
+PDF_FONT = "japan"
+
+MONTHS = ["января", "февраля", "марта", "апреля", "мая", "июня", "июля", "августа",
+          "сентября", "октября", "ноября", "декабря"]
+ORG_NAMES = ["Ромашка", "Лютик", "Василек", "СтройИнвест", "ТехноСервис", "Северный ветер", "Гранит",
+             "Меридиан", "Вектор", "Альфа-Логистик", "Уральские недра", "Балтийская верфь", "Инфосистемы"]
+PERSONS = [("Петров", "Петр", "Петрович"), ("Иванова", "Мария", "Сергеевна"), ("Сидоров", "Алексей", "Викторович"),
+           ("Кузнецова", "Анна", "Игоревна"), ("Смирнов", "Дмитрий", "Олегович"), ("Орлова", "Елена", "Павловна")]
+CITIES = ["г. Москва", "г. Санкт-Петербург", "г. Екатеринбург", "г. Казань", "г. Новосибирск"]
+SUBJECTS = ["оказанию услуг по техническому обслуживанию оборудования", "поставке строительных материалов",
+            "выполнению работ по ремонту помещений", "оказанию консультационных услуг", "перевозке грузов"]
+CLAUSES = [
+    "{contractor_role} обязуется выполнить обязательства надлежащего качества в установленный договором срок.",
+    "{customer_role} обязуется принять результат и оплатить его в течение {days} банковских дней.",
+    "Оплата производится путем перечисления денежных средств на расчетный счет {contractor_role}а.",
+    "Сторона, нарушившая обязательство, уплачивает неустойку в размере {percent}% от суммы за каждый день просрочки.",
+    "Споры разрешаются путем переговоров, а при недостижении согласия — в арбитражном суде.",
+    "Стороны освобождаются от ответственности при наступлении обстоятельств непреодолимой силы.",
+    "Акт сдачи-приемки подписывается сторонами в течение {days} рабочих дней с даты уведомления.",
+    "{customer_role} вправе проверять ход и качество выполнения обязательств, не вмешиваясь в деятельность.",
+    "Изменения и дополнения к договору действительны, если совершены в письменной форме.",
+    "Уведомления направляются по адресам, указанным в разделе реквизитов сторон.",
+    "Промежуточный платеж в размере {amount} подлежит перечислению до {due}.",
+    "{contractor_role} предоставляет отчет о выполненных работах не позднее {due}.",
+]
+
+
+class Party(NamedTuple):
+    kind: str              # ООО | АО | ИП
+    name: str              # Как в тексте договора: ООО «Ромашка», ИП Петров Петр Петрович
+    inn: str
+    kpp: Optional[str]     # У ИП КПП нет
+    ogrn: str              # ОГРН (13 цифр) или ОГРНИП (15 цифр)
+
+
+class Contract(NamedTuple):
+    number: str
+    signed: date
+    start: date
+    end: date
+    amount: int            # Рублей
+    customer: Party
+    contractor: Party
+    pages: List[List[str]]  # Строки текста по страницам
+
+
+class CorpusDocument(NamedTuple):
+    path: str
+    format: str            # pdf | docx
+    contract: Contract
+
+
+def _digits(rng: random.Random, count: int) -> List[int]:
+    return [rng.randint(0, 9) for _ in range(count)]
+
+
+def _control(digits: List[int], weights: Sequence[int]) -> int:
+    return sum(d * w for d, w in zip(digits, weights)) % 11 % 10
+
+
+def org_inn(rng: random.Random) -> str:
+    """ИНН юрлица: 10 цифр, последняя — контрольная"""
+    digits = [rng.randint(1, 9)] + _digits(rng, 8)
+    digits.append(_control(digits, (2, 4, 10, 3, 5, 9, 4, 6, 8)))
+    return "".join(map(str, digits))
+
+
+def person_inn(rng: random.Random) -> str:
+    """ИНН физлица (ИП): 12 цифр, две контрольные"""
+    digits = [rng.randint(1, 9)] + _digits(rng, 9)
+    digits.append(_control(digits, (7, 2, 4, 10, 3, 5, 9, 4, 6, 8)))
+    digits.append(_control(digits, (3, 7, 2, 4, 10, 3, 5, 9, 4, 6, 8)))
+    return "".join(map(str, digits))
+
+
+def ogrn(rng: random.Random, individual: bool = False) -> str:
+    """ОГРН (13 цифр, остаток от деления на 11) или ОГРНИП (15 цифр, остаток от деления на 13)"""
+    body = str(3 if individual else rng.choice((1, 5))) + "".join(map(str, _digits(rng, 13 if individual else 11)))
+    return body + str(int(body) % (13 if individual else 11) % 10)
+
+
+def make_party(rng: random.Random) -> Party:
+    kind = rng.choice(("ООО", "ООО", "АО", "ИП"))
+    if kind == "ИП":
+        last, first, middle = rng.choice(PERSONS)
+        return Party(kind, f"ИП {last} {first} {middle}", person_inn(rng), None, ogrn(rng, individual=True))
+    inn = org_inn(rng)
+    return Party(kind, f"{kind} «{rng.choice(ORG_NAMES)}»", inn, inn[:4] + "01001", ogrn(rng))
+
+
+def format_amount(amount: int) -> str:
+    """1250000 -> '1 250 000 руб.'"""
+    return f"{amount:,}".replace(",", " ") + " руб."
+
+
+def format_long_date(value: date) -> str:
+    return f"{value.day} {MONTHS[value.month - 1]} {value.year} года"
+
+
+def _requisites(role: str, party: Party) -> List[str]:
+    lines = [f"{role}: {party.name}", f"ИНН {party.inn}" + (f" КПП {party.kpp}" if party.kpp else "")]
+    lines.append(f"{'ОГРНИП' if party.kind == 'ИП' else 'ОГРН'} {party.ogrn}")
+    return lines
+
+
+def generate_contract(seed: int, pages: int, lines_per_page: int = LINES_PER_PAGE) -> Contract:
+    """Договор на pages страниц: шапка со сторонами, предмет, цена и срок, пункты условий, реквизиты"""
+    rng = random.Random(seed)
+    customer, contractor = make_party(rng), make_party(rng)
+    signed = date(2022, 1, 1) + timedelta(days=rng.randint(0, 1000))
+    start = signed + timedelta(days=rng.randint(0, 30))
+    end = start + timedelta(days=rng.choice((90, 180, 365, 730)))
+    amount = rng.randint(10, 5000) * 10000
+    number = f"{rng.randint(1, 999)}/{signed.year % 100}"
+
+    header = [
+        f"ДОГОВОР № {number}",
+        f"{rng.choice(CITIES)}    {format_long_date(signed)}",
+        f"{customer.name}, именуемое в дальнейшем Заказчик, с одной стороны,",
+        f"и {contractor.name}, именуемое в дальнейшем Исполнитель, с другой стороны,",
+        "заключили настоящий договор о нижеследующем.",
+        f"1. Предмет договора: Исполнитель обязуется по заданию Заказчика оказать услуги по {rng.choice(SUBJECTS)}.",
+        f"2. Стоимость услуг составляет {format_amount(amount)}, в том числе НДС 20%.",
+        f"3. Срок действия договора с {start:%d.%m.%Y} до {end:%d.%m.%Y}.",
+    ]
+    footer = ["Реквизиты и подписи сторон"] + _requisites("Заказчик", customer) + _requisites("Исполнитель", contractor)
+
+    body_lines = max(pages * lines_per_page - len(header) - len(footer), 0)
+    lines = list(header)
+    for n in range(body_lines):
+        due = start + timedelta(days=rng.randint(1, max((end - start).days, 1)))
+        clause = rng.choice(CLAUSES).format(
+            contractor_role="Исполнитель", customer_role="Заказчик", days=rng.choice((5, 10, 15, 30)),
+            percent=rng.choice(("0,1", "0,5", "1")), amount=format_amount(rng.randint(1, 100) * 1000),
+            due=due.strftime("%d.%m.%Y"),
+        )
+        lines.append(f"{4 + n // 10}.{n % 10 + 1}. {clause}")
+    lines.extend(footer)
+    page_lines = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)]
+    return Contract(number, signed, start, end, amount, customer, contractor, page_lines)
+
+
+def write_pdf(contract: Contract, path: str) -> str:
+    doc = pymupdf.open()
+    for lines in contract.pages:
+        page = doc.new_page()
+        page.insert_text((36, 48), "\n".join(lines), fontname=PDF_FONT, fontsize=8)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def write_docx(contract: Contract, path: str) -> str:
+    """
+    DOCX: номер пункта и текст — отдельные runs, разрыв после каждой страницы;
+    реквизиты сторон — таблица с объединенной по двум колонкам шапкой
+    """
+    doc = Document()
+    customer, contractor = _requisites("Заказчик", contract.customer), _requisites("Исполнитель", contract.contractor)
+    # Последние строки текста (заголовок и реквизиты сторон) идут в таблицу
+    requisites_start = sum(len(lines) for lines in contract.pages) - 1 - len(customer) - len(contractor)
+    n = 0
+    for lines in contract.pages:
+        for line in lines:
+            if n >= requisites_start:
+                break
+            paragraph = doc.add_paragraph()
+            number, _, text = line.partition(" ")
+            if number[:1].isdigit() and text:
+                paragraph.add_run(number + " ").bold = True
+                paragraph.add_run(text)
+            else:
+                paragraph.add_run(line)
+            n += 1
+        if n < requisites_start:
+            doc.add_paragraph().add_run().add_break(WD_BREAK.PAGE)
+
+    table = doc.add_table(rows=2, cols=2)
+    table.cell(0, 0).merge(table.cell(0, 1)).text = "Реквизиты и подписи сторон"
+    for column, lines in enumerate((customer, contractor)):
+        cell = table.cell(1, column)
+        cell.text = lines[0]
+        for line in lines[1:]:
+            cell.add_paragraph(line)
+    doc.save(path)
+    return path
+
+
+_WRITERS = {"pdf": write_pdf, "docx": write_docx}
+
+
+def build_corpus(directory: str, documents: int, pages: int, seed: int = 0,
+                 formats: Sequence[str] = ("pdf", "docx")) -> List[CorpusDocument]:
+    """Пишет documents договоров каждого формата в directory; договор i одинаков во всех форматах"""
+    os.makedirs(directory, exist_ok=True)
+    corpus = []
+    for i in range(documents):
+        contract = generate_contract(seed * 100003 + i, pages)
+        for fmt in formats:
+            path = os.path.join(directory, f"contract_{seed}_{i:04d}_{pages}p.{fmt}")
+            corpus.append(CorpusDocument(_WRITERS[fmt](contract, path), fmt, contract))
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--documents", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--formats", nargs="+", default=["pdf", "docx"], choices=sorted(_WRITERS))
+    args = parser.parse_args()
+    for document in build_corpus(args.out, args.documents, args.pages, args.seed, args.formats):
+        print(document.path)
+
+
+if __name__ == "__main__":
+    main()
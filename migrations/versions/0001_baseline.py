@@ -0,0 +1,89 @@
+"""Исходная схема (как ее создавал init_db через create_all)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Базы, созданные раньше через create_all, уже содержат эти таблицы — их пропускаем
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'documents' not in existing:
+        op.create_table(
+            'documents',
+            sa.Column('id', sa.Integer, primary_key=True, index=True),
+            sa.Column('filename', sa.String, nullable=False),
+            sa.Column('upload_date', sa.DateTime),
+            sa.Column('file_path', sa.String),
+        )
+    if 'citations' not in existing:
+        op.create_table(
+            'citations',
+            sa.Column('id', sa.Integer, primary_key=True, index=True),
+            sa.Column('document_id', sa.Integer, sa.ForeignKey('documents.id'), nullable=False),
+            sa.Column('text', sa.String, nullable=False),
+            sa.Column('page', sa.Integer),
+            sa.Column('bbox', sa.JSON),
+            sa.Column('paragraph_index', sa.Integer),
+            sa.Column('run_index', sa.Integer),
+        )
+    if 'contracts' not in existing:
+        op.create_table(
+            'contracts',
+            sa.Column('id', sa.Integer, primary_key=True, index=True),
+            sa.Column('document_id', sa.Integer, sa.ForeignKey('documents.id'), nullable=False, unique=True),
+            sa.Column('citation_data', sa.JSON),
+            sa.Column('parsed_amount', sa.Float),
+            sa.Column('parsed_currency', sa.String),
+            sa.Column('parsed_penalty_present', sa.Boolean),
+        )
+    if 'contract_citation_links' not in existing:
+        op.create_table(
+            'contract_citation_links',
+            sa.Column('contract_id', sa.Integer, sa.ForeignKey('contracts.id'), primary_key=True),
+            sa.Column('citation_id', sa.Integer, sa.ForeignKey('citations.id'), primary_key=True),
+            sa.Column('field_name', sa.String(50), nullable=False),
+        )
+    if 'requisites' not in existing:
+        op.create_table(
+            'requisites',
+            sa.Column('id', sa.Integer, primary_key=True, index=True),
+            sa.Column('contract_id', sa.Integer, sa.ForeignKey('contracts.id'), nullable=False),
+            sa.Column('inn_id', sa.Integer, sa.ForeignKey('citations.id')),
+            sa.Column('kpp_id', sa.Integer, sa.ForeignKey('citations.id')),
+            sa.Column('ogrn_id', sa.Integer, sa.ForeignKey('citations.id')),
+        )
+    if 'obligations' not in existing:
+        op.create_table(
+            'obligations',
+            sa.Column('id', sa.Integer, primary_key=True, index=True),
+            sa.Column('contract_id', sa.Integer, sa.ForeignKey('contracts.id'), nullable=False),
+            sa.Column('description', sa.String, nullable=False),
+            sa.Column('due_date', sa.DateTime),
+            sa.Column('status', sa.String),
+            sa.Column('citation_id', sa.Integer, sa.ForeignKey('citations.id')),
+        )
+    if 'reminders' not in existing:
+        op.create_table(
+            'reminders',
+            sa.Column('id', sa.Integer, primary_key=True, index=True),
+            sa.Column('obligation_id', sa.Integer, sa.ForeignKey('obligations.id'), nullable=False),
+            sa.Column('remind_date', sa.DateTime, nullable=False),
+            sa.Column('channel', sa.String),
+            sa.Column('sent', sa.Boolean),
+        )
+
+
+def downgrade():
+    for table in ('reminders', 'obligations', 'requisites', 'contract_citation_links', 'contracts',
+                  'citations', 'documents'):
+        op.drop_table(table)
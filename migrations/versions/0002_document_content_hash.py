@@ -0,0 +1,28 @@
+"""SHA-256 содержимого документа для пропуска повторной обработки
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'content_hash' not in {c['name'] for c in inspector.get_columns('documents')}:
+        with op.batch_alter_table('documents') as batch:
+            batch.add_column(sa.Column('content_hash', sa.String(64), nullable=True))
+    if 'ix_documents_content_hash' not in {i['name'] for i in inspector.get_indexes('documents')}:
+        op.create_index('ix_documents_content_hash', 'documents', ['content_hash'])
+
+
+def downgrade():
+    op.drop_index('ix_documents_content_hash', table_name='documents')
+    with op.batch_alter_table('documents') as batch:
+        batch.drop_column('content_hash')
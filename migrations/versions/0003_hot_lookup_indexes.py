@@ -0,0 +1,39 @@
+"""Индексы для горячих выборок: документы по имени/пути, цитаты документа, обязательства, напоминания
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_documents_filename', 'documents', ['filename'], {}),
+    ('ix_documents_file_path', 'documents', ['file_path'], {}),
+    ('ix_citations_document_position', 'citations', ['document_id', 'page', 'paragraph_index', 'run_index'], {}),
+    ('ix_contract_citation_links_citation_id', 'contract_citation_links', ['citation_id'], {}),
+    ('ix_requisites_contract_id', 'requisites', ['contract_id'], {}),
+    ('ix_obligations_contract_id', 'obligations', ['contract_id'], {}),
+    ('ix_reminders_obligation_id', 'reminders', ['obligation_id'], {}),
+    ('ix_reminders_due', 'reminders', ['remind_date'], {
+        'postgresql_where': sa.text('sent = false'),
+        'sqlite_where': sa.text('sent = 0'),
+    }),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for name, table, columns, options in INDEXES:
+        if name not in {i['name'] for i in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns, **options)
+
+
+def downgrade():
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
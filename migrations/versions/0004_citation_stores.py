@@ -0,0 +1,36 @@
+"""Компактное хранилище цитат документа и ссылка строки citations на индекс в нем
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'citation_stores',
+        sa.Column('document_id', sa.Integer, sa.ForeignKey('documents.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('count', sa.Integer, nullable=False),
+        sa.Column('positions', sa.LargeBinary, nullable=False),
+        sa.Column('bboxes', sa.LargeBinary, nullable=False),
+        sa.Column('text_offsets', sa.LargeBinary, nullable=False),
+        sa.Column('text', sa.LargeBinary, nullable=False),
+        sa.Column('created_at', sa.DateTime),
+    )
+    with op.batch_alter_table('citations') as batch:
+        batch.add_column(sa.Column('store_index', sa.Integer, nullable=True))
+    op.create_index('ix_citations_document_store_index', 'citations', ['document_id', 'store_index'])
+
+
+def downgrade():
+    op.drop_index('ix_citations_document_store_index', table_name='citations')
+    with op.batch_alter_table('citations') as batch:
+        batch.drop_column('store_index')
+    op.drop_table('citation_stores')
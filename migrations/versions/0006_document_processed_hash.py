@@ -0,0 +1,28 @@
+"""Хеш содержимого, по которому документ успешно обработан (processed_hash)
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('documents') as batch:
+        batch.add_column(sa.Column('processed_hash', sa.String(64), nullable=True))
+    # Документы, у которых уже есть договор, считаются обработанными по текущему содержимому
+    op.execute(
+        "UPDATE documents SET processed_hash = content_hash "
+        "WHERE content_hash IS NOT NULL AND id IN (SELECT document_id FROM contracts)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('documents') as batch:
+        batch.drop_column('processed_hash')
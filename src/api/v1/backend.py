@@ -1,12 +1,22 @@
+import asyncio
+import hashlib
 import os
-import shutil
-from fastapi import APIRouter, File, UploadFile, Depends
+import uuid
+from datetime import datetime
+from typing import Callable, Optional
+
+import aiofiles
+from celery import group
+from fastapi import APIRouter, File, UploadFile, Depends, HTTPException, Query
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
-from src.data.db.base import get_db_session
+from src.data.db.base import get_db_session, pool_metrics
 from src.repositories.contract_repo import ContractRepository
-from src.utils.celery_tasks import process_document
+from src.utils import contract_cache
+from src.utils.celery_client import document_pipeline
+from src.utils.logging_config import log_metrics
 
 router = APIRouter()
 
@@ -14,37 +24,199 @@ router = APIRouter()
 async def test_live():
     return JSONResponse({'status': 'Working!'}, 200)
 
-UPLOAD_DIR = "/Users/ddrxg/Code/ParserPDFforRemind/uploads"
+@router.get("/metrics/db")
+async def db_metrics():
+    """Метрики пула соединений БД процесса API"""
+    return JSONResponse(pool_metrics(), 200)
+
+@router.get("/metrics/cache")
+async def cache_metrics():
+    """Счетчики кеша данных договоров процесса API"""
+    return JSONResponse(contract_cache.cache_metrics(), 200)
+
+@router.get("/metrics/logs")
+async def logs_metrics():
+    """Счетчики логирования процесса API: записи, отброшенные при переполненной очереди"""
+    return JSONResponse(log_metrics(), 200)
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "/Users/ddrxg/Code/ParserPDFforRemind/uploads")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-@router.post("/documents")
-async def claim_docs(files: list[UploadFile] = File(...), db: Session = Depends(get_db_session)):
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Максимальный суммарный размер файлов в одном запросе и число одновременно обрабатываемых загрузок
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", str(200 * 1024 * 1024)))
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "4"))
+# Предел тела запроса целиком (файлы и разметка multipart): проверяется до разбора формы
+MAX_REQUEST_BODY_SIZE = int(os.getenv("MAX_REQUEST_BODY_SIZE", str(MAX_UPLOAD_SIZE + 1024 * 1024)))
+
+_upload_semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+
+
+class RequestBodyLimitMiddleware:
+    """
+    ASGI middleware: отклоняет тело запроса больше limit с 413 до того, как Starlette разберет multipart
+    и сохранит файлы во временные. По Content-Length — сразу, без чтения тела;
+    без него (chunked) — как только прочитано больше limit.
+    """
+
+    def __init__(self, app, limit: int = MAX_REQUEST_BODY_SIZE):
+        self.app = app
+        self.limit = limit
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        content_length = dict(scope["headers"]).get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > self.limit:
+            response = JSONResponse({"detail": f"Размер запроса превышает {self.limit} байт"}, 413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.limit:
+                    raise HTTPException(status_code=413, detail=f"Размер запроса превышает {self.limit} байт")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+async def _save_upload(file: UploadFile, file_path: str, limit: int) -> tuple[str, int]:
+    """
+    Пишет загружаемый файл на диск чанками, не блокируя event loop, и одновременно считает SHA-256.
+    limit — сколько байт из MAX_UPLOAD_SIZE осталось после предыдущих файлов запроса.
+    return: (хеш содержимого, размер в байтах); при превышении limit бросает HTTPException 413
+    """
+    sha256 = hashlib.sha256()
+    size = 0
+    async with aiofiles.open(file_path, "wb") as buffer:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > limit:
+                raise HTTPException(status_code=413, detail=(
+                    f"Суммарный размер файлов превышает {MAX_UPLOAD_SIZE} байт: "
+                    f"на файл {file.filename} оставалось {limit} байт"))
+            sha256.update(chunk)
+            await buffer.write(chunk)
+    return sha256.hexdigest(), size
+
+
+def _register_uploads(repo: ContractRepository, uploads: list[tuple[str, str, str]]) -> dict:
+    """
+    Синхронная часть загрузки (БД и переименование файлов), выполняется в threadpool.
+    uploads: [(filename, путь к временному файлу, хеш содержимого), ...]
+    """
     saved = []
     document_ids = []
+    unchanged = []
+    tasks = []
 
-    repo = ContractRepository(db)
-    for file in files:
+    for filename, tmp_path, content_hash in uploads:
         # Проверяем, существует ли запись по filename
-        existing_document = repo.get_document_by_filename(filename=file.filename) # type: ignore
-        
+        existing_document = repo.get_document_by_filename(filename=filename)
+
         if existing_document:
-            # Если существует: перезаписываем файл по существующему file_path и обновляем запись
             file_path = existing_document.file_path
-            with open(file_path, "wb") as buffer: # type: ignore
-                shutil.copyfileobj(file.file, buffer)
-            repo.update_document(existing_document)
-            saved.append(file_path)
-            document_ids.append(existing_document.id)
+            if content_hash == existing_document.content_hash == existing_document.processed_hash:
+                # Содержимое не изменилось и уже успешно обработано: повторное извлечение не нужно.
+                # Если прошлая обработка упала или еще идет, processed_hash отстает, и файл обрабатывается снова
+                os.remove(tmp_path)
+                unchanged.append(existing_document.id)
+                continue
+            # Если существует: перезаписываем файл по существующему file_path и обновляем запись
+            os.replace(tmp_path, file_path) # type: ignore
+            repo.update_document(existing_document, content_hash=content_hash)
+            document_id = existing_document.id
         else:
             # Если не существует: создаем новый файл и запись
-            file_path = os.path.join(UPLOAD_DIR, file.filename) # type: ignore
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-            document = repo.create_document(filename=file.filename, file_path=file_path) # type: ignore
-            saved.append(file_path)
-            document_ids.append(document.id)
+            file_path = os.path.join(UPLOAD_DIR, filename)
+            os.replace(tmp_path, file_path)
+            document_id = repo.create_document(filename=filename, file_path=file_path, content_hash=content_hash).id
 
-        # Отправляем задачу в очередь Celery
-        process_document.delay(document_ids[-1], file_path) # type: ignore
+        saved.append(file_path)
+        document_ids.append(document_id)
+        # Цепочка собирается по именам задач: API не импортирует модуль задач и его тяжелые зависимости
+        tasks.append(document_pipeline(document_id, file_path, os.path.getsize(file_path), content_hash)) # type: ignore
 
-    return JSONResponse(content={"saved": saved, "document_ids": document_ids}, status_code=201)
\ No newline at end of file
+    return {"saved": saved, "document_ids": document_ids, "unchanged": unchanged, "tasks": tasks}
+
+
+@router.post("/documents")
+async def claim_docs(files: list[UploadFile] = File(...), db: Session = Depends(get_db_session)):
+    repo = ContractRepository(db)
+    uploads = []
+
+    async with _upload_semaphore:
+        remaining = MAX_UPLOAD_SIZE
+        try:
+            for file in files:
+                tmp_path = os.path.join(UPLOAD_DIR, f".{uuid.uuid4().hex}.part")
+                uploads.append((file.filename, tmp_path, ""))
+                content_hash, size = await _save_upload(file, tmp_path, remaining)
+                uploads[-1] = (file.filename, tmp_path, content_hash)
+                remaining -= size
+        except BaseException:
+            for _, tmp_path, _ in uploads:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            raise
+
+        result = await run_in_threadpool(_register_uploads, repo, uploads)
+
+    # Публикуем все задачи Celery одной группой через одно соединение с брокером
+    tasks = result.pop("tasks")
+    if tasks:
+        await run_in_threadpool(group(tasks).apply_async)
+
+    return JSONResponse(content=result, status_code=201)
+
+
+# Размер страницы списков документов и договоров
+PAGE_LIMIT_DEFAULT = 100
+PAGE_LIMIT_MAX = 1000
+
+
+def _page(fetch: Callable, after: Optional[int], limit: int) -> dict:
+    """
+    Keyset-пагинация по id: берет limit + 1 строк после after, лишняя строка означает, что есть следующая страница.
+    return: {"items": [...], "next_after": id последней строки или None}
+    """
+    rows = fetch(after_id=after, limit=limit + 1)
+    items = [
+        {key: value.isoformat() if isinstance(value, datetime) else value for key, value in row._asdict().items()}
+        for row in rows[:limit]
+    ]
+    next_after = items[-1]["id"] if len(rows) > limit else None
+    return {"items": items, "next_after": next_after}
+
+
+@router.get("/documents")
+async def list_documents(after: Optional[int] = Query(None, description="id последнего документа предыдущей страницы"),
+                         limit: int = Query(PAGE_LIMIT_DEFAULT, ge=1, le=PAGE_LIMIT_MAX),
+                         db: Session = Depends(get_db_session)):
+    repo = ContractRepository(db)
+    return JSONResponse(await run_in_threadpool(_page, repo.list_documents_page, after, limit), 200)
+
+
+@router.get("/contracts")
+async def list_contracts(after: Optional[int] = Query(None, description="id последнего договора предыдущей страницы"),
+                         limit: int = Query(PAGE_LIMIT_DEFAULT, ge=1, le=PAGE_LIMIT_MAX),
+                         db: Session = Depends(get_db_session)):
+    repo = ContractRepository(db)
+    return JSONResponse(await run_in_threadpool(_page, repo.list_contracts_page, after, limit), 200)
+
+
+@router.get("/documents/{document_id}/contract")
+async def get_contract(document_id: int, db: Session = Depends(get_db_session)):
+    """Извлеченные данные договора: поля DocsInfo и цитаты с bbox (через кеш Redis)"""
+    repo = ContractRepository(db)
+    payload = await run_in_threadpool(contract_cache.get_docs_info, repo, document_id)
+    if payload is None:
+        raise HTTPException(status_code=404, detail="Данные договора для документа не найдены")
+    return JSONResponse(payload, 200)
@@ -1,21 +1,168 @@
 import os
-from sqlalchemy import create_engine
+import threading
+import time
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 from dotenv import load_dotenv
 
 load_dotenv()
 
-engine = create_engine(os.getenv('DATABASE_URL', 'sqlite://./docs.db'), echo=True)
+DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///./docs.db')
+
+# Профили пула: API обслуживает много параллельных запросов, процесс воркера — одну-две задачи.
+# Пул worker не меньше числа потоков задач в процессе (worker_threads): у --pool=threads --concurrency=N
+# каждая из N задач держит свое соединение, у solo и prefork задача в процессе одна
+POOL_PROFILES = {
+    "api": {"pool_size": 10, "max_overflow": 20},
+    "worker": {"pool_size": 2, "max_overflow": 2},
+}
+# Задач, одновременно выполняемых в процессе воркера; задается set_worker_threads из worker_init
+worker_threads = 1
+
+_query_counters = threading.local()
+_metrics_lock = threading.Lock()
+_pool_metrics = {"checkouts": 0, "checkins": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0}
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool, который считает время ожидания свободного соединения"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - started
+            with _metrics_lock:
+                _pool_metrics["wait_seconds_total"] += waited
+                _pool_metrics["wait_seconds_max"] = max(_pool_metrics["wait_seconds_max"], waited)
+
+
+def _env(profile: str, name: str, default):
+    """Настройка пула: DB_<PROFILE>_<NAME>, затем DB_<NAME>, затем значение по умолчанию"""
+    value = os.getenv(f"DB_{profile.upper()}_{name}", os.getenv(f"DB_{name}"))
+    if value is None:
+        return default
+    if isinstance(default, bool):
+        return value.lower() in ("1", "true", "yes")
+    return type(default)(value)
+
+
+def _count_query(kind: str) -> None:
+    for counters in getattr(_query_counters, "stack", ()):
+        counters[kind] += 1
+
+
+@contextmanager
+def count_queries():
+    """
+    Считает обращения к БД в текущем потоке внутри блока: statements — выполненные запросы
+    (executemany — один), commits — коммиты. Отдает словарь, который заполняется по ходу блока.
+    """
+    if not hasattr(_query_counters, "stack"):
+        _query_counters.stack = []
+    counters = {"statements": 0, "commits": 0}
+    _query_counters.stack.append(counters)
+    try:
+        yield counters
+    finally:
+        _query_counters.stack.remove(counters)
+
+
+def create_db_engine(profile: str = "api", url: str = DATABASE_URL) -> Engine:
+    """
+    Создает движок с настройками пула для профиля api или worker.
+    Логирование SQL выключено по умолчанию (DB_ECHO=true включает).
+    """
+    defaults = dict(POOL_PROFILES[profile])
+    if profile == "worker":
+        defaults["pool_size"] = max(defaults["pool_size"], worker_threads)
+    parsed_url = make_url(url)
+    options = {
+        "echo": _env(profile, "ECHO", False),
+        "pool_pre_ping": _env(profile, "POOL_PRE_PING", True),
+        "pool_recycle": _env(profile, "POOL_RECYCLE", 1800),
+    }
+    # Для SQLite в памяти используется собственный пул без ограничения размера
+    if not (parsed_url.get_backend_name() == "sqlite" and parsed_url.database in (None, "", ":memory:")):
+        options.update(
+            poolclass=MeteredQueuePool,
+            pool_size=_env(profile, "POOL_SIZE", defaults["pool_size"]),
+            max_overflow=_env(profile, "MAX_OVERFLOW", defaults["max_overflow"]),
+            pool_timeout=_env(profile, "POOL_TIMEOUT", 30),
+        )
+    new_engine = create_engine(url, **options)
+
+    @event.listens_for(new_engine, "checkout")
+    def _on_checkout(*args):
+        with _metrics_lock:
+            _pool_metrics["checkouts"] += 1
+
+    @event.listens_for(new_engine, "checkin")
+    def _on_checkin(*args):
+        with _metrics_lock:
+            _pool_metrics["checkins"] += 1
+
+    @event.listens_for(new_engine, "before_cursor_execute")
+    def _on_execute(*args):
+        _count_query("statements")
+
+    @event.listens_for(new_engine, "commit")
+    def _on_commit(*args):
+        _count_query("commits")
+
+    return new_engine
+
+
+engine_profile = os.getenv('DB_PROFILE', 'api')
+engine = create_db_engine(engine_profile)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+
+def _dispose_after_fork():
+    # Соединения родителя нельзя использовать в дочернем процессе: забываем их, не закрывая
+    engine.dispose(close=False)
+
+
+os.register_at_fork(after_in_child=_dispose_after_fork)
+
 def init_db():
     """Создает все таблицы в базе данных"""
     Base.metadata.create_all(bind=engine)
     print("Database tables created successfully!")
 
+def set_worker_threads(threads: int) -> None:
+    """Число задач, выполняемых процессом воркера параллельно (потоки пула threads); вызывается до init_worker_engine"""
+    global worker_threads
+    worker_threads = max(int(threads), 1)
+
+def init_worker_engine():
+    """Переключает процесс воркера на профиль пула worker (размер пула — не меньше worker_threads)"""
+    global engine, engine_profile
+    if engine_profile != "worker":
+        old_engine = engine
+        engine = create_db_engine("worker")
+        engine_profile = "worker"
+        SessionLocal.configure(bind=engine)
+        old_engine.dispose(close=False)
+    return engine
+
+def pool_metrics() -> dict:
+    """Метрики пула соединений: выдачи/возвраты, ожидание свободного соединения и текущее состояние"""
+    with _metrics_lock:
+        metrics = dict(_pool_metrics)
+    pool = engine.pool
+    if isinstance(pool, QueuePool):
+        metrics.update(size=pool.size(), checked_out=pool.checkedout(), overflow=pool.overflow(),
+                       checked_in=pool.checkedin())
+    return metrics
+
 def get_db_session():
     """Генератор сессии для работы с БД"""
     db = SessionLocal()
@@ -23,3 +170,15 @@ def get_db_session():
         yield db
     finally:
         db.close()
+
+@contextmanager
+def session_scope():
+    """Сессия для задач: при ошибке откатывается, закрывается всегда; коммит делает вызывающий код"""
+    db = SessionLocal()
+    try:
+        yield db
+    except BaseException:
+        db.rollback()
+        raise
+    finally:
+        db.close()
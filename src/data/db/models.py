@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Float, Integer, String, ForeignKey, DateTime, JSON, Boolean, Table
+from sqlalchemy import Column, Float, Integer, String, ForeignKey, DateTime, JSON, Boolean, Table, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from src.data.db.base import Base
@@ -7,7 +7,7 @@ from src.data.db.base import Base
 contract_citation_links = Table(
     'contract_citation_links', Base.metadata,
     Column('contract_id', Integer, ForeignKey('contracts.id'), primary_key=True),
-    Column('citation_id', Integer, ForeignKey('citations.id'), primary_key=True),
+    Column('citation_id', Integer, ForeignKey('citations.id'), primary_key=True, index=True),
     Column('field_name', String(50), nullable=False)  # Имя поля, например "party_1_name"
 )
 
@@ -16,12 +16,15 @@ class Document(Base):
     __tablename__ = 'documents'
 
     id = Column(Integer, primary_key=True, index=True)
-    filename = Column(String, nullable=False)  # Имя файла
+    filename = Column(String, nullable=False, index=True)  # Имя файла
     upload_date = Column(DateTime, default=datetime.now())  # Дата загрузки
-    file_path = Column(String, nullable=True)  # Путь к файлу (если храним локально)
+    file_path = Column(String, nullable=True, index=True)  # Путь к файлу (если храним локально)
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 содержимого файла
+    processed_hash = Column(String(64), nullable=True)  # SHA-256 содержимого, по которому извлечены поля
 
     # Связи
     citations = relationship("Citation", back_populates="document")
+    citation_store = relationship("CitationStore", uselist=False, passive_deletes=True)
     contract = relationship("Contract", back_populates="document", uselist=False)  # Один договор на документ
 
 # Модель для цитат
@@ -35,16 +38,36 @@ class Citation(Base):
     bbox = Column(JSON, nullable=True)  # Координаты bounding box [x0, y0, x1, y1]
     paragraph_index = Column(Integer, nullable=True)  # Индекс параграфа
     run_index = Column(Integer, nullable=True)  # Индекс run (для более точной трассировки)
+    store_index = Column(Integer, nullable=True)  # Индекс цитаты в CitationStore документа, если создана из него
 
     # Связи
     document = relationship("Document", back_populates="citations")
 
+    # Покрывает и выборку по document_id, и обход цитат документа в порядке страниц/параграфов/runs
+    __table_args__ = (
+        Index('ix_citations_document_position', 'document_id', 'page', 'paragraph_index', 'run_index'),
+        Index('ix_citations_document_store_index', 'document_id', 'store_index'),
+    )
+
+# Модель для компактного хранения всех цитат документа (см. src/data/db/packed_citations.py).
+# В citations попадают только цитаты, на которые ссылается договор
+class CitationStore(Base):
+    __tablename__ = 'citation_stores'
+
+    document_id = Column(Integer, ForeignKey('documents.id', ondelete='CASCADE'), primary_key=True)
+    count = Column(Integer, nullable=False)  # Количество цитат
+    positions = Column(LargeBinary, nullable=False)  # int32 [page, paragraph_index, run_index] на цитату
+    bboxes = Column(LargeBinary, nullable=False)  # float32 [x0, y0, x1, y1] на цитату
+    text_offsets = Column(LargeBinary, nullable=False)  # int32 границы текстов в text, count + 1 значений
+    text = Column(LargeBinary, nullable=False)  # Тексты цитат подряд в UTF-8
+    created_at = Column(DateTime, default=datetime.now)
+
 # Модель для реквизитов
 class Requisites(Base):
     __tablename__ = 'requisites'
 
     id = Column(Integer, primary_key=True, index=True)
-    contract_id = Column(Integer, ForeignKey('contracts.id'), nullable=False)
+    contract_id = Column(Integer, ForeignKey('contracts.id'), nullable=False, index=True)
     inn_id = Column(Integer, ForeignKey('citations.id'), nullable=True)
     kpp_id = Column(Integer, ForeignKey('citations.id'), nullable=True)
     ogrn_id = Column(Integer, ForeignKey('citations.id'), nullable=True)
@@ -80,7 +103,7 @@ class Obligation(Base):
     __tablename__ = 'obligations'
 
     id = Column(Integer, primary_key=True, index=True)
-    contract_id = Column(Integer, ForeignKey('contracts.id'), nullable=False)
+    contract_id = Column(Integer, ForeignKey('contracts.id'), nullable=False, index=True)
     description = Column(String, nullable=False)  # Описание обязательства
     due_date = Column(DateTime, nullable=True)  # Срок выполнения
     status = Column(String, default='pending')  # pending, completed, overdue
@@ -96,13 +119,19 @@ class Reminder(Base):
     __tablename__ = 'reminders'
 
     id = Column(Integer, primary_key=True, index=True)
-    obligation_id = Column(Integer, ForeignKey('obligations.id'), nullable=False)
+    obligation_id = Column(Integer, ForeignKey('obligations.id'), nullable=False, index=True)
     remind_date = Column(DateTime, nullable=False)  # Дата напоминания
     channel = Column(String, default='telegram')  # Канал: telegram, email и т.д.
     sent = Column(Boolean, default=False)  # Отправлено ли
+    claimed_until = Column(DateTime, nullable=True)  # Захвачено диспетчером для отправки до этого момента
 
     # Связи
     obligation = relationship("Obligation", back_populates="reminders")
 
+    # Частичный индекс для поиска наступивших неотправленных напоминаний
+    __table_args__ = (
+        Index('ix_reminders_due', 'remind_date', postgresql_where=sent == False, sqlite_where=sent == False),  # noqa: E712
+    )
+
 # Добавляем связь для Citation к Contract через contract_citation_links
 Citation.contracts = relationship("Contract", secondary=contract_citation_links, back_populates="citations")
\ No newline at end of file
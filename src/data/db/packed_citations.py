@@ -0,0 +1,121 @@
+import sys
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Буферы хранятся в little-endian; на big-endian платформах при чтении делается копия с перестановкой байт
+_LITTLE_ENDIAN = sys.byteorder == "little"
+_INT32 = "i"
+_FLOAT32 = "f"
+assert array(_INT32).itemsize == 4 and array(_FLOAT32).itemsize == 4
+
+POSITION_FIELDS = ("page", "paragraph_index", "run_index")
+NO_POSITION = -1  # None в page / paragraph_index / run_index
+
+
+def _view(buffer, typecode: str) -> memoryview:
+    """memoryview над буфером без копирования (кроме big-endian платформ)"""
+    if _LITTLE_ENDIAN:
+        return memoryview(buffer).cast("B").cast(typecode)
+    values = array(typecode, bytes(buffer))
+    values.byteswap()
+    return memoryview(values)
+
+
+def _to_bytes(values: array) -> bytes:
+    if not _LITTLE_ENDIAN:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+class PackedCitations:
+    """
+    Цитаты документа в колоночном виде:
+    positions — int32 [page, paragraph_index, run_index] на цитату (-1 вместо None),
+    bboxes — float32 [x0, y0, x1, y1] на цитату (NaN, если bbox нет),
+    offsets — int32 границы текстов в байтах UTF-8 (count + 1 значений), text — тексты подряд.
+    Цитата адресуется индексом в хранилище; строка в таблице citations создается только для связанных.
+    """
+    __slots__ = ("count", "positions", "bboxes", "offsets", "text")
+
+    def __init__(self, count: int, positions: memoryview, bboxes: memoryview, offsets: memoryview,
+                 text: memoryview):
+        self.count = count
+        self.positions = positions
+        self.bboxes = bboxes
+        self.offsets = offsets
+        self.text = text
+
+    @classmethod
+    def from_citations(cls, citations: Iterable[Dict[str, Any]]) -> "PackedCitations":
+        """Упаковывает цитаты в формате парсеров (text, page, bbox, paragraph_index, run_index)"""
+        positions = array(_INT32)
+        bboxes = array(_FLOAT32)
+        offsets = array(_INT32, [0])
+        text = bytearray()
+        nan_bbox = (float("nan"),) * 4
+        for citation in citations:
+            positions.extend(NO_POSITION if citation.get(name) is None else citation[name]
+                             for name in POSITION_FIELDS)
+            bboxes.extend(citation.get("bbox") or nan_bbox)
+            text += citation["text"].encode("utf-8")
+            offsets.append(len(text))
+        return cls(len(offsets) - 1, memoryview(positions), memoryview(bboxes), memoryview(offsets),
+                   memoryview(bytes(text)))
+
+    @classmethod
+    def from_buffers(cls, count: int, positions, bboxes, offsets, text) -> "PackedCitations":
+        """Представление над байтами из БД без копирования"""
+        return cls(count, _view(positions, _INT32), _view(bboxes, _FLOAT32), _view(offsets, _INT32),
+                   memoryview(text))
+
+    def to_buffers(self) -> Dict[str, Any]:
+        """Значения колонок citation_stores"""
+        return {
+            "count": self.count,
+            "positions": _to_bytes(array(_INT32, self.positions)),
+            "bboxes": _to_bytes(array(_FLOAT32, self.bboxes)),
+            "text_offsets": _to_bytes(array(_INT32, self.offsets)),
+            "text": self.text.tobytes(),
+        }
+
+    def __len__(self) -> int:
+        return self.count
+
+    def text_at(self, index: int) -> str:
+        return str(self.text[self.offsets[index]:self.offsets[index + 1]], "utf-8")
+
+    def bbox_at(self, index: int) -> Optional[List[float]]:
+        bbox = self.bboxes[index * 4:index * 4 + 4].tolist()
+        return None if bbox[0] != bbox[0] else bbox  # NaN — bbox отсутствует
+
+    def citation(self, index: int) -> Dict[str, Any]:
+        """Цитата в формате строки таблицы citations (без document_id)"""
+        page, paragraph_index, run_index = (None if value == NO_POSITION else value
+                                            for value in self.positions[index * 3:index * 3 + 3])
+        return {"text": self.text_at(index), "page": page, "bbox": self.bbox_at(index),
+                "paragraph_index": paragraph_index, "run_index": run_index}
+
+    def iter_texts(self) -> Iterator[Tuple[int, str]]:
+        """(индекс, text) в порядке документа — вход для windows.iter_windows"""
+        offsets, text = self.offsets, self.text
+        for index in range(self.count):
+            yield index, str(text[offsets[index]:offsets[index + 1]], "utf-8")
+
+    def as_numpy(self) -> Dict[str, Any]:
+        """
+        NumPy-представления тех же буферов без копирования:
+        positions (count, 3) int32, bboxes (count, 4) float32, offsets (count + 1,) int32, text uint8
+        """
+        import numpy as np
+
+        return {
+            "positions": np.frombuffer(self.positions, dtype=np.int32).reshape(self.count, 3),
+            "bboxes": np.frombuffer(self.bboxes, dtype=np.float32).reshape(self.count, 4),
+            "offsets": np.frombuffer(self.offsets, dtype=np.int32),
+            "text": np.frombuffer(self.text, dtype=np.uint8),
+        }
+
+    @property
+    def nbytes(self) -> int:
+        return sum(view.nbytes for view in (self.positions, self.bboxes, self.offsets, self.text))
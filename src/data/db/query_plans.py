@@ -0,0 +1,160 @@
+"""
+Проверка планов горячих запросов: каждый должен идти по индексу, а не полным сканом таблицы.
+Проверяются не отдельно написанные копии запросов, а SQL, который выполняют сами методы
+ContractRepository: методы вызываются на минимальных данных внутри транзакции, которая затем откатывается,
+а выполненные SELECT/UPDATE/DELETE перехватываются и разбираются EXPLAIN с теми же параметрами.
+
+Запуск: python -m src.data.db.query_plans [--url <DATABASE_URL>]
+Код выхода 1, если хотя бы один запрос читает таблицу последовательным сканом.
+Схему перед проверкой нужно привести к head: alembic upgrade head. В тестах — tests/test_query_plans.py (SQLite).
+"""
+import argparse
+import json
+import sys
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from src.data.db.base import DATABASE_URL
+from src.data.db.packed_citations import PackedCitations
+from src.repositories.contract_repo import ContractRepository
+
+_PLANNED = ("SELECT", "UPDATE", "DELETE", "WITH")
+
+
+class Seed(NamedTuple):
+    """Id строк, созданных для вызова методов (по одной на таблицу)"""
+    document_id: int
+    contract_id: int
+    citation_id: int
+    obligation_id: int
+
+
+# Методы репозитория, которые выполняются на каждый документ, запрос API или по расписанию
+HOT_CALLS: Dict[str, Callable[[ContractRepository, Seed], object]] = {
+    "document_by_filename": lambda repo, seed: repo.get_document_by_filename("contract.pdf"),
+    "document_by_file_path": lambda repo, seed: repo.get_document_by_file_path("uploads/contract.pdf"),
+    "documents_by_content_hash": lambda repo, seed: repo.get_documents_by_content_hash("0" * 64),
+    "content_hash": lambda repo, seed: repo.get_content_hash(seed.document_id),
+    "mark_document_processed": lambda repo, seed: repo.mark_document_processed(seed.document_id, commit=False),
+    "documents_page": lambda repo, seed: repo.list_documents_page(after_id=seed.document_id - 1),
+    "contracts_page": lambda repo, seed: repo.list_contracts_page(after_id=seed.contract_id - 1),
+    "citation_texts": lambda repo, seed: list(repo.iter_citation_texts(seed.document_id)),
+    "citation_rows": lambda repo, seed: list(repo.iter_citation_rows(seed.document_id)),
+    "citations_by_ids": lambda repo, seed: repo.get_citations_by_ids([seed.citation_id]),
+    "citation_store": lambda repo, seed: repo.get_citation_store(seed.document_id),
+    "materialize_citations": lambda repo, seed: repo.materialize_citations(
+        seed.document_id, PackedCitations.from_citations([{"text": "ИНН 7701234567"}]), [0], commit=False),
+    "contract_summary": lambda repo, seed: repo.get_contract_summary(seed.document_id),
+    "contract_by_document": lambda repo, seed: repo.get_contract_by_document(seed.document_id),
+    "citation_links_by_contract": lambda repo, seed: repo.get_citation_links_by_contract(seed.contract_id),
+    "requisites_by_contract": lambda repo, seed: repo.get_requisites_by_contract(seed.contract_id),
+    "obligations_by_contract": lambda repo, seed: repo.get_obligations_by_contract(seed.contract_id),
+    "reminders_by_obligation": lambda repo, seed: repo.get_reminders_by_obligation(seed.obligation_id),
+    "claim_due_reminders": lambda repo, seed: repo.claim_due_reminders(datetime.now(), commit=False),
+    "mark_reminders_sent": lambda repo, seed: repo.mark_reminders_sent(
+        [row.id for row in repo.get_reminders_by_obligation(seed.obligation_id)], commit=False),
+}
+
+
+def _seed(repo: ContractRepository) -> Seed:
+    # Документ с договором, цитатой, обязательством и наступившим напоминанием: методы доходят до всех запросов
+    document = repo.create_document(filename="contract.pdf", file_path="uploads/contract.pdf")
+    contract = repo.create_contract(document.id)  # type: ignore
+    citation_id = repo.bulk_create_citations([{"document_id": document.id, "text": "ИНН 7701234567"}], commit=False)[0]
+    obligation = repo.create_obligation(contract.id, "Оплата", due_date=datetime.now())  # type: ignore
+    repo.create_reminder(obligation.id, datetime.now() - timedelta(days=1))  # type: ignore
+    return Seed(document.id, contract.id, citation_id, obligation.id)  # type: ignore
+
+
+def capture_hot_queries(connection: Connection) -> Dict[str, List[Tuple[str, object]]]:
+    """
+    Вызывает методы HOT_CALLS и возвращает {имя: [(SQL, параметры), ...]} — запросы, выполненные каждым методом.
+    Все изменения (данные для вызовов и записи самих методов) откатываются.
+    """
+    captured: Dict[str, List[Tuple[str, object]]] = {}
+    current: List[Tuple[str, object]] = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(_PLANNED):
+            current.append((statement, parameters))
+
+    transaction = connection.begin()
+    # Сессия внутри внешней транзакции не коммитит ее: коммиты репозитория откатываются вместе с ней
+    session = Session(bind=connection, join_transaction_mode="rollback_only")
+    try:
+        repo = ContractRepository(session)
+        with repo.transaction():
+            seed = _seed(repo)
+        event.listen(connection, "before_cursor_execute", _capture)
+        try:
+            for name, call in HOT_CALLS.items():
+                current.clear()
+                call(repo, seed)
+                captured[name] = list(current)
+        finally:
+            event.remove(connection, "before_cursor_execute", _capture)
+    finally:
+        session.close()
+        transaction.rollback()
+    return captured
+
+
+def _sqlite_seq_scans(connection: Connection, sql: str, parameters) -> List[str]:
+    # Строки плана вида "SCAN citations" — полный проход; "SEARCH ... USING INDEX" — по индексу
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", parameters).all()
+    return [row[-1] for row in rows if row[-1].startswith("SCAN") and "USING" not in row[-1]]
+
+
+def _postgres_seq_scans(connection: Connection, sql: str, parameters) -> List[str]:
+    # На пустой таблице планировщик всегда выбирает Seq Scan, поэтому запрещаем его:
+    # если подходящего индекса нет, Seq Scan все равно останется в плане
+    with connection.begin():
+        connection.execute(text("SET LOCAL enable_seqscan = off"))
+        plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}", parameters).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    found = []
+    nodes = [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if node["Node Type"] == "Seq Scan":
+            found.append(f"Seq Scan on {node.get('Relation Name')}")
+        nodes.extend(node.get("Plans", []))
+    return found
+
+
+def check_query_plans(url: str = DATABASE_URL) -> Dict[str, List[str]]:
+    """Возвращает {имя метода: [узлы плана с последовательным сканом]} для методов, чьи запросы идут без индекса"""
+    engine = create_engine(url)
+    failures = {}
+    try:
+        with engine.connect() as connection:
+            queries = capture_hot_queries(connection)
+            seq_scans = _postgres_seq_scans if connection.dialect.name == "postgresql" else _sqlite_seq_scans
+            for name, statements in queries.items():
+                scans = [scan for sql, parameters in statements for scan in seq_scans(connection, sql, parameters)]
+                if scans:
+                    failures[name] = scans
+    finally:
+        engine.dispose()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка, что горячие запросы используют индексы")
+    parser.add_argument("--url", default=DATABASE_URL, help="URL базы (по умолчанию DATABASE_URL)")
+    args = parser.parse_args()
+
+    failures = check_query_plans(args.url)
+    for name in HOT_CALLS:
+        print(f"{'FAIL' if name in failures else 'ok'}\t{name}\t{'; '.join(failures.get(name, []))}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
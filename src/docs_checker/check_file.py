@@ -1,6 +1,7 @@
 from collections import defaultdict
-import re
+import os
 import sys
+from typing import Dict, List, NamedTuple, Optional
 from pathlib import Path
 import logging
 
@@ -9,96 +10,240 @@ BASE_DIR = Path(__file__).resolve().parent.parent.parent
 sys.path.append(str(BASE_DIR))
 
 from dotenv import load_dotenv
-from src.data.db.base import get_db_session
+from src.data.db.base import count_queries, session_scope
 # from src.utils.remind import set_reminder
 from src.repositories.contract_repo import ContractRepository
+from src.utils import contract_cache
 
-from src.docs_checker.utils_checker import find_party
+from src.docs_checker.ner.inference import entities_to_matches, get_ner_model
+from src.docs_checker.utils_checker import find_party, windows
+from src.docs_checker.utils_checker.field_tracker import FieldTracker
 
 load_dotenv()
 
-logging.basicConfig(filename="/Users/ddrxg/Code/ParserPDFforRemind/logs.txt", level=logging.INFO, format='%(asctime)s: %(levelname)s: %(message)s')
+# Обработчики логов настраивает процесс (src.utils.logging_config.setup_logging)
 logger = logging.getLogger(__name__)
 
 
-def get_and_send_processing(document_id: int):
-    db = next(get_db_session())
-    repo = ContractRepository(db)
+# Размер окна по тексту цитат и перекрытие соседних окон, в символах
+WINDOW_SIZE = int(os.getenv('WINDOW_SIZE', '900'))
+WINDOW_OVERLAP = int(os.getenv('WINDOW_OVERLAP', '200'))
+# NER-экстрактор для полей, которые регулярные выражения не различают (нужна модель NER_MODEL_PATH)
+CHECK_FILE_NER = os.getenv('CHECK_FILE_NER', 'false').lower() in ('1', 'true', 'yes')
+# Метка сущности NER (теги data/train.json) -> поле DocsInfo
+NER_FIELDS = {
+    "DATE_START": "contract_start",
+    "DATE_END": "contract_end",
+    "PENALTY": "penalty_amount_or_formula",
+}
+
+
+def _overlap_length(window, previous_ids) -> int:
+    """Длина начала текста окна (с пробелами склейки), занятого цитатами из предыдущего окна"""
+    length = 0
+    for (text,), citation_id in window:
+        if citation_id not in previous_ids:
+            break
+        length += len(text) + 1
+    return max(length - 1, 0)
+
+
+# Вид совпадения объединенного шаблона (find_party.MATCH_KINDS), из которого заполняется поле
+FIELD_KINDS = {
+    "party_1_name": "party", "party_2_name": "party",
+    "contract_date": "date",
+    "amount": "amount", "currency": "amount",
+    "requisites.inn": "digits", "requisites.kpp": "digits", "requisites.ogrn": "digits",
+}
+
+
+class WindowScan(NamedTuple):
+    """Разбор окна: склеенный текст и кандидаты (совпадения шаблона) для каждого незаполненного поля"""
+    index: find_party.TextIndex
+    candidates: Dict[str, list]
+
+
+class WindowScanner:
+    """
+    Разбор окон документа одним проходом объединенного шаблона по одному TextIndex окна.
+    Шаблон собирается только из видов совпадений незаполненных полей, проход останавливается,
+    как только у каждого из них есть кандидат. Соседние окна перекрываются: совпадения, целиком лежащие
+    в перекрытии, уже разобраны предыдущим окном и пропускаются, а одно и то же совпадение
+    (вид, id цитат и текст) учитывается один раз за документ.
+    Экстракторы групп полей (parties, dates, amounts, requisites) берут значения из результата scan.
+    """
+
+    def __init__(self):
+        self._previous_ids = frozenset()
+        self.seen_matches = set()
+
+    def scan(self, window, fields: List[str]) -> WindowScan:
+        index = find_party.TextIndex(window)
+        overlap = _overlap_length(window, self._previous_ids)
+        self._previous_ids = frozenset(citation_id for _, citation_id in window)
+        # Поля других экстракторов (NER) шаблоном не ищутся
+        candidates: Dict[str, list] = {field: [] for field in fields if field in FIELD_KINDS}
+        missing = set(candidates)
+        if not missing:
+            return WindowScan(index, candidates)
+        for m in find_party.combined_pattern(frozenset(FIELD_KINDS[field] for field in missing)).finditer(index.text):
+            kind = m.lastgroup
+            if kind == "party":
+                # Роль видна по тексту после названия: пропускаем, только если и он был в предыдущем окне
+                if m.end() + find_party.PARTY_CONTEXT <= overlap:
+                    continue
+                targets = find_party.party_roles(index.text, m)
+            elif m.end() <= overlap:
+                continue
+            elif kind == "date":
+                targets = ["contract_date"]
+            elif kind == "amount":
+                targets = ["amount", "currency"]
+            else:
+                targets = [f"requisites.{key}" for key in find_party.DIGITS_FIELDS[len(m.group())]]
+            for field in targets:
+                if field in candidates:
+                    candidates[field].append(m)
+                    missing.discard(field)
+            if not missing:
+                break
+        return WindowScan(index, candidates)
+
+    def _first(self, scan: WindowScan, field: str, taken: Optional[set] = None):
+        """Первое еще не учтенное совпадение для поля: (совпадение, {текст: [id, ...]}) или (None, None)"""
+        for m in scan.candidates.get(field, ()):
+            ids = scan.index.ids_for_span(*m.span())
+            # Несколько совпадений одного вида могут лежать в одной цитате (ИНН и КПП, обе стороны): ключ включает текст
+            key = (FIELD_KINDS[field], tuple(ids), m.group())
+            if key not in self.seen_matches:
+                self.seen_matches.add(key)
+                return m, {m.group(): ids}
+        return None, None
+
+    def parties(self, window, scan: WindowScan) -> dict:
+        return {field: self._first(scan, field)[1] for field in ("party_1_name", "party_2_name")}
+
+    def dates(self, window, scan: WindowScan) -> dict:
+        return {"contract_date": self._first(scan, "contract_date")[1]}
+
+    def amounts(self, window, scan: WindowScan) -> dict:
+        m, amount = self._first(scan, "amount")
+        if m is None:
+            return {}
+        # Валюта — токен валюты той же суммы ("руб."), со ссылкой на его цитаты
+        return {"amount": amount, "currency": {m.group("currency"): scan.index.ids_for_span(*m.span("currency"))}}
+
+    def requisites(self, window, scan: WindowScan) -> dict:
+        return {field: self._first(scan, field)[1] for field in ("requisites.inn", "requisites.kpp", "requisites.ogrn")}
+
+
+def _extract_ner(window, scan=None) -> dict:
+    """Поля NER_FIELDS по сущностям модели NER в окне: первая сущность метки, {текст: [id цитат]}"""
+    matches = entities_to_matches(get_ner_model().predict_windows([window])[0])
+    return {field: matches[label][0] for label, field in NER_FIELDS.items() if matches.get(label)}
+
+
+def build_tracker(ner: bool = CHECK_FILE_NER) -> FieldTracker:
+    """
+    Трекер полей DocsInfo, которые уже умеем извлекать: окно разбирается одним проходом шаблона (scan),
+    экстракторы групп полей вызываются, пока у группы есть незаполненные поля, и учитываются по отдельности.
+    ner — добавить экстрактор NER для полей NER_FIELDS
+    """
+    scanner = WindowScanner()
+    tracker = FieldTracker(scan=scanner.scan)
+    tracker.register("parties", ["party_1_name", "party_2_name"], scanner.parties)
+    tracker.register("dates", ["contract_date"], scanner.dates)
+    tracker.register("amounts", ["amount", "currency"], scanner.amounts)
+    tracker.register("requisites", ["requisites.inn", "requisites.kpp", "requisites.ogrn"], scanner.requisites)
+    if ner:
+        tracker.register("ner", list(NER_FIELDS.values()), _extract_ner)
+    return tracker
+
+
+def get_and_send_processing(document_id: int, content_hash: Optional[str] = None):
+    """
+    Извлекает поля договора документа. Договор, связи с цитатами, реквизиты и processed_hash
+    записываются одной транзакцией: повторная загрузка того же содержимого пропускается, только если
+    обработка завершилась. content_hash — хеш обработанного файла (по умолчанию текущий хеш документа)
+    """
+    with session_scope() as db, count_queries() as queries:
+        repo = ContractRepository(db)
+        with repo.transaction():
+            result = _process_document(repo, document_id)
+            if result is not None:
+                repo.mark_document_processed(document_id, content_hash)
+    # После коммита: закешированные данные договора устарели
+    contract_cache.invalidate(document_id)
+    logger.info("Документ %s: запросов к БД %s, коммитов %s", document_id, queries["statements"], queries["commits"],
+                extra={"document_id": document_id, "stage": "extract", **queries})
+    return result if result is not None else {}
+
+
+def _process_document(repo: ContractRepository, document_id: int) -> Optional[dict]:
+    """Поля договора документа; None, если цитаты документа прочитать не удалось"""
+    merged_dict = defaultdict(list)
+    tracker = build_tracker()
 
+    # Документы, разобранные в компактное хранилище, адресуют цитаты индексом в нем;
+    # старые документы — id строк citations
+    packed = repo.get_citation_store(document_id)
     try:
-        result = repo.get_citations_by_document(document_id)
-    except:
-        return {}
-
-    data = []
-    size = 0
-    count = 0
-    result_processing = []
-    merged_dict = defaultdict(list)
-    not_find = False
-    for citation in result:
-        data.append(([citation.text], citation.id))
-        size += len(citation.text) # type: ignore  (and count <= 20)
-        if size > 900:
-            cleaned_data = [item for item in data if item[0]]  # Пример: убираем пустые строки
-            if cleaned_data:
-                try:
-                    # TODO обработка документа
-                    # Данные поступают в виде [([строка], айди цитаты)], ([], int), ... ]
-                    # пример возвращаемых данных
-                    # "party_1_name": [<ID>, <ID>, <ID>],
-                    # "party_2_name": <ID>,
-
-                    result_skleiki = ''
-                    # склеиваем в строку
-                    for item in cleaned_data:
-                        result_skleiki += str(f" {item[0][0]}")
-
-                    if not_find is False:
-                        party_1_2 = find_party.find_parties(cleaned_data)
-                        if isinstance(party_1_2.get('party_1_name'), dict) and isinstance(party_1_2.get('party_2_name'), dict):
-                            result_processing.append(party_1_2.get('party_1_name'))
-                            result_processing.append(party_1_2.get('party_2_name'))
-                            not_find = True
-
-                    
-                except Exception as e:
-                    print(f'Ошибка - {e}')
-            count += 1
-            size = 0
-            data = []
-
-    for chunk_dict in result_processing:
-        if not isinstance(chunk_dict, dict):
-            logger.error(f"Некорректный формат в result_processing: {chunk_dict}")
-            continue
-        for key, value in chunk_dict.items():
+        citations = packed.iter_texts() if packed is not None else repo.iter_citation_texts(document_id)
+        for window in windows.iter_windows(citations, WINDOW_SIZE, WINDOW_OVERLAP):
+            try:
+                # Данные поступают в виде [([строка], айди цитаты)], ([], int), ... ]
+                # пример возвращаемых данных
+                # "party_1_name": [<ID>, <ID>, <ID>],
+                # "party_2_name": <ID>,
+                tracker.process(window)
+            except Exception as e:
+                logger.warning("Документ %s: ошибка экстрактора: %s: %s", document_id, type(e).__name__, e)
+            if tracker.done:
+                # Все поля найдены — остаток документа не читаем
+                break
+    except Exception as e:
+        logger.warning("Документ %s: не удалось прочитать цитаты: %s: %s", document_id, type(e).__name__, e)
+        return None
+
+    logger.info("Документ %s: найдены поля %s, экстракторы %s", document_id, sorted(tracker.values), tracker.stats())
+
+    for field, found in tracker.values.items():
+        for value in found.values():
             if not isinstance(value, list):
                 value = [value]
-            merged_dict[key].append(value)
-    
+            merged_dict[field].append(value)
+
+    if packed is not None:
+        # Строки citations создаются только для цитат, на которые ссылается договор
+        found_indexes = [index for id_lists in merged_dict.values() for id_list in id_lists for index in id_list]
+        citation_ids = repo.materialize_citations(document_id, packed, found_indexes)
+        for field, id_lists in merged_dict.items():
+            merged_dict[field] = [[citation_ids[index] for index in id_list] for id_list in id_lists]
+
     result = dict(merged_dict)
-    # Получение или создание контракта
-    contract = repo.get_contract_by_document(document_id)
-    if not contract:
-        contract = repo.create_contract(document_id, citation_data=merged_dict)
-    else:
-        repo.update_contract(contract.id, citation_data=merged_dict) # type: ignore
-
-    # Удаление существующих связей перед вставкой новых
-    repo.delete_citation_links(contract.id) # type: ignore
-
-    # Сохранение связей с цитатами с удалением дубликатов
-    links = []
-    seen = set()  # Для отслеживания уникальных комбинаций (contract_id, citation_id)
+    # Договор документа создается или обновляется одним upsert — повторные и параллельные извлечения безопасны
+    contract_id = repo.upsert_contract(document_id, citation_data=result)
+
+    # Связи с цитатами без дубликатов: цитата относится к первому полю, в котором найдена
+    links = {}
     for field_name, id_lists in merged_dict.items():
         for id_list in id_lists:
             for citation_id in id_list:
-                if (contract.id, citation_id) not in seen:
-                    links.append({'citation_id': citation_id, 'field_name': field_name})
-                    seen.add((contract.id, citation_id))
-    if links:
-        repo.bulk_create_citation_links(contract.id, links) # type: ignore
+                links.setdefault(citation_id, field_name)
+    # Меняются только добавленные, удаленные и переименованные связи
+    link_changes = repo.sync_citation_links(contract_id, [
+        {'citation_id': citation_id, 'field_name': field_name} for citation_id, field_name in links.items()
+    ])
+    logger.info("Документ %s: связи с цитатами %s", document_id, link_changes)
+
+    # Реквизиты ссылаются на первую цитату найденного значения
+    requisite_ids = {f"{key}_id": merged_dict[f"requisites.{key}"][0][0] if merged_dict.get(f"requisites.{key}") else None
+                     for key in ("inn", "kpp", "ogrn")}
+    requisites = repo.get_requisites_by_contract(contract_id)
+    if requisites:
+        repo.update_requisites(requisites, **requisite_ids)
+    elif any(requisite_ids.values()):
+        repo.create_requisites(contract_id, **requisite_ids)
 
     # Вместо datetime.now() необходимо передавать когда напомнить
     # set_reminder(result, datetime.now())
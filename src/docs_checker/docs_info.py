@@ -0,0 +1,51 @@
+from typing import Dict, List, Optional
+
+from src.data.schemas.docs_schema import DocsInfo, Requisites
+from src.repositories.contract_repo import ContractRepository
+
+
+def _merge_citations(citations: List[dict]) -> dict:
+    """Одно значение поля из нескольких цитат: тексты подряд, позиция первой, bbox — объединение на ее странице"""
+    first = citations[0]
+    boxes = [c["bbox"] for c in citations if c["bbox"] and c["page"] == first["page"]]
+    bbox = [min(b[0] for b in boxes), min(b[1] for b in boxes), max(b[2] for b in boxes), max(b[3] for b in boxes)] \
+        if boxes else None
+    return {"text": " ".join(c["text"] for c in citations), "page": first["page"], "bbox": bbox,
+            "paragraph_index": first["paragraph_index"], "run_index": first["run_index"]}
+
+
+def build_docs_info(repo: ContractRepository, document_id: int) -> Optional[dict]:
+    """
+    Собирает извлеченные данные договора: поля DocsInfo и цитаты каждого поля с bbox.
+    return: {"document_id", "content_hash", "fields": DocsInfo, "citations": {поле: [цитата, ...]}}
+    или None, если договор по документу еще не извлечен
+    """
+    summary = repo.get_contract_summary(document_id)
+    if summary is None:
+        return None
+    citation_data: Dict[str, List[List[int]]] = summary.citation_data or {}
+
+    ids = [citation_id for id_lists in citation_data.values() for id_list in id_lists for citation_id in id_list]
+    by_id = {row.id: row._asdict() for row in repo.get_citations_by_ids(ids)}
+
+    # Значение поля — первое найденное совпадение; все совпадения отдаются в citations
+    citations = {
+        field: [by_id[citation_id] for id_list in id_lists for citation_id in id_list if citation_id in by_id]
+        for field, id_lists in citation_data.items()
+    }
+    values = {}
+    for field, id_lists in citation_data.items():
+        first_match = [by_id[citation_id] for citation_id in id_lists[0] if citation_id in by_id] if id_lists else []
+        if first_match:
+            values[field] = _merge_citations(first_match)
+
+    requisites = {key: values.pop(f"requisites.{key}", None) for key in Requisites.model_fields}
+    fields = {name: values.get(name) for name in DocsInfo.model_fields if name != "requisites"}
+    fields["requisites"] = requisites if any(requisites.values()) else None
+
+    return {
+        "document_id": document_id,
+        "content_hash": summary.content_hash,
+        "fields": DocsInfo(**fields).model_dump(),
+        "citations": citations,
+    }
@@ -0,0 +1,131 @@
+import os
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from src.docs_checker.ner.labels import decode_entities, window_words
+
+load_dotenv()
+
+NER_MODEL_PATH = os.getenv('NER_MODEL_PATH', '')
+NER_BACKEND = os.getenv('NER_BACKEND', 'torch')  # torch | onnx
+NER_THREADS = int(os.getenv('NER_THREADS', '1'))  # intra-op потоки torch/onnxruntime на процесс
+NER_BATCH_SIZE = int(os.getenv('NER_BATCH_SIZE', '16'))
+NER_MAX_LENGTH = int(os.getenv('NER_MAX_LENGTH', '512'))
+
+
+class BaseNerModel:
+    """
+    Общая часть NER-бэкендов: упаковка окон в батчи по длине с динамическим паддингом
+    и перевод предсказаний сабтокенов обратно в слова и id цитат.
+    Бэкенд задает tokenizer, id2label, return_tensors и _logits.
+    """
+    return_tensors = "pt"
+
+    def __init__(self, batch_size: int = NER_BATCH_SIZE, max_length: int = NER_MAX_LENGTH):
+        self.batch_size = batch_size
+        self.max_length = max_length
+
+    def _encode(self, batch_words: List[List[str]]):
+        return self.tokenizer(
+            batch_words,
+            is_split_into_words=True,
+            truncation=True,
+            max_length=self.max_length,
+            padding="longest",
+            return_tensors=self.return_tensors,
+        )
+
+    def _logits(self, encoding) -> List[List[int]]:
+        """id меток для каждого токена батча"""
+        raise NotImplementedError
+
+    def _predict_batch(self, batch_words: List[List[str]]) -> List[List[str]]:
+        """BIO-метка на каждое слово: берется предсказание первого сабтокена слова"""
+        encoding = self._encode(batch_words)
+        predictions = self._logits(encoding)
+        result = []
+        for i, words in enumerate(batch_words):
+            labels = ["O"] * len(words)  # слова за пределами max_length остаются "O"
+            previous = None
+            for token_index, word_index in enumerate(encoding.word_ids(i)):
+                if word_index is not None and word_index != previous:
+                    labels[word_index] = self.id2label[predictions[i][token_index]]
+                previous = word_index
+            result.append(labels)
+        return result
+
+    def predict_windows(self, windows: List[list]) -> List[List[Dict]]:
+        """
+        Сущности для каждого окна [([строка], id цитаты), ...] в исходном порядке окон.
+        Окна сортируются по числу слов, чтобы в батче было минимум паддинга.
+        """
+        prepared = [window_words(window) for window in windows]
+        order = sorted((i for i in range(len(prepared)) if prepared[i][0]), key=lambda i: len(prepared[i][0]))
+        result: List[List[Dict]] = [[] for _ in windows]
+
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            labels = self._predict_batch([prepared[i][0] for i in batch])
+            for i, window_labels in zip(batch, labels):
+                words, ids = prepared[i]
+                result[i] = decode_entities(words, ids, window_labels)
+        return result
+
+    def predict_documents(self, documents: Dict[int, List[list]]) -> Dict[int, List[Dict]]:
+        """Прогоняет окна сразу нескольких документов общими батчами, возвращает сущности по document_id"""
+        keys = [(document_id, window) for document_id, windows in documents.items() for window in windows]
+        predictions = self.predict_windows([window for _, window in keys])
+        result: Dict[int, List[Dict]] = {document_id: [] for document_id in documents}
+        for (document_id, _), entities in zip(keys, predictions):
+            result[document_id].extend(entities)
+        return result
+
+
+class NerModel(BaseNerModel):
+    """Token-classification модель torch на CPU"""
+
+    def __init__(self, model_path: str, threads: int = NER_THREADS, batch_size: int = NER_BATCH_SIZE,
+                 max_length: int = NER_MAX_LENGTH):
+        import torch
+        from transformers import AutoModelForTokenClassification, AutoTokenizer
+
+        if not model_path:
+            raise ValueError('Необходимо в переменных окружения указать NER_MODEL_PATH!')
+
+        super().__init__(batch_size, max_length)
+        torch.set_num_threads(threads)
+        self.torch = torch
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+        self.model = AutoModelForTokenClassification.from_pretrained(model_path).eval()
+        self.id2label = {int(k): v for k, v in self.model.config.id2label.items()}
+
+    def _logits(self, encoding) -> List[List[int]]:
+        with self.torch.inference_mode():
+            return self.model(**encoding).logits.argmax(-1).tolist()
+
+
+def entities_to_matches(entities: List[Dict]) -> Dict[str, List[dict]]:
+    """Переводит сущности в формат find_party: {метка: [{найденный текст: [id, ...]}, ...]}"""
+    result: Dict[str, List[dict]] = {}
+    for entity in entities:
+        result.setdefault(entity["label"], []).append({entity["text"]: entity["ids"]})
+    return result
+
+
+_model: Optional[BaseNerModel] = None
+
+
+def get_ner_model() -> BaseNerModel:
+    """
+    Модель загружается один раз на процесс воркера и переиспользуется всеми задачами.
+    NER_BACKEND=onnx включает onnxruntime-бэкенд (см. src.docs_checker.ner.onnx_backend).
+    """
+    global _model
+    if _model is None:
+        if NER_BACKEND == "onnx":
+            from src.docs_checker.ner.onnx_backend import OnnxNerModel
+            _model = OnnxNerModel(NER_MODEL_PATH)
+        else:
+            _model = NerModel(NER_MODEL_PATH)
+    return _model
@@ -0,0 +1,45 @@
+import json
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent.parent
+TRAIN_PATH = BASE_DIR / "data" / "train.json"
+
+def load_dataset(path: Path = TRAIN_PATH) -> List[dict]:
+    """Читает разметку в формате train.json: [{"tokens": [...], "ner_tags": [...]}, ...]"""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def window_words(window) -> Tuple[List[str], List[int]]:
+    """Разбивает окно [([строка], id цитаты), ...] на слова и id цитат, из которых они взяты"""
+    words = []
+    ids = []
+    for token, citation_id in window:
+        for word in token[0].split():
+            words.append(word)
+            ids.append(citation_id)
+    return words, ids
+
+
+def decode_entities(words: List[str], ids: List[int], labels: List[str]) -> List[Dict]:
+    """
+    Собирает BIO-метки слов в сущности.
+    return: [{"label": "ORG", "text": "ООО Ромашка", "ids": [id цитат, ...]}, ...]
+    """
+    entities = []
+    current = None
+    for word, citation_id, tag in zip(words, ids, labels):
+        prefix, _, label = tag.partition("-")
+        if prefix == "I" and current and current["label"] == label:
+            current["words"].append(word)
+            current["ids"].add(citation_id)
+            continue
+        if current:
+            entities.append(current)
+            current = None
+        if prefix in ("B", "I"):
+            current = {"label": label, "words": [word], "ids": {citation_id}}
+    if current:
+        entities.append(current)
+    return [{"label": e["label"], "text": " ".join(e["words"]), "ids": sorted(e["ids"])} for e in entities]
@@ -0,0 +1,45 @@
+import os
+from pathlib import Path
+from typing import List
+
+from dotenv import load_dotenv
+
+from src.docs_checker.ner.inference import NER_BATCH_SIZE, NER_MAX_LENGTH, NER_THREADS, BaseNerModel
+
+load_dotenv()
+
+# Какой файл модели брать из каталога экспорта: model.onnx (fp32) или model.int8.onnx
+NER_ONNX_FILE = os.getenv('NER_ONNX_FILE', 'model.int8.onnx')
+
+
+class OnnxNerModel(BaseNerModel):
+    """
+    NER через onnxruntime на CPU; интерфейс тот же, что у NerModel.
+    model_dir — каталог, подготовленный src.docs_checker.ner.onnx_export (onnx-файлы, токенизатор и config.json).
+    """
+    return_tensors = "np"
+
+    def __init__(self, model_dir: str, onnx_file: str = NER_ONNX_FILE, threads: int = NER_THREADS,
+                 batch_size: int = NER_BATCH_SIZE, max_length: int = NER_MAX_LENGTH):
+        import onnxruntime
+        from transformers import AutoConfig, AutoTokenizer
+
+        if not model_dir:
+            raise ValueError('Необходимо в переменных окружения указать NER_MODEL_PATH!')
+
+        super().__init__(batch_size, max_length)
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(
+            str(Path(model_dir) / onnx_file), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        config = AutoConfig.from_pretrained(model_dir)
+        self.id2label = {int(k): v for k, v in config.id2label.items()}
+
+    def _logits(self, encoding) -> List[List[int]]:
+        feeds = {name: encoding[name].astype("int64") for name in self.input_names}
+        return self.session.run(None, feeds)[0].argmax(-1).tolist()
@@ -0,0 +1,120 @@
+"""
+Экспорт token-classification модели в ONNX, динамическое int8-квантование и проверка качества/скорости.
+
+Запуск:
+python -m src.docs_checker.ner.onnx_export --model <каталог модели> --out <каталог экспорта> [--quantize]
+    [--check data/train.json] [--threads 1]
+"""
+import argparse
+import inspect
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from src.docs_checker.ner.inference import NER_THREADS, BaseNerModel, NerModel
+from src.docs_checker.ner.labels import TRAIN_PATH, load_dataset
+
+OPSET = 17
+
+
+def export_onnx(model_path: str, out_dir: str) -> Path:
+    """Экспортирует модель в out_dir/model.onnx с динамическими осями batch/sequence, рядом кладет токенизатор и config"""
+    import torch
+    from transformers import AutoModelForTokenClassification, AutoTokenizer
+
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    model = AutoModelForTokenClassification.from_pretrained(model_path).eval()
+
+    sample = tokenizer([["ООО", "Ромашка"]], is_split_into_words=True, return_tensors="pt")
+    # Имена входов графа сопоставляются позиционно, поэтому порядок берем из сигнатуры forward
+    input_names = [name for name in inspect.signature(model.forward).parameters if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["logits"] = {0: "batch", 1: "sequence"}
+
+    onnx_path = out / "model.onnx"
+    with torch.inference_mode():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            str(onnx_path),
+            input_names=input_names,
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=OPSET,
+            dynamo=False,
+        )
+    tokenizer.save_pretrained(out)
+    model.config.save_pretrained(out)
+    return onnx_path
+
+
+def quantize_int8(onnx_path: Path) -> Path:
+    """Динамическое int8-квантование весов (активации остаются fp32)"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantized = onnx_path.with_name("model.int8.onnx")
+    quantize_dynamic(str(onnx_path), str(quantized), weight_type=QuantType.QInt8)
+    return quantized
+
+
+def evaluate(model: BaseNerModel, dataset: List[dict]) -> Dict[str, float]:
+    """
+    seqeval F1/recall на разметке формата train.json и скорость предсказания.
+    return: {"f1", "precision", "recall", "seconds", "sentences_per_second"}
+    """
+    from seqeval.metrics import f1_score, precision_score, recall_score
+
+    sentences = [item["tokens"] for item in dataset]
+    expected = [item["ner_tags"] for item in dataset]
+    predicted = []
+    started = time.perf_counter()
+    for start in range(0, len(sentences), model.batch_size):
+        predicted.extend(model._predict_batch(sentences[start:start + model.batch_size]))
+    seconds = time.perf_counter() - started
+    return {
+        "f1": f1_score(expected, predicted),
+        "precision": precision_score(expected, predicted),
+        "recall": recall_score(expected, predicted),
+        "seconds": seconds,
+        "sentences_per_second": len(sentences) / seconds if seconds else 0.0,
+    }
+
+
+def main():
+    from src.docs_checker.ner.onnx_backend import OnnxNerModel
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", required=True)
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--quantize", action="store_true")
+    parser.add_argument("--check", default=str(TRAIN_PATH))
+    parser.add_argument("--threads", type=int, default=NER_THREADS)
+    args = parser.parse_args()
+
+    onnx_path = export_onnx(args.model, args.out)
+    print(f"ONNX: {onnx_path}")
+    files = [onnx_path.name]
+    if args.quantize:
+        files.append(quantize_int8(onnx_path).name)
+        print(f"int8: {Path(args.out) / files[-1]}")
+
+    dataset = load_dataset(Path(args.check))
+    candidates = {"torch": NerModel(args.model, threads=args.threads)}
+    for name in files:
+        candidates[name] = OnnxNerModel(args.out, onnx_file=name, threads=args.threads)
+
+    baseline = None
+    for name, model in candidates.items():
+        evaluate(model, dataset[:model.batch_size])  # прогрев
+        metrics = evaluate(model, dataset)
+        baseline = baseline or metrics
+        print(
+            f"{name:18} F1={metrics['f1']:.4f} recall={metrics['recall']:.4f} "
+            f"{metrics['sentences_per_second']:.1f} предл/с (x{metrics['sentences_per_second'] / baseline['sentences_per_second']:.2f})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from src.data.schemas.docs_schema import DocsInfo, Requisites
+
+# Все однозначные поля DocsInfo; реквизиты раскрываются в requisites.inn / requisites.kpp / requisites.ogrn
+DOCS_FIELDS = [
+    f"requisites.{sub}" if name == "requisites" else name
+    for name in DocsInfo.model_fields
+    for sub in (Requisites.model_fields if name == "requisites" else [None])
+]
+
+
+class FieldTracker:
+    """
+    Отслеживает заполнение полей DocsInfo при проходе по окнам документа.
+    Экстрактор вызывается, только пока хотя бы одно из его полей не заполнено;
+    когда заполнены все поля, для которых есть экстракторы, документ можно дальше не читать.
+    С общим разбором scan окно разбирается один раз для всех экстракторов: scan(window, незаполненные поля)
+    вызывается перед ними, его время и вызовы учитываются под именем "scan".
+    """
+
+    def __init__(self, scan: Optional[Callable[[list, List[str]], Any]] = None):
+        self.values: Dict[str, dict] = {}
+        self._extractors: List[tuple] = []
+        self._scan = scan
+        self.timings: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        if scan is not None:
+            self.timings["scan"] = 0.0
+            self.calls["scan"] = 0
+
+    def register(self, name: str, fields: List[str], extractor: Callable[..., dict]) -> None:
+        """
+        Регистрирует экстрактор для полей fields.
+        extractor(window) — или extractor(window, результат scan) при общем разборе —
+        возвращает {поле: {найденный текст: [id, ...]} или None}
+        """
+        unknown = set(fields) - set(DOCS_FIELDS)
+        if unknown:
+            raise ValueError(f"Неизвестные поля DocsInfo: {sorted(unknown)}")
+        self._extractors.append((name, fields, extractor))
+        self.timings.setdefault(name, 0.0)
+        self.calls.setdefault(name, 0)
+
+    def is_resolved(self, field: str) -> bool:
+        return field in self.values
+
+    @property
+    def done(self) -> bool:
+        """Все поля, которые умеют заполнять зарегистрированные экстракторы, найдены"""
+        return all(self.is_resolved(field) for _, fields, _ in self._extractors for field in fields)
+
+    def process(self, window: list) -> None:
+        """Прогоняет окно через экстракторы с незаполненными полями"""
+        active = [item for item in self._extractors if not all(self.is_resolved(field) for field in item[1])]
+        if not active:
+            return
+        args = (window,)
+        if self._scan is not None:
+            missing = [field for _, fields, _ in active for field in fields if not self.is_resolved(field)]
+            args = (window, self._timed("scan", self._scan, window, missing))
+        for name, fields, extractor in active:
+            found = self._timed(name, extractor, *args)
+            for field in fields:
+                value = found.get(field)
+                if value and not self.is_resolved(field):
+                    self.values[field] = value
+
+    def _timed(self, name: str, func: Callable, *args) -> Any:
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.timings[name] += time.perf_counter() - started
+            self.calls[name] += 1
+
+    def get(self, field: str) -> Optional[dict]:
+        return self.values.get(field)
+
+    def stats(self) -> Dict[str, dict]:
+        """Счетчики по экстракторам: число вызовов и суммарное время в секундах"""
+        return {name: {"calls": self.calls[name], "seconds": round(self.timings[name], 6)}
+                for name in self.timings}
@@ -1,18 +1,154 @@
 import re
+from array import array
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from typing import FrozenSet, List, Optional
+
+# Все шаблоны компилируются один раз при импорте модуля
+PARTY_PATTERN = (
+    r"Индивидуальный предприниматель\s+[А-ЯЁ][а-яё]+\s+[А-ЯЁ]\.[А-ЯЁ]\.|"
+    r"ИП\s+[А-ЯЁ][а-яё]+(?:\s+[А-ЯЁ][а-яё]+){1,2}|"
+    r"(?:Общество с ограниченной ответственностью|ООО)\s+«[^»]+»|"
+    r"(?:Акционерное общество|АО)\s+«[^»]+»|"
+    r"(?:Публичное акционерное общество|ПАО)\s+«[^»]+»|"
+    r"(?:Закрытое акционерное общество|ЗАО)\s+«[^»]+»|"
+    r"(?:Федеральное государственное унитарное предприятие|ФГУП)\s+«[^»]+»|"
+    r"(?:Государственное унитарное предприятие|ГУП)\s+«[^»]+»"
+)
+DATE_PATTERN = (
+    r"\b\d{1,2}\s+(?:января|февраля|марта|апреля|мая|июня|июля|августа|сентября|октября|ноября|декабря)\s+\d{4}\b"
+    r"|\b\d{2}\.\d{2}\.\d{4}\b"
+)
+# «рублей» раньше «руб»: иначе альтернатива обрывает слово на «руб»
+CURRENCY_PATTERN = r"рублей|руб\.?|₽"
+AMOUNT_PATTERN = rf"\d[\d\s]{{0,15}}(?:{CURRENCY_PATTERN})"
+REQUISITE_PATTERNS = {
+    "inn": r"\b\d{10}\b|\b\d{12}\b",
+    "kpp": r"\b\d{9}\b",
+    "account": r"\b\d{20}\b",
+    "bik": r"\b\d{9}\b",
+    "ogrn": r"\b\d{13}\b|\b\d{15}\b"
+}
+
+_party_re = re.compile(f"(?:{PARTY_PATTERN})", re.IGNORECASE)
+_date_re = re.compile(DATE_PATTERN)
+_amount_re = re.compile(AMOUNT_PATTERN)
+_requisite_res = {key: re.compile(pat) for key, pat in REQUISITE_PATTERNS.items()}
+
+# Объединенный шаблон для извлечения всех полей за один проход.
+# Порядок альтернатив задает приоритет при пересечении: сумма с валютой важнее голого числа.
+# Валюта — вложенная группа суммы (lastgroup остается amount).
+# Реквизиты ищутся одной группой цифр и раскладываются по полям по длине (13/15 — ОГРН/ОГРНИП).
+MATCH_KINDS = ("party", "date", "amount", "digits")
+_KIND_PATTERNS = {
+    "party": f"(?P<party>(?i:{PARTY_PATTERN}))",
+    "date": f"(?P<date>{DATE_PATTERN})",
+    "amount": rf"(?P<amount>\d[\d\s]{{0,15}}(?P<currency>{CURRENCY_PATTERN}))",
+    "digits": r"(?P<digits>\b(?:\d{20}|\d{15}|\d{13}|\d{12}|\d{10}|\d{9})\b)",
+}
+DIGITS_FIELDS = {9: ("kpp", "bik"), 10: ("inn",), 12: ("inn",), 13: ("ogrn",), 15: ("ogrn",), 20: ("account",)}
+
+
+@lru_cache(maxsize=None)
+def combined_pattern(kinds: FrozenSet[str]) -> "re.Pattern[str]":
+    """Объединенный шаблон только из альтернатив kinds (порядок приоритета — как в MATCH_KINDS)"""
+    return re.compile("|".join(_KIND_PATTERNS[kind] for kind in MATCH_KINDS if kind in kinds))
+
+
+_combined_re = combined_pattern(frozenset(MATCH_KINDS))
+
+
+class TextIndex:
+    """
+    Склеенный текст чанков и компактная карта смещений -> id.
+    Вместо списка на каждый символ хранит границы токенов в array и ищет по ним bisect.
+    """
+    __slots__ = ("text", "starts", "ends", "ids")
+
+    def __init__(self, data):
+        parts = []
+        self.starts = array("l")
+        self.ends = array("l")
+        self.ids = array("l")
+        offset = 0
+        for token, tid in data:
+            token = token[0]
+            if parts:  # пробел перед новым токеном
+                parts.append(" ")
+                offset += 1
+            parts.append(token)
+            if token and tid is not None:
+                self.starts.append(offset)
+                self.ends.append(offset + len(token))
+                self.ids.append(tid)
+            offset += len(token)
+        self.text = "".join(parts)
+
+    def ids_for_span(self, start: int, end: int) -> list:
+        """id токенов, пересекающихся с диапазоном символов [start, end)"""
+        lo = bisect_right(self.ends, start)
+        hi = bisect_left(self.starts, end)
+        return sorted(set(self.ids[lo:hi]))
+
 
 def _flatten_data(data):
-    """Склеивает чанки в строку и строит карту символов -> id"""
-    text = ""
-    char_to_id = []
-    for token, tid in data:
-        token = token[0]
-        if text:  # пробел перед новым токеном
-            text += " "
-            char_to_id.append(None)
-        for ch in token:
-            text += ch
-            char_to_id.append(tid)
-    return text, char_to_id
+    """Склеивает чанки в строку и строит карту смещений -> id"""
+    return TextIndex(data)
+
+
+# Сколько символов после названия стороны просматривается в поисках ее роли
+PARTY_CONTEXT = 80
+
+
+def party_roles(text: str, m) -> List[str]:
+    """Роли стороны по контексту после совпадения, в порядке приоритета: party_1_name (Исполнитель), party_2_name"""
+    context = text[m.end():m.end() + PARTY_CONTEXT]
+    return [role for role, word in (("party_1_name", "Исполнитель"), ("party_2_name", "Заказчик")) if word in context]
+
+
+def _add_party(result, index: TextIndex, m) -> None:
+    """Определяет роль стороны по контексту после совпадения"""
+    for role in party_roles(index.text, m):
+        if result[role] is None:
+            result[role] = {m.group(): index.ids_for_span(*m.span())} # type: ignore
+            return
+
+
+def _collect(index: TextIndex, pattern) -> list:
+    return [{m.group(): index.ids_for_span(*m.span())} for m in pattern.finditer(index.text)]
+
+
+def extract_fields(data, index: Optional[TextIndex] = None) -> dict:
+    """
+    Извлекает стороны, даты, суммы и реквизиты за один проход объединенного шаблона.
+    return: dict {"parties": {...}, "dates": [...], "amounts": [...], "currencies": [...], "requisites": {...}}
+    в тех же форматах, что и find_parties / find_dates / find_amounts / find_requisites;
+    currencies[i] — валюта суммы amounts[i] ({"руб.": [id, ...]})
+    """
+    index = index or _flatten_data(data)
+    parties = {"party_1_name": None, "party_2_name": None}
+    dates = []
+    amounts = []
+    currencies = []
+    requisites = {k: [] for k in REQUISITE_PATTERNS}
+
+    for m in _combined_re.finditer(index.text):
+        kind = m.lastgroup
+        if kind == "party":
+            _add_party(parties, index, m)
+            continue
+        found = {m.group(): index.ids_for_span(*m.span())}
+        if kind == "date":
+            dates.append(found)
+        elif kind == "amount":
+            amounts.append(found)
+            currencies.append({m.group("currency"): index.ids_for_span(*m.span("currency"))})
+        else:
+            for key in DIGITS_FIELDS[len(m.group())]:
+                requisites[key].append(found)
+
+    return {"parties": parties, "dates": dates, "amounts": amounts, "currencies": currencies,
+            "requisites": requisites}
 
 
 def find_parties(data):
@@ -20,33 +156,11 @@ def find_parties(data):
     Находит стороны договора (ИП, ООО, АО и т.д.).
     return: dict с party_1_name, party_2_name
     """
-    text, char_to_id = _flatten_data(data)
-
-    pattern = re.compile(
-        r"(?:"
-        r"Индивидуальный предприниматель\s+[А-ЯЁ][а-яё]+\s+[А-ЯЁ]\.[А-ЯЁ]\.|"
-        r"ИП\s+[А-ЯЁ][а-яё]+(?:\s+[А-ЯЁ][а-яё]+){1,2}|"
-        r"(?:Общество с ограниченной ответственностью|ООО)\s+«[^»]+»|"
-        r"(?:Акционерное общество|АО)\s+«[^»]+»|"
-        r"(?:Публичное акционерное общество|ПАО)\s+«[^»]+»|"
-        r"(?:Закрытое акционерное общество|ЗАО)\s+«[^»]+»|"
-        r"(?:Федеральное государственное унитарное предприятие|ФГУП)\s+«[^»]+»|"
-        r"(?:Государственное унитарное предприятие|ГУП)\s+«[^»]+»"
-        r")",
-        re.IGNORECASE
-    )
-
+    index = _flatten_data(data)
     result = {"party_1_name": None, "party_2_name": None}
 
-    for m in pattern.finditer(text):
-        start, end = m.span()
-        matched_ids = sorted(set(i for i in char_to_id[start:end] if i))
-        context = text[end:end+80]
-
-        if "Исполнитель" in context and result["party_1_name"] is None:
-            result["party_1_name"] = {m.group(): matched_ids} # type: ignore
-        elif "Заказчик" in context and result["party_2_name"] is None:
-            result["party_2_name"] = {m.group(): matched_ids} # type: ignore
+    for m in _party_re.finditer(index.text):
+        _add_party(result, index, m)
 
     return result
 
@@ -56,20 +170,7 @@ def find_dates(data):
     Находит даты в договоре.
     return: list словарей {"date": "строка", "ids": [int, ...]}
     """
-    text, char_to_id = _flatten_data(data)
-
-    pattern = re.compile(
-        r"\b\d{1,2}\s+(?:января|февраля|марта|апреля|мая|июня|июля|августа|сентября|октября|ноября|декабря)\s+\d{4}\b"
-        r"|\b\d{2}\.\d{2}\.\d{4}\b"
-    )
-
-    result = []
-    for m in pattern.finditer(text):
-        start, end = m.span()
-        matched_ids = sorted(set(i for i in char_to_id[start:end] if i))
-        result.append({m.group(): matched_ids})
-
-    return result
+    return _collect(_flatten_data(data), _date_re)
 
 
 def find_amounts(data):
@@ -77,38 +178,13 @@ def find_amounts(data):
     Находит суммы денег.
     return: list словарей {"amount": "строка", "ids": [int, ...]}
     """
-    text, char_to_id = _flatten_data(data)
-
-    pattern = re.compile(r"\d[\d\s]{0,15}(?:руб\.?|рублей|₽)")
-    result = []
-    for m in pattern.finditer(text):
-        start, end = m.span()
-        matched_ids = sorted(set(i for i in char_to_id[start:end] if i))
-        result.append({m.group(): matched_ids})
-
-    return result
+    return _collect(_flatten_data(data), _amount_re)
 
 
 def find_requisites(data):
     """
-    Находит реквизиты: ИНН, КПП, р/с, БИК.
-    return: dict { "inn": [...], "kpp": [...], "account": [...], "bik": [...] }
+    Находит реквизиты: ИНН, КПП, р/с, БИК, ОГРН.
+    return: dict { "inn": [...], "kpp": [...], "account": [...], "bik": [...], "ogrn": [...] }
     """
-    text, char_to_id = _flatten_data(data)
-
-    regexes = {
-        "inn": r"\b\d{10}\b|\b\d{12}\b",
-        "kpp": r"\b\d{9}\b",
-        "account": r"\b\d{20}\b",
-        "bik": r"\b\d{9}\b"
-    }
-
-    result = {k: [] for k in regexes}
-
-    for key, pat in regexes.items():
-        for m in re.finditer(pat, text):
-            start, end = m.span()
-            matched_ids = sorted(set(i for i in char_to_id[start:end] if i))
-            result[key].append({m.group(): matched_ids})
-
-    return result
+    index = _flatten_data(data)
+    return {key: _collect(index, pattern) for key, pattern in _requisite_res.items()}
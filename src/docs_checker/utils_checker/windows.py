@@ -0,0 +1,44 @@
+from collections import deque
+from typing import Iterable, Iterator, List, Tuple
+
+
+def iter_windows(citations: Iterable[Tuple[int, str]], size: int = 900,
+                 overlap: int = 200) -> Iterator[List[Tuple[List[str], int]]]:
+    """
+    Скользящее окно по цитатам документа.
+    citations: поток (id, text); окна отдаются в формате find_party: [([строка], id цитаты), ...].
+    Окно закрывается, когда набрано size символов; следующее начинается с цитат, покрывающих
+    последние overlap символов, поэтому совпадения на границе окон не теряются. Хвост документа
+    отдается последним окном, даже если он короче size.
+    """
+    if overlap >= size:
+        raise ValueError("overlap должен быть меньше size")
+
+    window = deque()
+    length = 0
+    pending = False  # есть цитаты, еще не попавшие ни в одно отданное окно
+
+    for citation_id, text in citations:
+        if not text:
+            continue
+        window.append(([text], citation_id))
+        length += len(text) + 1
+        pending = True
+
+        if length >= size:
+            yield list(window)
+            pending = False
+            # Оставляем в окне хвост из последних overlap символов. Цитата длиннее overlap
+            # или выводящая хвост за size не переносится, иначе она повторялась бы в каждом окне
+            tail = deque()
+            length = 0
+            while window and length < overlap:
+                item_length = len(window[-1][0][0]) + 1
+                if item_length > overlap or length + item_length > size:
+                    break
+                tail.appendleft(window.pop())
+                length += item_length
+            window = tail
+
+    if pending:
+        yield list(window)
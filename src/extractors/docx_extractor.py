@@ -0,0 +1,157 @@
+import os
+import zipfile
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+from dotenv import load_dotenv
+from lxml import etree
+
+load_dotenv()
+
+# stream — потоковый разбор word/document.xml через lxml.iterparse; python-docx — прежний разбор деревом объектов
+DOCX_BACKEND = os.getenv('DOCX_BACKEND', 'stream')
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_P, _R, _T, _TAB, _BR, _CR, _NO_BREAK_HYPHEN = (
+    f"{_W}p", f"{_W}r", f"{_W}t", f"{_W}tab", f"{_W}br", f"{_W}cr", f"{_W}noBreakHyphen")
+_TBL, _TR, _TC, _V_MERGE, _H_MERGE = f"{_W}tbl", f"{_W}tr", f"{_W}tc", f"{_W}vMerge", f"{_W}hMerge"
+_VAL = f"{_W}val"
+_RUN_TEXT = {_TAB: "\t", _BR: "\n", _CR: "\n", _NO_BREAK_HYPHEN: "-"}
+
+
+class DocxRun(NamedTuple):
+    """Непустой run DOCX в порядке документа"""
+    text: str                   # Текст run без пробелов по краям
+    paragraph_index: int        # Номер непустого параграфа в документе (параграфы ячеек считаются тоже)
+    run_index: int              # Номер непустого run в параграфе
+    table: Optional[int] = None  # Номер таблицы в документе (вложенные считаются), None вне таблиц
+    row: Optional[int] = None
+    cell: Optional[int] = None   # Номер ячейки w:tc в строке: объединенная по gridSpan ячейка — одна
+
+
+def load_backend():
+    """Бэкенд DOCX для реестра ресурсов воркера: python-docx импортируется только когда выбран он"""
+    if DOCX_BACKEND == "python-docx":
+        from docx import Document
+        return Document
+    return etree.iterparse
+
+
+def _run_text(run) -> str:
+    # Только прямые потомки run: текст надписей внутри w:drawing приходит отдельными параграфами,
+    # удаленный в рецензировании текст (w:delText) и коды полей (w:instrText) не входят
+    parts = []
+    for child in run:
+        if child.tag == _T:
+            parts.append(child.text or "")
+        else:
+            parts.append(_RUN_TEXT.get(child.tag, ""))
+    return "".join(parts)
+
+
+def _is_continuation(merge) -> bool:
+    """vMerge/hMerge без val="restart" — продолжение объединенной ячейки, ее текст уже отдала первая"""
+    return merge.get(_VAL, "continue") != "restart"
+
+
+def _release(elem) -> None:
+    # Разобранный элемент и уже пройденные соседи больше не нужны: дерево не растет с размером документа
+    elem.clear()
+    parent = elem.getparent()
+    if parent is not None:
+        while elem.getprevious() is not None:
+            del parent[0]
+
+
+def iter_docx_runs(file_path: str) -> Iterator[DocxRun]:
+    """
+    Потоково разбирает word/document.xml прямо из архива DOCX: параграфы тела и ячеек таблиц
+    отдаются в порядке документа, разобранные элементы сразу освобождаются.
+    Продолжения вертикально объединенных ячеек пропускаются, горизонтальное объединение (gridSpan) —
+    одна ячейка w:tc, поэтому текст объединенной ячейки отдается один раз; в ячейке учитываются все параграфы.
+    """
+    paragraph_index = 0
+    tables: List[List[int]] = []  # Стек открытых таблиц: [номер таблицы, строка, ячейка]
+    skipped: List[bool] = []      # Стек открытых ячеек: продолжение объединенной ячейки
+    table_count = 0
+    with zipfile.ZipFile(file_path) as archive, archive.open("word/document.xml") as xml:
+        events = etree.iterparse(xml, events=("start", "end"), tag=(_P, _TBL, _TR, _TC, _V_MERGE, _H_MERGE),
+                                 resolve_entities=False, huge_tree=True)
+        for event, elem in events:
+            tag = elem.tag
+            if event == "start":
+                if tag == _TBL:
+                    tables.append([table_count, -1, -1])
+                    table_count += 1
+                elif tag == _TR:
+                    tables[-1][1] += 1
+                    tables[-1][2] = -1
+                elif tag == _TC:
+                    tables[-1][2] += 1
+                    skipped.append(False)
+                continue
+
+            if tag == _P:
+                if not any(skipped):
+                    position = tuple(tables[-1]) if tables else ()
+                    run_index = 0
+                    # Runs вложенных параграфов (надписи) уже отданы и очищены, сюда не попадут
+                    for run in elem.iter(_R):
+                        text = _run_text(run).strip()
+                        if text:
+                            yield DocxRun(text, paragraph_index, run_index, *position)
+                            run_index += 1
+                    if run_index:
+                        paragraph_index += 1
+                _release(elem)
+            elif tag in (_V_MERGE, _H_MERGE):
+                # Свойства ячейки (w:tcPr) идут раньше ее параграфов
+                if skipped and _is_continuation(elem):
+                    skipped[-1] = True
+            elif tag == _TC:
+                skipped.pop()
+                _release(elem)
+            elif tag == _TR:
+                _release(elem)
+            elif tag == _TBL:
+                tables.pop()
+                _release(elem)
+
+
+def iter_docx_citations(file_path: str) -> Iterator[Dict[str, Any]]:
+    """Цитаты DOCX в формате записи citations (потоковый разбор)"""
+    for run in iter_docx_runs(file_path):
+        yield {"text": run.text, "page": 0, "bbox": None,
+               "paragraph_index": run.paragraph_index, "run_index": run.run_index}
+
+
+def iter_python_docx_citations(file_path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Прежний разбор через python-docx (DOCX_BACKEND=python-docx): весь документ строится деревом объектов,
+    сначала параграфы тела, затем ячейки таблиц (только первый параграф ячейки)
+    """
+    from docx import Document
+    doc = Document(file_path)
+    paragraph_index = 0
+    for para in doc.paragraphs:
+        if para.text.strip():
+            run_index = 0
+            for run in para.runs:
+                run_text = run.text.strip()
+                if run_text:
+                    yield {"text": run_text, "page": 0, "bbox": None,
+                           "paragraph_index": paragraph_index, "run_index": run_index}
+                    run_index += 1
+            paragraph_index += 1
+
+    for table in doc.tables:
+        for row in table.rows:
+            for cell in row.cells:
+                if cell.text.strip():
+                    run_index = 0
+                    for run in cell.paragraphs[0].runs:
+                        run_text = run.text.strip()
+                        if run_text:
+                            yield {"text": run_text, "page": 0, "bbox": None,
+                                   "paragraph_index": paragraph_index, "run_index": run_index}
+                            run_index += 1
+                paragraph_index += 1
@@ -0,0 +1,171 @@
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pymupdf
+from dotenv import load_dotenv
+
+from src.extractors.pdf_extractor import PdfPage
+
+load_dotenv()
+
+OCR_ENGINE = os.getenv('OCR_ENGINE', 'tesseract')  # tesseract | paddle
+OCR_DPI = int(os.getenv('OCR_DPI', '300'))
+OCR_LANG = os.getenv('OCR_LANG', 'rus+eng')
+OCR_WORKERS = int(os.getenv('OCR_WORKERS', '2'))
+OCR_CACHE_DIR = os.getenv('OCR_CACHE_DIR', '.ocr_cache')
+
+_paddle = None
+
+
+def is_scanned(page: PdfPage) -> bool:
+    """Страница без текстового слоя, но с изображениями"""
+    return not page.text.strip() and page.images > 0
+
+
+def _tesseract_words(png: bytes, lang: str) -> List[Tuple[tuple, str, list]]:
+    """Слова tesseract: ((block, paragraph), текст, bbox в пикселях)"""
+    import pytesseract
+    from PIL import Image
+
+    data = pytesseract.image_to_data(Image.open(io.BytesIO(png)), lang=lang, output_type=pytesseract.Output.DICT)
+    words = []
+    for i, text in enumerate(data["text"]):
+        if data["level"][i] != 5 or not text.strip() or float(data["conf"][i]) < 0:
+            continue
+        left, top = data["left"][i], data["top"][i]
+        words.append((
+            (data["block_num"][i], data["par_num"][i]),
+            text.strip(),
+            [left, top, left + data["width"][i], top + data["height"][i]],
+        ))
+    return words
+
+
+def _paddle_words(png: bytes, lang: str) -> List[Tuple[tuple, str, list]]:
+    """Строки PaddleOCR (он распознает строками, а не словами): каждая строка — отдельный параграф"""
+    global _paddle
+    import numpy as np
+    from PIL import Image
+    from paddleocr import PaddleOCR
+
+    if _paddle is None:
+        _paddle = PaddleOCR(lang="ru" if "rus" in lang else "en", show_log=False)
+    image = np.array(Image.open(io.BytesIO(png)).convert("RGB"))
+    words = []
+    for line_num, (box, (text, _)) in enumerate((_paddle.ocr(image, cls=False) or [[]])[0] or []):
+        xs = [point[0] for point in box]
+        ys = [point[1] for point in box]
+        words.append(((line_num, 0), text.strip(), [min(xs), min(ys), max(xs), max(ys)]))
+    return words
+
+
+_ENGINES = {"tesseract": _tesseract_words, "paddle": _paddle_words}
+
+
+def _cache_path(cache_dir: str, image_hash: str, engine: str, dpi: int) -> Path:
+    return Path(cache_dir) / engine / str(dpi) / f"{image_hash}.json"
+
+
+def _to_page(page_num: int, words: List[Tuple[tuple, str, list]], dpi: int) -> PdfPage:
+    """Переводит слова OCR в spans того же формата, что у PyMuPDF; bbox из пикселей в пункты PDF"""
+    scale = 72 / dpi
+    paragraphs: Dict[tuple, int] = {}
+    run_indexes: Dict[int, int] = {}
+    spans = []
+    lines = []
+    for key, text, bbox in words:
+        if not text:
+            continue
+        paragraph_index = paragraphs.setdefault(key, len(paragraphs))
+        run_index = run_indexes.get(paragraph_index, 0)
+        run_indexes[paragraph_index] = run_index + 1
+        spans.append({
+            "text": text,
+            "page": page_num + 1,
+            "bbox": [round(coord * scale, 2) for coord in bbox],
+            "paragraph_index": paragraph_index,
+            "run_index": run_index,
+        })
+        lines.append(text)
+    text = " ".join(lines) + "\n" if lines else ""
+    return PdfPage(page_num + 1, text, spans, len(paragraphs), 0)
+
+
+def _ocr_page(file_path: str, page_num: int, dpi: int, engine: str, lang: str, cache_dir: str) -> PdfPage:
+    """
+    Рендерит страницу и распознает ее; выполняется в дочернем процессе.
+    Результат кешируется на диске по (хеш изображения, движок, dpi).
+    """
+    with pymupdf.open(file_path) as doc:
+        png = doc.load_page(page_num).get_pixmap(dpi=dpi).tobytes("png")
+
+    cache_file = _cache_path(cache_dir, hashlib.sha256(png).hexdigest(), engine, dpi)
+    if cache_file.exists():
+        words = json.loads(cache_file.read_text(encoding="utf-8"))
+        return _to_page(page_num, [(tuple(key), text, bbox) for key, text, bbox in words], dpi)
+
+    words = _ENGINES[engine](png, lang)
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+    tmp_file.write_text(json.dumps(words, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp_file, cache_file)
+    return _to_page(page_num, words, dpi)
+
+
+def load_backend() -> str:
+    """Бэкенд OCR для реестра ресурсов воркера: проверяет, что движок установлен"""
+    if OCR_ENGINE == "tesseract":
+        import pytesseract
+        pytesseract.get_tesseract_version()
+    elif OCR_ENGINE == "paddle":
+        import paddleocr  # noqa: F401
+    else:
+        raise ValueError(f"Неизвестный OCR_ENGINE: {OCR_ENGINE}")
+    return OCR_ENGINE
+
+
+def iter_ocr_pages(file_path: str, pages: List[int], paragraph_offset: int = 0,
+                   workers: Optional[int] = None, dpi: Optional[int] = None,
+                   engine: Optional[str] = None) -> Iterator[PdfPage]:
+    """
+    Распознает страницы pages (номера с 1) и отдает их в порядке документа.
+    Одновременно в ProcessPoolExecutor не больше 2 * workers страниц; paragraph_index продолжает
+    сквозную нумерацию с paragraph_offset.
+    """
+    workers = workers or OCR_WORKERS
+    dpi = dpi or OCR_DPI
+    engine = engine or OCR_ENGINE
+    args = [(file_path, page - 1, dpi, engine, OCR_LANG, OCR_CACHE_DIR) for page in pages]
+
+    def renumber(page: PdfPage) -> PdfPage:
+        nonlocal paragraph_offset
+        for span in page.spans:
+            span["paragraph_index"] += paragraph_offset
+        paragraph_offset += page.blocks
+        return page
+
+    if workers <= 1 or len(args) <= 1 or multiprocessing.current_process().daemon:
+        for page_args in args:
+            yield renumber(_ocr_page(*page_args))
+        return
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(args))) as pool:
+        pending = deque()
+        args_iter = iter(args)
+        for page_args in args_iter:
+            pending.append(pool.submit(_ocr_page, *page_args))
+            if len(pending) >= 2 * workers:
+                break
+        while pending:
+            page = pending.popleft().result()
+            next_args = next(args_iter, None)
+            if next_args:
+                pending.append(pool.submit(_ocr_page, *next_args))
+            yield renumber(page)
@@ -0,0 +1,122 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import pymupdf
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Сколько процессов извлекают страницы параллельно и сколько страниц отдается одному процессу за раз
+PDF_WORKERS = int(os.getenv('PDF_WORKERS', str(os.cpu_count() or 1)))
+PDF_PAGES_PER_TASK = int(os.getenv('PDF_PAGES_PER_TASK', '16'))
+
+
+class PdfPage(NamedTuple):
+    """Результат разбора одной страницы PDF"""
+    page: int                    # Номер страницы (с 1)
+    text: str                    # Текст страницы, собранный из того же прохода get_text("dict")
+    spans: List[Dict[str, Any]]  # Spans в формате цитаты: text, page, bbox, paragraph_index, run_index
+    blocks: int                  # Количество текстовых блоков на странице
+    images: int = 0              # Количество блоков-изображений (страница без текста и с картинками — скан)
+
+
+def _page_ranges(page_count: int, pages_per_task: int) -> List[Tuple[int, int]]:
+    """Делит документ на диапазоны страниц [start, stop)"""
+    return [(start, min(start + pages_per_task, page_count)) for start in range(0, page_count, pages_per_task)]
+
+
+def _parse_page(page, page_num: int) -> PdfPage:
+    """Разбирает страницу одним вызовом get_text("dict"); paragraph_index считается от начала страницы"""
+    lines_text = []
+    spans = []
+    paragraph_index = 0
+    images = 0
+    for block in page.get_text("dict")["blocks"]:
+        if block["type"] != 0:
+            images += block["type"] == 1
+            continue
+        run_index = 0
+        for line in block["lines"]:
+            lines_text.append("".join(span["text"] for span in line["spans"]))
+            for span in line["spans"]:
+                span_text = span["text"].strip()
+                if span_text:
+                    spans.append({
+                        "text": span_text,
+                        "page": page_num + 1,
+                        "bbox": list(span["bbox"]),
+                        "paragraph_index": paragraph_index,
+                        "run_index": run_index,
+                    })
+                    run_index += 1
+        paragraph_index += 1
+    text = "\n".join(lines_text) + "\n" if lines_text else ""
+    return PdfPage(page_num + 1, text, spans, paragraph_index, images)
+
+
+def _extract_range(file_path: str, start: int, stop: int) -> List[PdfPage]:
+    """Извлекает страницы [start, stop); выполняется в дочернем процессе со своим дескриптором pymupdf"""
+    doc = pymupdf.open(file_path)
+    try:
+        return [_parse_page(doc.load_page(page_num), page_num) for page_num in range(start, stop)]
+    finally:
+        doc.close()
+
+
+def _renumber(pages: List[PdfPage], paragraph_offset: int) -> Tuple[List[PdfPage], int]:
+    """Переводит paragraph_index страниц в сквозную нумерацию по документу"""
+    result = []
+    for page in pages:
+        for span in page.spans:
+            span["paragraph_index"] += paragraph_offset
+        paragraph_offset += page.blocks
+        result.append(page)
+    return result, paragraph_offset
+
+
+def load_backend():
+    """Бэкенд PDF для реестра ресурсов воркера (импорт pymupdf происходит один раз на процесс)"""
+    return pymupdf
+
+
+def page_count(file_path: str) -> int:
+    """Возвращает количество страниц PDF"""
+    with pymupdf.open(file_path) as doc:
+        return len(doc)
+
+
+def iter_pdf_pages(file_path: str, workers: Optional[int] = None,
+                   pages_per_task: Optional[int] = None) -> Iterator[PdfPage]:
+    """
+    Генератор страниц PDF в порядке документа.
+    Диапазоны страниц разбираются в ProcessPoolExecutor, одновременно в работе не больше 2 * workers диапазонов,
+    поэтому в памяти никогда не лежит весь документ. Для маленьких документов и внутри daemon-процессов
+    (prefork-воркер Celery не может порождать детей) разбор идет в текущем процессе.
+    """
+    workers = workers or PDF_WORKERS
+    pages_per_task = pages_per_task or PDF_PAGES_PER_TASK
+    ranges = _page_ranges(page_count(file_path), pages_per_task)
+    paragraph_offset = 0
+
+    if workers <= 1 or len(ranges) <= 1 or multiprocessing.current_process().daemon:
+        for start, stop in ranges:
+            pages, paragraph_offset = _renumber(_extract_range(file_path, start, stop), paragraph_offset)
+            yield from pages
+        return
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+        pending = deque()
+        ranges_iter = iter(ranges)
+        for start, stop in ranges_iter:
+            pending.append(pool.submit(_extract_range, file_path, start, stop))
+            if len(pending) >= 2 * workers:
+                break
+        while pending:
+            pages, paragraph_offset = _renumber(pending.popleft().result(), paragraph_offset)
+            next_range = next(ranges_iter, None)
+            if next_range:
+                pending.append(pool.submit(_extract_range, file_path, *next_range))
+            yield from pages
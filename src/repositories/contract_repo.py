@@ -1,9 +1,21 @@
-import logging
+from contextlib import contextmanager
 from sqlalchemy.orm import Session
-from sqlalchemy import insert, select, delete
-from typing import Any, Optional, List, Dict
-from datetime import datetime
-from src.data.db.models import Document, Contract, Citation, Requisites, Obligation, Reminder, contract_citation_links
+from sqlalchemy import insert, or_, select, delete, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Row
+from typing import Any, Optional, List, Dict, Iterable, Iterator, Tuple
+from datetime import datetime, timedelta
+from src.data.db.models import (
+    Document, Contract, Citation, CitationStore, Requisites, Obligation, Reminder, contract_citation_links,
+)
+from src.data.db.packed_citations import PackedCitations
+
+# Колонки легких строк для потоковой выдачи и постраничных списков
+DOCUMENT_COLUMNS = (Document.id, Document.filename, Document.upload_date, Document.file_path, Document.content_hash)
+CITATION_COLUMNS = (Citation.id, Citation.text, Citation.page, Citation.paragraph_index, Citation.run_index)
+CONTRACT_COLUMNS = (Contract.id, Contract.document_id, Contract.parsed_amount, Contract.parsed_currency,
+                    Contract.parsed_penalty_present)
+
 
 class ContractRepository:
     """Репозиторий для работы с таблицами БД в проекте ObliGate"""
@@ -11,27 +23,70 @@ class ContractRepository:
     def __init__(self, db: Session):
         """Инициализация с сессией БД из get_db_session"""
         self.db = db
+        self._transaction_depth = 0
+
+    @property
+    def in_transaction(self) -> bool:
+        return self._transaction_depth > 0
+
+    @contextmanager
+    def transaction(self):
+        """
+        Единица работы: методы записи внутри блока не коммитят, а только отправляют изменения (flush),
+        поэтому id и значения по умолчанию доступны сразу, без refresh. Один коммит в конце блока,
+        откат всех изменений при исключении. Вложенные блоки входят во внешнюю транзакцию.
+        """
+        self._transaction_depth += 1
+        try:
+            yield self
+            if self._transaction_depth == 1:
+                self.db.commit()
+        except BaseException:
+            if self._transaction_depth == 1:
+                self.db.rollback()
+            raise
+        finally:
+            self._transaction_depth -= 1
+
+    def _upsert_insert(self, table):
+        """INSERT с поддержкой ON CONFLICT для диалекта текущей сессии (PostgreSQL или SQLite)"""
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "postgresql":
+            return postgresql.insert(table)
+        if dialect == "sqlite":
+            return sqlite.insert(table)
+        raise NotImplementedError(f"Upsert не поддерживается для диалекта {dialect}")
+
+    def _commit(self, *objects, commit: bool = True) -> None:
+        """Вне единицы работы — коммит и перечитывание objects; внутри нее или при commit=False — только flush"""
+        if self.in_transaction or not commit:
+            self.db.flush()
+            return
+        self.db.commit()
+        for obj in objects:
+            self.db.refresh(obj)
 
     # CRUD для Document
-    def create_document(self, filename: str, file_path: str) -> Document:
+    def create_document(self, filename: str, file_path: str, content_hash: Optional[str] = None) -> Document:
         """Создает запись о новом документе"""
-        document = Document(filename=filename, file_path=file_path)
+        document = Document(filename=filename, file_path=file_path, content_hash=content_hash)
         self.db.add(document)
-        self.db.commit()
-        self.db.refresh(document)
+        self._commit(document)
         return document
 
     def get_document(self, document_id: int) -> Optional[Document]:
         """Получает документ по ID"""
         return self.db.query(Document).filter(Document.id == document_id).first()
     
-    def update_document(self, document: Document, file_path: Optional[str] = None) -> Document:
-        """Обновляет документ (например, upload_date и file_path)"""
+    def update_document(self, document: Document, file_path: Optional[str] = None,
+                        content_hash: Optional[str] = None) -> Document:
+        """Обновляет документ (например, upload_date, file_path и content_hash)"""
         document.upload_date = datetime.now()  # type: ignore # Обновляем дату загрузки
         if file_path:
             document.file_path = file_path # type: ignore
-        self.db.commit()
-        self.db.refresh(document)
+        if content_hash:
+            document.content_hash = content_hash # type: ignore
+        self._commit(document)
         return document
     
     def get_document_by_file_path(self, file_path: str) -> Optional[Document]:
@@ -42,16 +97,39 @@ class ContractRepository:
         """Получает документ по имени файла"""
         return self.db.query(Document).filter(Document.filename == filename).first()
 
+    def get_documents_by_content_hash(self, content_hash: str) -> List[Document]:
+        """Получает документы с одинаковым содержимым"""
+        return self.db.query(Document).filter(Document.content_hash == content_hash).all()
+
     def get_all_documents(self) -> List[Document]:
         """Получает все документы"""
         return self.db.query(Document).all()
 
+    def iter_documents(self, batch_size: int = 1000) -> Iterator[Row]:
+        """
+        Потоково отдает документы строками (id, filename, upload_date, file_path, content_hash) в порядке id.
+        Строки читаются курсором на стороне сервера по batch_size, ORM-объекты и identity map не создаются.
+        """
+        stmt = (
+            select(*DOCUMENT_COLUMNS)
+            .order_by(Document.id)
+            .execution_options(yield_per=batch_size)
+        )
+        yield from self.db.execute(stmt)
+
+    def list_documents_page(self, after_id: Optional[int] = None, limit: int = 100) -> List[Row]:
+        """Страница документов после after_id (keyset по id): строки как в iter_documents, не больше limit"""
+        stmt = select(*DOCUMENT_COLUMNS).order_by(Document.id).limit(limit)
+        if after_id is not None:
+            stmt = stmt.where(Document.id > after_id)
+        return list(self.db.execute(stmt))
+
     def delete_document(self, document_id: int) -> bool:
         """Удаляет документ по ID"""
         document = self.get_document(document_id)
         if document:
             self.db.delete(document)
-            self.db.commit()
+            self._commit()
             return True
         return False
 
@@ -69,23 +147,158 @@ class ContractRepository:
             run_index=run_index
         )
         self.db.add(citation)
-        self.db.commit()
-        self.db.refresh(citation)
+        self._commit(citation)
         return citation
 
+    def bulk_create_citations(self, citations: List[Dict[str, Any]], commit: bool = True) -> List[int]:
+        """Создает пачку цитат одним INSERT (executemany) и возвращает их id в порядке входных данных"""
+        if not citations:
+            return []
+        stmt = insert(Citation).returning(Citation.id, sort_by_parameter_order=True)
+        ids = list(self.db.scalars(stmt, citations).all())
+        self._commit(commit=commit)
+        return ids
+
+    def delete_citations_by_document(self, document_id: int, commit: bool = True) -> int:
+        """Удаляет все цитаты документа вместе со ссылками на них, возвращает количество удаленных"""
+        citation_ids = select(Citation.id).where(Citation.document_id == document_id).scalar_subquery()
+        self.db.execute(delete(contract_citation_links).where(contract_citation_links.c.citation_id.in_(citation_ids)))
+        for column in (Requisites.inn_id, Requisites.kpp_id, Requisites.ogrn_id):
+            self.db.execute(update(Requisites).where(column.in_(citation_ids)).values({column: None}))
+        self.db.execute(update(Obligation).where(Obligation.citation_id.in_(citation_ids)).values(citation_id=None))
+        deleted = self.db.execute(delete(Citation).where(Citation.document_id == document_id)).rowcount
+        self._commit(commit=commit)
+        return deleted
+
     def get_citations_by_document(self, document_id: int) -> List[Citation]:
         """Получает все цитаты для документа"""
         return self.db.query(Citation).filter(Citation.document_id == document_id).all()
 
+    def get_citations_by_ids(self, citation_ids: List[int]) -> List[Row]:
+        """Цитаты по id строками (id, text, page, paragraph_index, run_index, bbox)"""
+        if not citation_ids:
+            return []
+        stmt = select(*CITATION_COLUMNS, Citation.bbox).where(Citation.id.in_(set(citation_ids)))
+        return list(self.db.execute(stmt))
+
+    def iter_citation_rows(self, document_id: int, batch_size: int = 1000) -> Iterator[Row]:
+        """
+        Потоково отдает цитаты документа строками (id, text, page, paragraph_index, run_index) в порядке id.
+        Строки читаются курсором на стороне сервера по batch_size, ORM-объекты и identity map не создаются.
+        """
+        stmt = (
+            select(*CITATION_COLUMNS)
+            .where(Citation.document_id == document_id)
+            .order_by(Citation.id)
+            .execution_options(yield_per=batch_size)
+        )
+        yield from self.db.execute(stmt)
+
+    def iter_citation_texts(self, document_id: int, batch_size: int = 1000) -> Iterator[Tuple[int, str]]:
+        """Потоково отдает (id, text) цитат документа в порядке id, подгружая по batch_size строк"""
+        stmt = (
+            select(Citation.id, Citation.text)
+            .where(Citation.document_id == document_id)
+            .order_by(Citation.id)
+            .execution_options(yield_per=batch_size)
+        )
+        for row in self.db.execute(stmt):
+            yield row.id, row.text
+
+    # Компактное хранилище цитат документа
+    def save_citation_store(self, document_id: int, packed: PackedCitations, commit: bool = True) -> None:
+        """Заменяет хранилище цитат документа упакованными цитатами"""
+        self.db.execute(delete(CitationStore).where(CitationStore.document_id == document_id))
+        self.db.execute(insert(CitationStore).values(document_id=document_id, created_at=datetime.now(),
+                                                     **packed.to_buffers()))
+        self._commit(commit=commit)
+
+    def get_citation_store(self, document_id: int) -> Optional[PackedCitations]:
+        """Загружает хранилище цитат документа; массивы — memoryview над байтами из БД без копирования"""
+        stmt = select(CitationStore.count, CitationStore.positions, CitationStore.bboxes,
+                      CitationStore.text_offsets, CitationStore.text).where(CitationStore.document_id == document_id)
+        row = self.db.execute(stmt).first()
+        return PackedCitations.from_buffers(*row) if row else None
+
+    def delete_citation_store(self, document_id: int, commit: bool = True) -> None:
+        """Удаляет хранилище цитат документа"""
+        self.db.execute(delete(CitationStore).where(CitationStore.document_id == document_id))
+        self._commit(commit=commit)
+
+    def materialize_citations(self, document_id: int, packed: PackedCitations, indexes: List[int],
+                              commit: bool = True) -> Dict[int, int]:
+        """
+        Создает строки citations для цитат хранилища с индексами indexes (уже созданные переиспользуются).
+        Возвращает {индекс в хранилище: id цитаты}.
+        """
+        indexes = sorted(set(indexes))
+        if not indexes:
+            return {}
+        stmt = select(Citation.store_index, Citation.id).where(
+            Citation.document_id == document_id, Citation.store_index.in_(indexes))
+        mapping = {row.store_index: row.id for row in self.db.execute(stmt)}
+        missing = [index for index in indexes if index not in mapping]
+        rows = [{"document_id": document_id, "store_index": index, **packed.citation(index)} for index in missing]
+        mapping.update(zip(missing, self.bulk_create_citations(rows, commit=False)))
+        self._commit(commit=commit)
+        return mapping
+
     # CRUD для Contract
     def create_contract(self, document_id: int, citation_data: Optional[Dict] = None, **kwargs) -> Contract:
         """Создает запись о договоре с опциональными полями"""
         contract = Contract(document_id=document_id, citation_data=citation_data, **kwargs)
         self.db.add(contract)
-        self.db.commit()
-        self.db.refresh(contract)
+        self._commit(contract)
         return contract
 
+    def list_contracts_page(self, after_id: Optional[int] = None, limit: int = 100) -> List[Row]:
+        """
+        Страница договоров после after_id (keyset по id): строки
+        (id, document_id, parsed_amount, parsed_currency, parsed_penalty_present), не больше limit
+        """
+        stmt = select(*CONTRACT_COLUMNS).order_by(Contract.id).limit(limit)
+        if after_id is not None:
+            stmt = stmt.where(Contract.id > after_id)
+        return list(self.db.execute(stmt))
+
+    def upsert_contract(self, document_id: int, citation_data: Optional[Dict] = None, **kwargs) -> int:
+        """
+        Создает договор документа или обновляет существующий одним запросом
+        (INSERT ... ON CONFLICT (document_id) DO UPDATE). Возвращает id договора.
+        """
+        values = {"document_id": document_id, "citation_data": citation_data, **kwargs}
+        stmt = self._upsert_insert(Contract).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Contract.document_id],
+            set_={key: stmt.excluded[key] for key in values if key != "document_id"},
+        ).returning(Contract.id)
+        contract_id = self.db.execute(stmt).scalar_one()
+        self._commit()
+        return contract_id
+
+    def get_contract_summary(self, document_id: int) -> Optional[Row]:
+        """Хеш содержимого документа и citation_data его договора одним запросом: (content_hash, citation_data)"""
+        stmt = (
+            select(Document.content_hash, Contract.citation_data)
+            .join(Contract, Contract.document_id == Document.id)
+            .where(Document.id == document_id)
+        )
+        return self.db.execute(stmt).first()
+
+    def get_content_hash(self, document_id: int) -> Optional[str]:
+        """Хеш содержимого документа (None, если документа нет или хеш не посчитан)"""
+        return self.db.execute(select(Document.content_hash).where(Document.id == document_id)).scalar()
+
+    def mark_document_processed(self, document_id: int, content_hash: Optional[str] = None,
+                                commit: bool = True) -> None:
+        """
+        Запоминает хеш содержимого, по которому успешно извлечены поля (processed_hash).
+        content_hash — хеш файла, поставленного в обработку; без него берется текущий content_hash документа
+        """
+        processed_hash = content_hash if content_hash is not None else Document.content_hash
+        self.db.execute(update(Document).where(Document.id == document_id).values(processed_hash=processed_hash))
+        self._commit(commit=commit)
+
     def get_contract_by_document(self, document_id: int) -> Optional[Contract]:
         """Получает договор по ID документа"""
         return self.db.query(Contract).filter(Contract.document_id == document_id).first()
@@ -98,8 +311,7 @@ class ContractRepository:
                 contract.citation_data = citation_data # type: ignore
             for key, value in kwargs.items():
                 setattr(contract, key, value)
-            self.db.commit()
-            self.db.refresh(contract)
+            self._commit(contract)
             return contract
         return None
 
@@ -112,18 +324,54 @@ class ContractRepository:
             field_name=field_name
         )
         self.db.execute(stmt)
-        self.db.commit()
+        self._commit()
 
     def bulk_create_citation_links(self, contract_id: int, links: List[Dict[str, Any]]) -> None:
-        """Создает несколько связей (bulk insert) с обработкой дубликатов"""
-        stmt = insert(contract_citation_links)
-        values = [{'contract_id': contract_id, **link} for link in links]
-        try:
-            self.db.execute(stmt, values)
-            self.db.commit()
-        except Exception as e:
-            logging.error(f"Error in bulk_create_citation_links: {e}")
-            self.db.rollback()
+        """Создает несколько связей (bulk insert); уже существующие пары (contract_id, citation_id) пропускаются"""
+        if not links:
+            return
+        stmt = self._upsert_insert(contract_citation_links).on_conflict_do_nothing(
+            index_elements=[contract_citation_links.c.contract_id, contract_citation_links.c.citation_id])
+        self.db.execute(stmt, [{'contract_id': contract_id, **link} for link in links])
+        self._commit()
+
+    def upsert_citation_links(self, contract_id: int, links: List[Dict[str, Any]]) -> None:
+        """
+        Создает связи или меняет field_name у существующих
+        (INSERT ... ON CONFLICT (contract_id, citation_id) DO UPDATE, только если field_name отличается)
+        """
+        if not links:
+            return
+        stmt = self._upsert_insert(contract_citation_links)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[contract_citation_links.c.contract_id, contract_citation_links.c.citation_id],
+            set_={"field_name": stmt.excluded.field_name},
+            where=contract_citation_links.c.field_name != stmt.excluded.field_name,
+        )
+        self.db.execute(stmt, [{'contract_id': contract_id, **link} for link in links])
+        self._commit()
+
+    def sync_citation_links(self, contract_id: int, links: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Приводит связи договора к links, затрагивая только изменившиеся строки:
+        удаляет лишние, вставляет новые и обновляет field_name у изменившихся.
+        Возвращает {"inserted": n, "updated": n, "deleted": n}.
+        """
+        current = {row['citation_id']: row['field_name'] for row in self.get_citation_links_by_contract(contract_id)}
+        wanted = {link['citation_id']: link['field_name'] for link in links}
+
+        removed = [citation_id for citation_id in current if citation_id not in wanted]
+        changed = [{'citation_id': citation_id, 'field_name': field_name}
+                   for citation_id, field_name in wanted.items() if current.get(citation_id) != field_name]
+        if removed:
+            self.db.execute(delete(contract_citation_links).where(
+                contract_citation_links.c.contract_id == contract_id,
+                contract_citation_links.c.citation_id.in_(removed)))
+        self.upsert_citation_links(contract_id, changed)
+        self._commit()
+
+        inserted = sum(1 for link in changed if link['citation_id'] not in current)
+        return {"inserted": inserted, "updated": len(changed) - inserted, "deleted": len(removed)}
 
     def get_citation_links_by_contract(self, contract_id: int) -> List[Dict[str, Any]]:
         """Получает все связи для договора"""
@@ -146,7 +394,7 @@ class ContractRepository:
         if field_name:
             stmt = stmt.where(contract_citation_links.c.field_name == field_name)
         self.db.execute(stmt)
-        self.db.commit()
+        self._commit()
 
     # CRUD для Requisites
     def create_requisites(self, contract_id: int, inn_id: Optional[int] = None,
@@ -154,8 +402,14 @@ class ContractRepository:
         """Создает запись о реквизитах договора"""
         requisites = Requisites(contract_id=contract_id, inn_id=inn_id, kpp_id=kpp_id, ogrn_id=ogrn_id)
         self.db.add(requisites)
-        self.db.commit()
-        self.db.refresh(requisites)
+        self._commit(requisites)
+        return requisites
+
+    def update_requisites(self, requisites: Requisites, **citation_ids: Optional[int]) -> Requisites:
+        """Обновляет ссылки реквизитов на цитаты (inn_id, kpp_id, ogrn_id)"""
+        for key, value in citation_ids.items():
+            setattr(requisites, key, value)
+        self._commit(requisites)
         return requisites
 
     def get_requisites_by_contract(self, contract_id: int) -> Optional[Requisites]:
@@ -174,8 +428,7 @@ class ContractRepository:
             status=status
         )
         self.db.add(obligation)
-        self.db.commit()
-        self.db.refresh(obligation)
+        self._commit(obligation)
         return obligation
 
     def get_obligations_by_contract(self, contract_id: int) -> List[Obligation]:
@@ -187,8 +440,7 @@ class ContractRepository:
         obligation = self.db.query(Obligation).filter(Obligation.id == obligation_id).first()
         if obligation:
             obligation.status = status # type: ignore
-            self.db.commit()
-            self.db.refresh(obligation)
+            self._commit(obligation)
             return obligation
         return None
 
@@ -197,20 +449,69 @@ class ContractRepository:
         """Создает запись о напоминании"""
         reminder = Reminder(obligation_id=obligation_id, remind_date=remind_date, channel=channel)
         self.db.add(reminder)
-        self.db.commit()
-        self.db.refresh(reminder)
+        self._commit(reminder)
         return reminder
 
     def get_reminders_by_obligation(self, obligation_id: int) -> List[Reminder]:
         """Получает все напоминания по ID обязательства"""
         return self.db.query(Reminder).filter(Reminder.obligation_id == obligation_id).all()
 
+    def claim_due_reminders(self, now: datetime, limit: int = 100, lease_seconds: float = 300,
+                            commit: bool = True) -> List[Row]:
+        """
+        Захватывает до limit наступивших неотправленных напоминаний на lease_seconds и коммитит захват:
+        строки выбираются SELECT ... FOR UPDATE SKIP LOCKED и помечаются claimed_until одной короткой транзакцией,
+        поэтому отправка идет без открытой транзакции, а параллельные диспетчеры берут другие напоминания.
+        Не отмеченные отправленными до истечения захвата (ошибка отправки, падение воркера) снова станут доступны.
+        Строки (id, obligation_id, remind_date, channel, description, due_date, filename).
+        На SQLite блокировок строк нет — параллельные диспетчеры возможны только на PostgreSQL.
+        """
+        unclaimed = or_(Reminder.claimed_until.is_(None), Reminder.claimed_until <= now)
+        due = (
+            select(Reminder.id)
+            .where(Reminder.sent == False, Reminder.remind_date <= now, unclaimed)  # noqa: E712
+            .order_by(Reminder.remind_date)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        # UPDATE повторно проверяет, что строка не захвачена: без блокировок строк (SQLite) параллельный
+        # диспетчер мог выбрать те же id, но захватит их только один
+        candidate_ids = list(self.db.execute(due).scalars())
+        reminder_ids = list(self.db.execute(
+            update(Reminder).where(Reminder.id.in_(candidate_ids), unclaimed)
+            .values(claimed_until=now + timedelta(seconds=lease_seconds))
+            .returning(Reminder.id)
+        ).scalars()) if candidate_ids else []
+        if not reminder_ids:
+            self._commit(commit=commit)
+            return []
+        rows = list(self.db.execute(
+            select(Reminder.id, Reminder.obligation_id, Reminder.remind_date, Reminder.channel,
+                   Obligation.description, Obligation.due_date, Document.filename)
+            .join(Obligation, Obligation.id == Reminder.obligation_id)
+            .join(Contract, Contract.id == Obligation.contract_id)
+            .join(Document, Document.id == Contract.document_id)
+            .where(Reminder.id.in_(reminder_ids))
+            .order_by(Reminder.remind_date)
+        ))
+        self._commit(commit=commit)
+        return rows
+
+    def mark_reminders_sent(self, reminder_ids: List[int], commit: bool = True) -> int:
+        """Помечает напоминания отправленными одним UPDATE и снимает захват, возвращает количество обновленных"""
+        if not reminder_ids:
+            return 0
+        updated = self.db.execute(
+            update(Reminder).where(Reminder.id.in_(reminder_ids)).values(sent=True, claimed_until=None)
+        ).rowcount
+        self._commit(commit=commit)
+        return updated
+
     def mark_reminder_sent(self, reminder_id: int) -> Optional[Reminder]:
         """Помечает напоминание как отправленное"""
         reminder = self.db.query(Reminder).filter(Reminder.id == reminder_id).first()
         if reminder:
             reminder.sent = True # type: ignore
-            self.db.commit()
-            self.db.refresh(reminder)
+            self._commit(reminder)
             return reminder
         return None
\ No newline at end of file
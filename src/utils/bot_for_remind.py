@@ -1,30 +1,240 @@
 import asyncio
+import logging
 import os
-from typing import List
+import threading
+import time
+from typing import Coroutine, Dict, Iterable, List, NamedTuple, Optional, Tuple
 from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.exceptions import TelegramNetworkError, TelegramRetryAfter, TelegramServerError
 from dotenv import load_dotenv
 
 load_dotenv()
 
-bot = Bot(os.getenv("BOT_TOKEN", "Введите токен в переменное окружение"))
+logger = logging.getLogger(__name__)
+
+
+def _parse_chat_ids(value: str) -> List[int]:
+    return [int(x) for x in value.split(',') if x.strip()]
+
+
+# Чаты получателей разбираются один раз при импорте
+CHAT_IDS = _parse_chat_ids(os.getenv('CHAT_IDS', ''))
+# Адрес Bot API; для локальной проверки можно указать фейковый сервер (benchmarks/bench_telegram.py)
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', '')
+# Ограничения Telegram: около 30 сообщений в секунду всего и 1 в секунду в один чат
+TELEGRAM_GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', '25'))
+TELEGRAM_CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', '1'))
+TELEGRAM_MAX_RETRIES = int(os.getenv('TELEGRAM_MAX_RETRIES', '5'))
+TELEGRAM_BACKOFF_SECONDS = float(os.getenv('TELEGRAM_BACKOFF_SECONDS', '1'))
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+# Event loop, бот и отправитель свои у каждого потока: задачи notify выполняются пулом потоков,
+# а loop нельзя запускать из двух потоков сразу и HTTP-сессия бота привязана к loop, в котором создана
+_local = threading.local()
+# Лимиты частоты общие для всех потоков процесса
+_global_limiter: Optional["RateLimiter"] = None
+_chat_limiters: Dict[int, "RateLimiter"] = {}
+_limiters_lock = threading.Lock()
 dp = Dispatcher()
 
-async def send_remind_in_telegram(message):
-    chat_ids = os.getenv('CHAT_IDS', '')
-    
-    if ',' in chat_ids:
-        chat_id_list = [int(x) for x in chat_ids.split(',') if x.strip()]
-    else:
-        chat_id_list = [int(chat_ids)] if chat_ids.strip() else []
+def get_bot() -> Bot:
+    """Бот текущего потока: создается при первом обращении, HTTP-сессия переиспользуется между вызовами"""
+    bot = getattr(_local, "bot", None)
+    if bot is None:
+        session = AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_URL)) if TELEGRAM_API_URL else None
+        bot = _local.bot = Bot(os.getenv("BOT_TOKEN", "Введите токен в переменное окружение"), session=session)
+    return bot
+
+def run_in_bot_loop(coro: Coroutine):
+    """
+    Выполняет корутину в event loop текущего потока из синхронного кода (задачи Celery).
+    Loop живет все время потока, поэтому HTTP-сессия бота потока переиспользуется между вызовами.
+    """
+    loop = getattr(_local, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = _local.loop = asyncio.new_event_loop()
+    return loop.run_until_complete(coro)
+
+
+def _reset_after_fork():
+    # Сессии, loop и лимиты родителя в дочернем процессе не используются
+    global _local, _global_limiter
+    _local = threading.local()
+    _global_limiter = None
+    _chat_limiters.clear()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class RateLimiter:
+    """Не больше rate отправок в секунду, равномерно; pause откладывает следующие отправки (RetryAfter)"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate
+        self._next = 0.0
+        # Лимитер может быть общим для loop нескольких потоков
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+            return wait
+
+    async def acquire(self) -> None:
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self._next = max(self._next, time.monotonic() + seconds)
+
+
+class MessageResult(NamedTuple):
+    """Результат отправки одного сообщения в чат"""
+    chat_id: int
+    reminder_ids: List[int]     # Напоминания, вошедшие в сообщение
+    ok: bool
+    attempts: int
+    error: Optional[str] = None
 
-    if isinstance(chat_id_list, List) != True:
-        raise ValueError('Укажите куда следует отправлять напоминание в телеграм!')
 
-    for id in chat_id_list: # type: ignore
-        await bot.send_message(chat_id=id, text=message)
+class DeliveryReport(NamedTuple):
+    delivered: List[int]          # Напоминания, доставленные во все чаты
+    failed: List[int]             # Не доставленные хотя бы в один чат
+    messages: List[MessageResult]
+
+
+def _coalesce(reminders: List[Tuple[int, str]]) -> List[Tuple[List[int], str]]:
+    """Склеивает напоминания в сообщения не длиннее лимита Telegram: [(id напоминаний, текст), ...]"""
+    messages = []
+    ids: List[int] = []
+    parts: List[str] = []
+    length = 0
+    for reminder_id, text in reminders:
+        text = text[:TELEGRAM_MESSAGE_LIMIT]
+        if parts and length + 2 + len(text) > TELEGRAM_MESSAGE_LIMIT:
+            messages.append((ids, "\n\n".join(parts)))
+            ids, parts, length = [], [], 0
+        length += (2 if parts else 0) + len(text)
+        ids.append(reminder_id)
+        parts.append(text)
+    if parts:
+        messages.append((ids, "\n\n".join(parts)))
+    return messages
+
+
+class ReminderSender:
+    """
+    Отправка напоминаний в Telegram: чаты обслуживаются параллельно в пределах общего лимита
+    и лимита на чат, напоминания одного чата склеиваются в одно сообщение (или несколько, если не влезают),
+    на RetryAfter чат ставится на паузу на указанное время, на сетевые и 5xx ошибки — повтор с backoff.
+    """
+
+    def __init__(self, bot: Bot, global_rate: float = TELEGRAM_GLOBAL_RATE, chat_rate: float = TELEGRAM_CHAT_RATE,
+                 max_retries: int = TELEGRAM_MAX_RETRIES, backoff: float = TELEGRAM_BACKOFF_SECONDS,
+                 global_limiter: Optional[RateLimiter] = None,
+                 chat_limiters: Optional[Dict[int, RateLimiter]] = None):
+        self.bot = bot
+        # Лимитеры можно передать общие для нескольких отправителей (по одному на поток)
+        self.global_limiter = global_limiter or RateLimiter(global_rate)
+        self.chat_rate = chat_rate
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._chat_limiters: Dict[int, RateLimiter] = {} if chat_limiters is None else chat_limiters
+
+    def _chat_limiter(self, chat_id: int) -> RateLimiter:
+        limiter = self._chat_limiters.get(chat_id)
+        if limiter is None:
+            with _limiters_lock:
+                limiter = self._chat_limiters.setdefault(chat_id, RateLimiter(self.chat_rate))
+        return limiter
+
+    async def _send_message(self, chat_id: int, reminder_ids: List[int], text: str) -> MessageResult:
+        chat_limiter = self._chat_limiter(chat_id)
+        attempt = 0
+        while True:
+            attempt += 1
+            await chat_limiter.acquire()
+            await self.global_limiter.acquire()
+            try:
+                await self.bot.send_message(chat_id=chat_id, text=text)
+                return MessageResult(chat_id, reminder_ids, True, attempt)
+            except TelegramRetryAfter as e:
+                # Flood control: Telegram сам говорит, сколько ждать; попытка не считается неудачной сетью
+                delay = e.retry_after
+                chat_limiter.pause(delay)
+                error = f"RetryAfter {delay}"
+            except (TelegramNetworkError, TelegramServerError) as e:
+                delay = self.backoff * 2 ** (attempt - 1)
+                error = f"{type(e).__name__}: {str(e)}"
+            except Exception as e:
+                # Ошибки запроса (чат не найден, бот заблокирован) повтором не исправить
+                return MessageResult(chat_id, reminder_ids, False, attempt, f"{type(e).__name__}: {str(e)}")
+            if attempt > self.max_retries:
+                return MessageResult(chat_id, reminder_ids, False, attempt, error)
+            logger.warning("Чат %s: %s, повтор через %s с", chat_id, error, delay)
+            await asyncio.sleep(delay)
+
+    async def _send_chat(self, chat_id: int, messages: List[Tuple[List[int], str]]) -> List[MessageResult]:
+        # Сообщения одного чата уходят по порядку
+        return [await self._send_message(chat_id, ids, text) for ids, text in messages]
+
+    async def send(self, reminders: Iterable[Tuple[int, str]], chat_ids: Optional[List[int]] = None) -> DeliveryReport:
+        """Отправляет напоминания (id, текст) во все чаты chat_ids (по умолчанию CHAT_IDS)"""
+        reminders = list(reminders)
+        chat_ids = CHAT_IDS if chat_ids is None else chat_ids
+        if not chat_ids:
+            logger.error("Не заданы CHAT_IDS: напоминания некуда отправлять")
+            return DeliveryReport([], [reminder_id for reminder_id, _ in reminders], [])
+
+        messages = _coalesce(reminders)
+        per_chat = await asyncio.gather(*(self._send_chat(chat_id, messages) for chat_id in chat_ids))
+        results = [result for chat_results in per_chat for result in chat_results]
+
+        failed_ids = {reminder_id for result in results if not result.ok for reminder_id in result.reminder_ids}
+        delivered = [reminder_id for reminder_id, _ in reminders if reminder_id not in failed_ids]
+        failed = [reminder_id for reminder_id, _ in reminders if reminder_id in failed_ids]
+        for result in results:
+            if not result.ok:
+                logger.error("Чат %s: напоминания %s не доставлены после %s попыток: %s",
+                             result.chat_id, result.reminder_ids, result.attempts, result.error)
+        return DeliveryReport(delivered, failed, results)
+
+
+def get_sender() -> ReminderSender:
+    """Отправитель текущего потока: бот потока, лимиты частоты общие для всех потоков процесса"""
+    global _global_limiter
+    sender = getattr(_local, "sender", None)
+    if sender is None:
+        with _limiters_lock:
+            if _global_limiter is None:
+                _global_limiter = RateLimiter(TELEGRAM_GLOBAL_RATE)
+        sender = _local.sender = ReminderSender(get_bot(), global_limiter=_global_limiter,
+                                                chat_limiters=_chat_limiters)
+    return sender
+
+
+async def send_reminders(reminders: Iterable[Tuple[int, str]]) -> List[int]:
+    """
+    Отправляет напоминания (id, текст) во все чаты CHAT_IDS.
+    return: id напоминаний, доставленных во все чаты; недоставленные останутся неотправленными
+    """
+    return (await get_sender().send(reminders)).delivered
+
+
+async def send_remind_in_telegram(message):
+    report = await get_sender().send([(0, message)])
+    if report.failed:
+        raise RuntimeError(f'Напоминание не доставлено: {[r.error for r in report.messages if not r.ok]}')
 
 async def main():
-    await dp.start_polling(bot)
+    await dp.start_polling(get_bot())
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
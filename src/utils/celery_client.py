@@ -1,12 +1,187 @@
+import importlib
+import logging
 import os
-from celery import Celery
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Union
+
+from celery import Celery, chain
+from celery.signals import setup_logging as celery_setup_logging, worker_init, worker_process_init
 from dotenv import load_dotenv
 
+from src.utils.logging_config import setup_logging
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 app = Celery(
     "my_async_app",
     broker=f"redis://:{os.getenv('PASS_REDIS')}@{os.getenv('HOST_REDIS')}:{os.getenv('PORT_REDIS')}/0",
     backend=f"redis://:{os.getenv('PASS_REDIS')}@{os.getenv('HOST_REDIS')}:{os.getenv('PORT_REDIS')}/0",
     include=["src.utils.celery_tasks"]
 )
+
+# Очереди: parse — тяжелый разбор/OCR (воркер solo, страницы параллельно разбирают пулы экстракторов),
+# extract — извлечение полей (отдельный воркер), persist и notify — легкие задачи БД и уведомлений (пул с высокой конкурентностью)
+TASK_ROUTES = {
+    "src.utils.celery_tasks.parse_document": {"queue": "parse"},
+    "src.utils.celery_tasks.persist_citations": {"queue": "persist"},
+    "src.utils.celery_tasks.extract_fields": {"queue": "extract"},
+    "src.utils.celery_tasks.file_extract": {"queue": "extract"},
+    "src.utils.celery_tasks.schedule_reminders": {"queue": "notify"},
+    "src.utils.celery_tasks.dispatch_reminders": {"queue": "notify"},
+    "src.utils.celery_tasks.process_document": {"queue": "persist"},
+}
+
+# Приоритет по размеру файла: в Redis 0 — наивысший, маленький договор не ждет 500-страничный скан
+SMALL_DOCUMENT_BYTES = int(os.getenv('SMALL_DOCUMENT_BYTES', str(1024 * 1024)))
+LARGE_DOCUMENT_BYTES = int(os.getenv('LARGE_DOCUMENT_BYTES', str(20 * 1024 * 1024)))
+# Как часто celery beat запускает отправку наступивших напоминаний, секунд
+REMINDER_DISPATCH_INTERVAL = float(os.getenv('REMINDER_DISPATCH_INTERVAL', '60'))
+
+app.conf.update(
+    task_routes=TASK_ROUTES,
+    task_default_queue="persist",
+    # Задача подтверждается после выполнения, воркер не набирает впрок задачи с низким приоритетом
+    task_acks_late=True,
+    worker_prefetch_multiplier=1,
+    # Приоритеты сообщений внутри очереди (document_priority): Redis хранит по подочереди на шаг приоритета.
+    # Очереди между собой не упорядочиваются — parse и extract обслуживают разные воркеры
+    broker_transport_options={
+        "priority_steps": list(range(10)),
+        "sep": ":",
+    },
+    # Напоминания хранятся в БД и отправляются периодическим диспетчером, а не ETA-задачами в брокере
+    beat_schedule={
+        "dispatch-reminders": {
+            "task": "src.utils.celery_tasks.dispatch_reminders",
+            "schedule": REMINDER_DISPATCH_INTERVAL,
+            # Не копим запуски, если воркер notify был недоступен
+            "options": {"expires": REMINDER_DISPATCH_INTERVAL},
+        },
+    },
+)
+
+
+def document_priority(size: int) -> int:
+    """Приоритет обработки документа по размеру файла в байтах"""
+    if size <= SMALL_DOCUMENT_BYTES:
+        return 0
+    if size <= LARGE_DOCUMENT_BYTES:
+        return 5
+    return 9
+
+
+def document_pipeline(document_id: int, file_path: str, size: int = 0, content_hash: Optional[str] = None):
+    """
+    Цепочка обработки документа: parse → persist citations → extract fields → schedule reminders.
+    Задачи собираются по имени, поэтому API может ставить цепочку, не импортируя модуль задач.
+    content_hash — хеш файла: extract_fields отмечает его обработанным после успешного извлечения.
+    """
+    priority = document_priority(size)
+    return chain(
+        app.signature("src.utils.celery_tasks.parse_document", args=(document_id, file_path), priority=priority),
+        app.signature("src.utils.celery_tasks.persist_citations", args=(document_id,), priority=priority),
+        app.signature("src.utils.celery_tasks.extract_fields", kwargs={"content_hash": content_hash}, priority=priority),
+        app.signature("src.utils.celery_tasks.schedule_reminders", args=(document_id,), priority=priority),
+    )
+
+# Какие ресурсы создавать сразу при старте процесса воркера; остальные создаются при первом обращении
+CELERY_WARM_RESOURCES = [
+    name.strip() for name in os.getenv('CELERY_WARM_RESOURCES', 'db,pdf,docx').split(',') if name.strip()
+]
+
+
+class ResourceRegistry:
+    """
+    Ресурсы процесса воркера (движок БД, пулы Redis, бэкенды PDF/DOCX/OCR/NER, бот).
+    Фабрики задаются строкой "модуль:функция" и импортируются только при создании ресурса,
+    поэтому импорт celery_client из API не тянет тяжелые зависимости.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Union[str, Callable[[], Any]]] = {}
+        self._resources: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self.startup_times: Dict[str, float] = {}
+
+    def register(self, name: str, factory: Union[str, Callable[[], Any]]) -> None:
+        self._factories[name] = factory
+
+    def _create(self, name: str) -> Any:
+        factory = self._factories[name]
+        if isinstance(factory, str):
+            module_name, _, attr = factory.partition(":")
+            factory = getattr(importlib.import_module(module_name), attr)
+        started = time.perf_counter()
+        resource = factory()
+        self.startup_times[name] = time.perf_counter() - started
+        logger.info("Ресурс %s создан за %.3f с", name, self.startup_times[name])
+        return resource
+
+    def get(self, name: str) -> Any:
+        """Возвращает ресурс, создавая его при первом обращении в текущем процессе"""
+        resource = self._resources.get(name)
+        if resource is None:
+            with self._lock:
+                resource = self._resources.get(name)
+                if resource is None:
+                    resource = self._resources[name] = self._create(name)
+        return resource
+
+    def warm_up(self, names) -> Dict[str, float]:
+        for name in names:
+            try:
+                self.get(name)
+            except Exception as e:
+                logger.error("Не удалось создать ресурс %s: %s: %s", name, type(e).__name__, e)
+        return dict(self.startup_times)
+
+    def reset(self) -> None:
+        """Забывает ресурсы, унаследованные от родительского процесса (после fork)"""
+        self._resources.clear()
+        self.startup_times.clear()
+
+
+resources = ResourceRegistry()
+resources.register("db", "src.data.db.base:init_worker_engine")
+resources.register("redis", "src.utils.redis_client:get_redis")
+resources.register("pdf", "src.extractors.pdf_extractor:load_backend")
+resources.register("docx", "src.extractors.docx_extractor:load_backend")
+resources.register("ocr", "src.extractors.ocr:load_backend")
+resources.register("ner", "src.docs_checker.ner.inference:get_ner_model")
+# Бот Telegram не регистрируется: у каждого потока свой бот и event loop (bot_for_remind.get_bot)
+
+
+@celery_setup_logging.connect
+def configure_logging(**kwargs):
+    """Логирование воркера и beat настраивается здесь, а не Celery: JSON-записи через очередь с отдельным потоком"""
+    setup_logging("worker")
+
+
+def _task_threads(worker) -> int:
+    """Сколько задач выполняется в одном процессе воркера: --concurrency у пулов потоков, иначе одна"""
+    from celery.concurrency import get_implementation
+
+    module = get_implementation(worker.pool_cls).__module__
+    return worker.concurrency if module.rsplit(".", 1)[-1] in ("thread", "gevent", "eventlet") else 1
+
+
+@worker_init.connect
+def init_worker(sender=None, **kwargs):
+    """Главный процесс воркера: в пулах solo/threads задачи выполняются в нем, для prefork ресурсы наследуются детьми"""
+    if sender is not None:
+        # Пул соединений worker должен вмещать все задачи процесса, иначе потоки ждут соединение pool_timeout
+        from src.data.db.base import set_worker_threads
+        set_worker_threads(_task_threads(sender))
+    startup_times = resources.warm_up(CELERY_WARM_RESOURCES)
+    logger.info("Воркер %s готов, время старта ресурсов: %s", os.getpid(), startup_times)
+
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    """Создает ресурсы один раз на процесс prefork-воркера, а не на каждую задачу"""
+    resources.reset()
+    startup_times = resources.warm_up(CELERY_WARM_RESOURCES)
+    logger.info("Процесс воркера %s готов, время старта ресурсов: %s", os.getpid(), startup_times)
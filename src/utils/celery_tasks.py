@@ -1,176 +1,259 @@
-import asyncio
+import json
 import re
 import os
 import logging
-import pymupdf
-from docx import Document
-from src.utils.celery_client import app
-from src.utils.redis_client import get_redis_session
-from src.data.db.base import get_db_session
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, Optional
+from src.utils.celery_client import app, document_pipeline, resources
+from src.data.db.base import session_scope
+from src.data.db.packed_citations import PackedCitations
 from src.repositories.contract_repo import ContractRepository
+from src.extractors import docx_extractor, ocr, pdf_extractor
 
 from src.docs_checker.check_file import get_and_send_processing
-from src.utils.bot_for_remind import send_remind_in_telegram
+from src.utils.bot_for_remind import run_in_bot_loop, send_reminders
+from src.utils.logging_config import sample_span
 
-# Настройка логирования
-logging.basicConfig(level=logging.INFO, format='%(asctime)s: %(levelname)s/%(processName)s: %(message)s')
 logger = logging.getLogger(__name__)
 
-@app.task
-async def async_set_redis(key: str, value: str, expire: int = 10):
-    async with get_redis_session() as redis:
-        await redis.set(key, value, ex=expire)
-        return await redis.get(key)
-
-# @app.task
-# def remind(message):
-#     loop = asyncio.new_event_loop()
-#     asyncio.set_event_loop(loop)
-#     loop.run_until_complete(send_remind_in_telegram(message))
-#     loop.close()
+# Сколько цитат копим в памяти перед одним INSERT (executemany) в БД
+CITATION_BATCH_SIZE = int(os.getenv('CITATION_BATCH_SIZE', '500'))
+# packed — все цитаты документа одной строкой citation_stores; rows — строка citations на каждую цитату
+CITATION_STORAGE = os.getenv('CITATION_STORAGE', 'packed')
+# За сколько дней до срока обязательства напоминать
+REMIND_BEFORE_DAYS = int(os.getenv('REMIND_BEFORE_DAYS', '3'))
+# Сколько наступивших напоминаний диспетчер захватывает и отправляет за одну транзакцию
+REMINDER_BATCH_SIZE = int(os.getenv('REMINDER_BATCH_SIZE', '100'))
+# На сколько секунд диспетчер захватывает пачку: больше времени отправки пачки с учетом лимитов Telegram
+REMINDER_CLAIM_SECONDS = float(os.getenv('REMINDER_CLAIM_SECONDS', '300'))
+
+_HAS_TEXT = re.compile(r'[a-zA-Zа-яА-ЯЁё0-9]')
+
+
+def _flush_citations(repo: ContractRepository, buffer: list) -> None:
+    """Записывает накопленные цитаты одним запросом без коммита, очищает буфер"""
+    if buffer:
+        repo.bulk_create_citations(buffer, commit=False)
+        buffer.clear()
 
-@app.task
-def file_extract(document: int):
-    result = get_and_send_processing(document)
-    return result
+
+def _add_citation(repo: ContractRepository, buffer: list, **citation) -> None:
+    """Добавляет цитату в буфер и сбрасывает его в БД при достижении CITATION_BATCH_SIZE"""
+    buffer.append(citation)
+    if len(buffer) >= CITATION_BATCH_SIZE:
+        _flush_citations(repo, buffer)
 
 @app.task
-def process_document(document_id: int, file_path: str):
-    db = next(get_db_session())
-    repo = ContractRepository(db)
+def async_set_redis(key: str, value: str, expire: int = 10):
+    # Имя задачи сохранено для совместимости; Celery выполняет ее синхронно через общий пул процесса.
+    # SET и GET уходят в Redis одним pipeline
+    pipe = resources.get("redis").pipeline(transaction=False)
+    pipe.set(key, value, ex=expire)
+    pipe.get(key)
+    return pipe.execute()[1]
+
 
+def _iter_pdf_citations(file_path: str, stats: Dict[str, int]) -> Iterator[dict]:
+    """Цитаты PDF: spans текстового слоя, затем OCR сканированных страниц; счетчики документа — в stats"""
+    stats.update(pages=0, spans=0, skipped=0, ocr_pages=0, text_length=0)
+    paragraph_count = 0
+    scanned_pages = []
+    for page in pdf_extractor.iter_pdf_pages(file_path):
+        stats["pages"] += 1
+        stats["text_length"] += len(page.text)
+        paragraph_count += page.blocks
+        if ocr.is_scanned(page):
+            scanned_pages.append(page.page)
+
+        for span in page.spans:
+            if sample_span(logger):
+                logger.debug("Span: текст=%r, bbox=%s, page=%s", span['text'], span['bbox'], page.page)
+            # Фильтрация: сохраняем, если есть хотя бы одна буква или цифра
+            if _HAS_TEXT.search(span['text']):
+                stats["spans"] += 1
+                yield span
+            else:
+                stats["skipped"] += 1
+
+    # Сканированные страницы: OCR в пуле процессов, слова сохраняются как цитаты с bbox
+    if scanned_pages:
+        try:
+            # Ресурс ocr — проверенный при старте воркера движок (OCR_ENGINE)
+            engine = resources.get("ocr")
+            for page in ocr.iter_ocr_pages(file_path, scanned_pages, paragraph_offset=paragraph_count,
+                                           engine=engine):
+                stats["ocr_pages"] += 1
+                stats["text_length"] += len(page.text)
+                for span in page.spans:
+                    if _HAS_TEXT.search(span['text']):
+                        stats["spans"] += 1
+                        yield span
+                    else:
+                        stats["skipped"] += 1
+        except Exception as e:
+            # Без OCR сохраняем хотя бы текстовый слой остальных страниц
+            logger.error("Ошибка OCR для %s: %s: %s", file_path, type(e).__name__, e)
+
+
+def _iter_docx_citations(file_path: str, stats: Dict[str, int]) -> Iterator[dict]:
+    """Цитаты DOCX: runs параграфов и ячеек таблиц (бэкенд DOCX_BACKEND), только с буквами или цифрами"""
+    if docx_extractor.DOCX_BACKEND == "python-docx":
+        citations = docx_extractor.iter_python_docx_citations(file_path)
+    else:
+        citations = docx_extractor.iter_docx_citations(file_path)
+    stats.update(spans=0, skipped=0, text_length=0)
+    for citation in citations:
+        stats["text_length"] += len(citation["text"]) + 1
+        if sample_span(logger):
+            logger.debug("Run %s в параграфе %s: текст=%r",
+                         citation["run_index"], citation["paragraph_index"], citation["text"])
+        # Фильтрация: сохраняем, если есть хотя бы одна буква или цифра
+        if _HAS_TEXT.search(citation["text"]):
+            stats["spans"] += 1
+            yield citation
+        else:
+            stats["skipped"] += 1
+
+
+_PARSERS = {".pdf": _iter_pdf_citations, ".docx": _iter_docx_citations}
+
+
+@app.task
+def parse_document(document_id: int, file_path: str) -> str:
+    """
+    Шаг 1 (CPU, очередь parse): разбор файла.
+    Цитаты пишутся построчно в JSONL-файл рядом с документом, в брокер уходит только путь к нему.
+    """
     if not os.path.exists(file_path):
-        logger.error(f"Файл {file_path} не найден")
-        return None
+        logger.error("Файл %s не найден", file_path)
+        raise FileNotFoundError(file_path)
 
     file_extension = os.path.splitext(file_path)[1].lower()
-    logger.info(f"Обработка файла с расширением: {file_extension}")
-    full_text = ""
+    parser = _PARSERS.get(file_extension)
+    if parser is None:
+        logger.error("Неподдерживаемое расширение файла: %s", file_extension)
+        raise ValueError(f"Неподдерживаемое расширение файла: {file_extension}")
 
-    if file_extension == ".pdf":
-        try:
-            doc = pymupdf.open(file_path)
-            logger.info(f"Открыт PDF: {file_path}, страниц: {len(doc)}")
-            
-            paragraph_index = 0
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                page_text = page.get_text("text") # type: ignore
-                full_text += page_text
-                logger.info(f"Страница {page_num + 1}: извлечено {len(page_text)} символов")
-                
-                blocks = page.get_text("dict")["blocks"] # type: ignore
-                for block in blocks:
-                    if block["type"] == 0:
-                        run_index = 0
-                        for line in block["lines"]:
-                            for span in line["spans"]:
-                                span_text = span["text"].strip()
-                                if span_text:
-                                    bbox = span["bbox"]
-                                    logger.info(f"Span: текст='{span_text}', bbox={bbox}, page={page_num + 1}")
-                                    
-                                    # Фильтрация: сохраняем, если есть хотя бы одна буква или цифра
-                                    if re.search(r'[a-zA-Zа-яА-ЯЁё0-9]', span_text):
-                                        repo.create_citation(
-                                            document_id=document_id,
-                                            text=span_text,
-                                            page=page_num + 1,
-                                            bbox=bbox,
-                                            paragraph_index=paragraph_index,
-                                            run_index=run_index
-                                        )
-                                    else:
-                                        logger.info(f"Пропущен span: '{span_text}' — нет букв или цифр")
-                                    run_index += 1
-                        paragraph_index += 1
-                
-                if not page_text:
-                    dict_text = page.get_text("dict") # type: ignore
-                    logger.info(f"Страница {page_num + 1} (dict): {dict_text.get('blocks', [])}")
-            
-            doc.close()
-            logger.info(f"Закрыт документ. Извлеченный текст длиной: {len(full_text)} символов")
-            return full_text
+    spool_path = f"{file_path}.{document_id}.citations.jsonl"
+    stats: Dict[str, int] = {}
+    started = time.perf_counter()
+    try:
+        with open(spool_path, "w", encoding="utf-8") as spool:
+            for citation in parser(file_path, stats):
+                spool.write(json.dumps(citation, ensure_ascii=False) + "\n")
+    except Exception as e:
+        logger.error("Ошибка при чтении %s: %s: %s", file_path, type(e).__name__, e)
+        if os.path.exists(spool_path):
+            os.remove(spool_path)
+        raise
+    # Одна итоговая запись на документ вместо записи на каждый span
+    elapsed = time.perf_counter() - started
+    logger.info("Документ %s разобран за %.2f с: цитат %s, пропущено без букв и цифр %s",
+                document_id, elapsed, stats["spans"], stats["skipped"],
+                extra={"document_id": document_id, "stage": "parse", "file_extension": file_extension,
+                       "elapsed": round(elapsed, 3), **stats})
+    return spool_path
 
-        except Exception as e:
-            logger.error(f"Ошибка при чтении PDF {file_path}: {type(e).__name__}: {str(e)}")
-            return None
 
-    elif file_extension == ".docx":
-        try:
-            doc = Document(file_path)
-            full_text = ""
-            paragraph_index = 0
-
-            # Обработка параграфов
-            for para in doc.paragraphs:
-                para_text = para.text.strip()
-                if para_text:
-                    full_text += para_text + "\n"
-                    logging.info(f"Параграф {paragraph_index}: текст='{para_text}'")
-                    
-                    # Обработка runs внутри параграфа для более детальной трассировки
-                    run_index = 0
-                    for run in para.runs:
-                        run_text = run.text.strip()
-                        if run_text:
-                            logging.info(f"Run {run_index} в параграфе {paragraph_index}: текст='{run_text}'")
-                            # Фильтрация: сохраняем, если есть хотя бы одна буква или цифра
-                            if re.search(r'[a-zA-Zа-яА-ЯЁё0-9]', run_text):
-                                repo.create_citation(
-                                    document_id=document_id,
-                                    text=run_text,
-                                    page=0,
-                                    bbox=None,
-                                    paragraph_index=paragraph_index,
-                                    run_index=run_index
-                                )
-                            else:
-                                logger.info(f"Пропущен run: '{run_text}' — нет букв или цифр")
-                            run_index += 1
-                    paragraph_index += 1
-
-            # Обработка таблиц
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        cell_text = cell.text.strip()
-                        if cell_text:
-                            full_text += cell_text + "\n"
-                            logging.info(f"Таблица, ячейка: текст='{cell_text}', paragraph_index={paragraph_index}")
-                            # Сохраняем как параграф, но обрабатываем runs внутри ячейки
-                            run_index = 0
-                            for run in cell.paragraphs[0].runs:  # Предполагаем, что в ячейке один параграф
-                                run_text = run.text.strip()
-                                if run_text:
-                                    logging.info(f"Run {run_index} в ячейке: текст='{run_text}'")
-                                    # Фильтрация: сохраняем, если есть хотя бы одна буква или цифра
-                                    if re.search(r'[a-zA-Zа-яА-ЯЁё0-9]', run_text):
-                                        repo.create_citation(
-                                            document_id=document_id,
-                                            text=run_text,
-                                            page=0,
-                                            bbox=None,
-                                            paragraph_index=paragraph_index,
-                                            run_index=run_index
-                                        )
-                                    else:
-                                        logger.info(f"Пропущен run: '{run_text}' — нет букв или цифр")
-                                    run_index += 1
-                        paragraph_index += 1
-
-            logging.info(f"Извлечен текст из DOCX длиной: {len(full_text)} символов")
-
-            # ставим таску на обработку документа
-            file_extract.delay(document_id) # type: ignore
-
-            return full_text
+@app.task
+def persist_citations(spool_path: str, document_id: int) -> int:
+    """
+    Шаг 2 (БД, очередь persist): заменяет цитаты документа содержимым JSONL одной транзакцией.
+    В режиме packed цитаты упаковываются в одну строку citation_stores, в режиме rows
+    вставляются в citations пачками по CITATION_BATCH_SIZE.
+    """
+    citations = []
+    with session_scope() as db:
+        repo = ContractRepository(db)
+        # Старые цитаты удаляются в той же транзакции, что и вставка новых
+        repo.delete_citations_by_document(document_id, commit=False)
+        with open(spool_path, encoding="utf-8") as spool:
+            if CITATION_STORAGE == "packed":
+                packed = PackedCitations.from_citations(json.loads(line) for line in spool)
+                repo.save_citation_store(document_id, packed, commit=False)
+            else:
+                repo.delete_citation_store(document_id, commit=False)
+                for line in spool:
+                    _add_citation(repo, citations, document_id=document_id, **json.loads(line))
+                _flush_citations(repo, citations)
+        db.commit()
+    os.remove(spool_path)
+    return document_id
 
-        except Exception as e:
-            logging.error(f"Ошибка при чтении DOCX {file_path}: {type(e).__name__}: {str(e)}")
-            return None
 
-    else:
-        logging.error(f"Неподдерживаемое расширение файла: {file_extension}")
-        return None
\ No newline at end of file
+@app.task
+def extract_fields(document_id: int, content_hash: Optional[str] = None) -> dict:
+    """
+    Шаг 3 (очередь extract): извлечение полей договора и связей с цитатами.
+    content_hash — хеш загруженного файла: после успешного извлечения он становится processed_hash документа
+    """
+    return get_and_send_processing(document_id, content_hash)
+
+
+@app.task
+def schedule_reminders(result: dict, document_id: int) -> int:
+    """
+    Шаг 4 (очередь notify): создает напоминания по обязательствам договора со сроком,
+    у которых их еще нет. Возвращает количество созданных напоминаний.
+    """
+    with session_scope() as db:
+        repo = ContractRepository(db)
+        contract = repo.get_contract_by_document(document_id)
+        if not contract:
+            return 0
+
+        created = 0
+        with repo.transaction():
+            for obligation in repo.get_obligations_by_contract(contract.id): # type: ignore
+                if obligation.due_date is None or repo.get_reminders_by_obligation(obligation.id): # type: ignore
+                    continue
+                repo.create_reminder(obligation.id, obligation.due_date - timedelta(days=REMIND_BEFORE_DAYS)) # type: ignore
+                created += 1
+        return created
+
+
+def _reminder_text(reminder) -> str:
+    due = f", срок {reminder.due_date:%d.%m.%Y}" if reminder.due_date else ""
+    return f"Напоминание по договору {reminder.filename}: {reminder.description}{due}"
+
+
+@app.task
+def dispatch_reminders() -> int:
+    """
+    Периодическая задача (celery beat, очередь notify): отправляет наступившие напоминания пачками.
+    Пачка захватывается короткой транзакцией (claim_due_reminders) на REMINDER_CLAIM_SECONDS,
+    отправляется в Telegram без открытой транзакции и помечается отправленной второй короткой транзакцией.
+    Параллельные диспетчеры не берут захваченные напоминания; недоставленные остаются захваченными
+    до истечения срока и берутся повторно следующими запусками.
+    Возвращает количество отправленных напоминаний.
+    """
+    total = 0
+    while True:
+        with session_scope() as db:
+            batch = ContractRepository(db).claim_due_reminders(datetime.now(), REMINDER_BATCH_SIZE,
+                                                               REMINDER_CLAIM_SECONDS)
+        if not batch:
+            break
+        sent_ids = run_in_bot_loop(send_reminders((r.id, _reminder_text(r)) for r in batch))
+        with session_scope() as db:
+            ContractRepository(db).mark_reminders_sent(sent_ids)
+        total += len(sent_ids)
+        logger.info("Напоминания: захвачено %s, отправлено %s", len(batch), len(sent_ids))
+        # Неполная пачка — наступивших напоминаний больше нет
+        if len(batch) < REMINDER_BATCH_SIZE:
+            break
+    return total
+
+
+@app.task
+def file_extract(document: int):
+    # Оставлено для задач, поставленных до перехода на цепочку; новые идут через extract_fields
+    return extract_fields(document)
+
+
+@app.task
+def process_document(document_id: int, file_path: str):
+    """Запускает цепочку parse → persist → extract → reminders для документа"""
+    size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+    return document_pipeline(document_id, file_path, size).apply_async().id
@@ -0,0 +1,147 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from typing import Optional
+
+import redis
+from dotenv import load_dotenv
+
+from src.docs_checker.docs_info import build_docs_info
+from src.repositories.contract_repo import ContractRepository
+from src.utils.redis_client import get_redis
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Версия формата payload: при изменении структуры увеличивается, старые ключи просто перестают читаться
+CACHE_VERSION = 1
+CACHE_PREFIX = f"obligate:docsinfo:v{CACHE_VERSION}"
+# Время жизни записи (с разбросом ±10%, чтобы записи не истекали одновременно) и блокировки пересборки
+CONTRACT_CACHE_TTL = int(os.getenv('CONTRACT_CACHE_TTL', '3600'))
+CONTRACT_CACHE_LOCK_TIMEOUT = float(os.getenv('CONTRACT_CACHE_LOCK_TIMEOUT', '10'))
+# Счетчик поколения живет дольше любой записи (TTL записи не больше 1.1 * CONTRACT_CACHE_TTL) и продлевается
+# при каждой записи и сбросе: истекает только у документов, к которым давно не обращались, когда их записей уже нет
+GENERATION_TTL = 2 * CONTRACT_CACHE_TTL
+_LOCK_POLL_SECONDS = 0.05
+
+_metrics_lock = threading.Lock()
+_cache_metrics = {"hits": 0, "misses": 0, "loads": 0, "lock_waits": 0, "invalidations": 0, "errors": 0}
+
+def _count(name: str) -> None:
+    with _metrics_lock:
+        _cache_metrics[name] += 1
+
+
+def cache_metrics() -> dict:
+    """Счетчики кеша процесса: попадания, промахи, пересборки из БД, ожидания блокировки, ошибки Redis"""
+    with _metrics_lock:
+        return dict(_cache_metrics)
+
+
+def _redis() -> redis.Redis:
+    try:
+        return get_redis()
+    except ValueError as e:  # Redis не настроен в окружении
+        raise redis.ConnectionError(str(e)) from e
+
+
+def payload_key(document_id: int, content_hash: Optional[str]) -> str:
+    return f"{CACHE_PREFIX}:{document_id}:{content_hash or 'none'}"
+
+
+def generation_key(document_id: int) -> str:
+    return f"{CACHE_PREFIX}:{document_id}:gen"
+
+
+def _ttl() -> int:
+    return max(1, int(CONTRACT_CACHE_TTL * random.uniform(0.9, 1.1)))
+
+
+def _decode(raw: Optional[str], generation: Optional[str]) -> Optional[dict]:
+    """Payload из кеша, если он записан в текущем поколении документа"""
+    if raw is None:
+        return None
+    entry = json.loads(raw)
+    return entry["payload"] if entry["generation"] == int(generation or 0) else None
+
+
+def _load_and_store(client: redis.Redis, repo: ContractRepository, document_id: int, key: str,
+                    generation: Optional[str]) -> Optional[dict]:
+    # Поколение прочитано до запроса в БД: если договор перезапишут во время сборки,
+    # invalidate увеличит поколение и эта запись не будет прочитана
+    payload = build_docs_info(repo, document_id)
+    _count("loads")
+    if payload is not None:
+        entry = {"generation": int(generation or 0), "payload": payload}
+        pipe = client.pipeline()
+        pipe.set(key, json.dumps(entry, ensure_ascii=False), ex=_ttl())
+        # Продлевает поколение, если оно есть (EXPIRE отсутствующего ключа ничего не делает)
+        pipe.expire(generation_key(document_id), GENERATION_TTL)
+        pipe.execute()
+    return payload
+
+
+def get_docs_info(repo: ContractRepository, document_id: int) -> Optional[dict]:
+    """
+    Данные договора (поля DocsInfo и цитаты с bbox) через кеш Redis.
+    Ключ — id документа и хеш его содержимого; при промахе payload собирает из БД только один процесс
+    (блокировка SET NX), остальные ждут его результат до CONTRACT_CACHE_LOCK_TIMEOUT.
+    Если Redis недоступен, данные читаются из БД напрямую.
+    """
+    key = payload_key(document_id, repo.get_content_hash(document_id))
+    gen_key = generation_key(document_id)
+    try:
+        client = _redis()
+        raw, generation = client.mget(key, gen_key)
+        payload = _decode(raw, generation)
+        if payload is not None:
+            _count("hits")
+            return payload
+        _count("misses")
+
+        lock_key = f"{key}:lock"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + CONTRACT_CACHE_LOCK_TIMEOUT
+        waited = False
+        while not client.set(lock_key, token, nx=True, px=int(CONTRACT_CACHE_LOCK_TIMEOUT * 1000)):
+            # Payload уже собирает другой процесс — ждем его запись вместо повторного запроса в БД
+            if not waited:
+                _count("lock_waits")
+                waited = True
+            time.sleep(_LOCK_POLL_SECONDS)
+            payload = _decode(*client.mget(key, gen_key))
+            if payload is not None:
+                return payload
+            if time.monotonic() >= deadline:
+                return build_docs_info(repo, document_id)
+        try:
+            if waited:
+                # Пока ждали блокировку, поколение могло смениться
+                generation = client.get(gen_key)
+            return _load_and_store(client, repo, document_id, key, generation)
+        finally:
+            # Снимаем только свою блокировку
+            if client.get(lock_key) == token:
+                client.delete(lock_key)
+    except redis.RedisError as e:
+        _count("errors")
+        logger.warning("Кеш договоров недоступен: %s: %s", type(e).__name__, e)
+        return build_docs_info(repo, document_id)
+
+
+def invalidate(document_id: int) -> None:
+    """Сбрасывает кеш договора документа: увеличивает поколение, записи старых поколений не читаются"""
+    try:
+        pipe = _redis().pipeline()
+        pipe.incr(generation_key(document_id))
+        pipe.expire(generation_key(document_id), GENERATION_TTL)
+        pipe.execute()
+        _count("invalidations")
+    except redis.RedisError as e:
+        _count("errors")
+        logger.warning("Не удалось сбросить кеш документа %s: %s: %s", document_id, type(e).__name__, e)
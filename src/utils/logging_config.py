@@ -0,0 +1,148 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+# json — одна JSON-строка на запись (поля extra отдельными ключами); text — прежний текстовый формат
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+# Файл логов; без него логи идут в stderr процесса
+LOG_FILE = os.getenv('LOG_FILE') or None
+# Доля spans/runs, которые пишутся на уровне DEBUG (0 — ни одного, 1 — все); при LOG_LEVEL выше DEBUG не пишутся
+LOG_SPAN_SAMPLE_RATE = float(os.getenv('LOG_SPAN_SAMPLE_RATE', '0'))
+# Сколько записей ждет записи в очереди; при переполнении новые записи отбрасываются, а не блокируют задачу
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+
+_TEXT_FORMAT = '%(asctime)s: %(levelname)s/%(processName)s: %(message)s'
+# Стандартные атрибуты LogRecord: все остальные пришли через extra и попадают в JSON
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+_lock = threading.Lock()
+_listener: Optional[logging.handlers.QueueListener] = None
+_service: Optional[str] = None
+
+_metrics_lock = threading.Lock()
+_log_metrics = {"dropped": 0}
+
+
+def log_metrics() -> dict:
+    """Счетчики логирования процесса: записи, отброшенные из-за переполненной очереди"""
+    with _metrics_lock:
+        return dict(_log_metrics)
+
+
+class JsonFormatter(logging.Formatter):
+    """Запись лога одной JSON-строкой: время, уровень, логгер, сервис, процесс, сообщение и поля extra"""
+
+    def __init__(self, service: str):
+        super().__init__()
+        self.service = service
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "service": self.service,
+            "process": record.process,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Кладет запись в очередь без форматирования: сообщение собирается из аргументов %
+    и пишется в файл или stderr в потоке QueueListener, а не в потоке задачи.
+    Аргументы записи должны быть неизменяемыми значениями (id, числа, строки).
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with _metrics_lock:
+                _log_metrics["dropped"] += 1
+
+
+def _build_handler(service: str) -> logging.Handler:
+    handler = logging.FileHandler(LOG_FILE, encoding="utf-8") if LOG_FILE else logging.StreamHandler()
+    handler.setFormatter(JsonFormatter(service) if LOG_FORMAT == "json" else logging.Formatter(_TEXT_FORMAT))
+    return handler
+
+
+def _start(service: str) -> None:
+    global _listener
+    records: "queue.Queue[logging.LogRecord]" = queue.Queue(LOG_QUEUE_SIZE)
+    root = logging.getLogger()
+    # Обработчики basicConfig и прежних вызовов заменяются очередью
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_NonBlockingQueueHandler(records))
+    root.setLevel(LOG_LEVEL)
+    _listener = logging.handlers.QueueListener(records, _build_handler(service), respect_handler_level=True)
+    _listener.start()
+
+
+def setup_logging(service: str) -> None:
+    """
+    Настраивает корневой логгер процесса (api, worker, beat): записи уходят в очередь,
+    отдельный поток QueueListener форматирует их и пишет в LOG_FILE или stderr. Повторный вызов ничего не меняет
+    """
+    global _service
+    with _lock:
+        if _listener is not None:
+            return
+        _service = service
+        _start(service)
+
+
+def shutdown_logging() -> None:
+    """Дописывает записи из очереди и останавливает поток записи (при завершении процесса)"""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+def _restart_after_fork():
+    # Потока QueueListener родителя в дочернем процессе нет: своя очередь и свой поток записи
+    global _listener
+    if _listener is not None:
+        _listener = None
+        _start(_service or "app")
+
+
+os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def sample_span(logger: logging.Logger) -> bool:
+    """
+    Писать ли очередной span/run на DEBUG: выборка LOG_SPAN_SAMPLE_RATE при включенном DEBUG.
+    При выключенной выборке — одно сравнение, без форматирования и без обращения к логгеру
+    """
+    return LOG_SPAN_SAMPLE_RATE > 0 and logger.isEnabledFor(logging.DEBUG) and random.random() < LOG_SPAN_SAMPLE_RATE
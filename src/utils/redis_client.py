@@ -1,29 +1,134 @@
+import asyncio
 import os
-from redis.asyncio import Redis
+import threading
+import weakref
 from contextlib import asynccontextmanager
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+import redis
+from redis.asyncio import BlockingConnectionPool as AsyncBlockingConnectionPool, Redis
 from dotenv import load_dotenv
 
 load_dotenv()
 
-@asynccontextmanager
-async def get_redis_session():
+# Ограничение соединений пула на процесс и интервал проверки простаивающих соединений (PING перед использованием)
+REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', '50'))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv('REDIS_HEALTH_CHECK_INTERVAL', '30'))
+# Сколько ждать свободного соединения, когда заняты все REDIS_MAX_CONNECTIONS
+REDIS_POOL_TIMEOUT = float(os.getenv('REDIS_POOL_TIMEOUT', '5'))
+
+_lock = threading.Lock()
+_sync_client: Optional[redis.Redis] = None
+# Асинхронный пул привязан к event loop, в котором созданы его соединения: один клиент на loop
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Redis]" = weakref.WeakKeyDictionary()
+
+
+def _connection_kwargs() -> Dict[str, Any]:
     if not os.getenv("HOST_REDIS") or not os.getenv("PORT_REDIS"):
         raise ValueError('Необходимо в переменных окружения указать HOST_REDIS и PORT_REDIS!')
-    
-    r = Redis(
-    host=os.getenv("HOST_REDIS"), # pyright: ignore[reportArgumentType]
-    port=int(os.getenv("PORT_REDIS")), # pyright: ignore[reportArgumentType]
-    decode_responses=True,
-    username=os.getenv("USER_REDIS"),
-    password=os.getenv("PASS_REDIS"),
-    socket_connect_timeout=5
+
+    return dict(
+        host=os.getenv("HOST_REDIS"),
+        port=int(os.getenv("PORT_REDIS")), # pyright: ignore[reportArgumentType]
+        decode_responses=True,
+        username=os.getenv("USER_REDIS"),
+        password=os.getenv("PASS_REDIS"),
+        socket_connect_timeout=5,
+        health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+        max_connections=REDIS_MAX_CONNECTIONS,
+        timeout=REDIS_POOL_TIMEOUT,
     )
 
-    try:
-        yield r
-    finally:
-        await r.close()
-        await r.connection_pool.disconnect()
+
+def create_redis_pool() -> redis.ConnectionPool:
+    """
+    Новый синхронный пул соединений Redis (для общего клиента процесса используйте get_redis).
+    При занятых REDIS_MAX_CONNECTIONS соединениях ждет свободное до REDIS_POOL_TIMEOUT, а не падает
+    """
+    return redis.BlockingConnectionPool(**_connection_kwargs())
+
+
+def get_redis() -> redis.Redis:
+    """Синхронный клиент Redis процесса: создается при первом обращении, пул общий для всех потоков"""
+    global _sync_client
+    with _lock:
+        if _sync_client is None:
+            _sync_client = redis.Redis(connection_pool=create_redis_pool())
+        return _sync_client
+
+
+def get_async_redis() -> Redis:
+    """Асинхронный клиент Redis текущего event loop: создается при первом обращении и переиспользуется"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = Redis(connection_pool=AsyncBlockingConnectionPool(**_connection_kwargs()))
+        _async_clients[loop] = client
+    return client
+
+
+def close_redis() -> None:
+    """Закрывает синхронный пул процесса (при остановке)"""
+    global _sync_client
+    with _lock:
+        if _sync_client is not None:
+            _sync_client.connection_pool.disconnect()
+            _sync_client = None
+
+
+async def aclose_redis() -> None:
+    """Закрывает асинхронный пул текущего event loop (при остановке приложения)"""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def _reset_after_fork():
+    # Соединения родителя в дочернем процессе не используются: клиенты создадутся заново
+    global _sync_client
+    _sync_client = None
+    _async_clients.clear()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def pipeline_get(keys: Iterable[str], client: Optional[redis.Redis] = None) -> List[Optional[str]]:
+    """GET нескольких ключей одним обращением к Redis (pipeline без MULTI)"""
+    pipe = (client or get_redis()).pipeline(transaction=False)
+    for key in keys:
+        pipe.get(key)
+    return pipe.execute()
+
+
+def pipeline_set(items: Mapping[str, Any], ex: Optional[int] = None, client: Optional[redis.Redis] = None) -> None:
+    """SET нескольких ключей (с общим временем жизни ex) одним обращением к Redis"""
+    pipe = (client or get_redis()).pipeline(transaction=False)
+    for key, value in items.items():
+        pipe.set(key, value, ex=ex)
+    pipe.execute()
+
+
+async def apipeline_get(keys: Iterable[str], client: Optional[Redis] = None) -> List[Optional[str]]:
+    """Асинхронный вариант pipeline_get"""
+    async with (client or get_async_redis()).pipeline(transaction=False) as pipe:
+        for key in keys:
+            pipe.get(key)
+        return await pipe.execute()
+
+
+async def apipeline_set(items: Mapping[str, Any], ex: Optional[int] = None, client: Optional[Redis] = None) -> None:
+    """Асинхронный вариант pipeline_set"""
+    async with (client or get_async_redis()).pipeline(transaction=False) as pipe:
+        for key, value in items.items():
+            pipe.set(key, value, ex=ex)
+        await pipe.execute()
+
+
+@asynccontextmanager
+async def get_redis_session():
+    """Общий асинхронный клиент процесса; соединения возвращаются в пул, а не закрываются при выходе"""
+    yield get_async_redis()
 
 
 # Пример использования
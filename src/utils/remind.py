@@ -5,15 +5,17 @@ BASE_DIR = Path(__file__).resolve().parent.parent.parent
 sys.path.append(str(BASE_DIR))
 
 from datetime import datetime
-# from src.utils.celery_tasks import remind
+from src.data.db.base import session_scope
+from src.repositories.contract_repo import ContractRepository
 
-def set_reminder(message, remind_at: datetime):
-    remind.apply_async( # type: ignore
-        args=[message],
-        eta=remind_at  # Время, когда задача должна выполниться
-    )
+def set_reminder(obligation_id: int, remind_at: datetime, channel: str = "telegram") -> int:
+    """
+    Планирует напоминание по обязательству: запись в reminders, которую в remind_at
+    отправит периодическая задача dispatch_reminders. Возвращает id напоминания.
+    """
+    with session_scope() as db:
+        return ContractRepository(db).create_reminder(obligation_id, remind_at, channel).id # type: ignore
 
 # Пример использования:
-# remind_time = datetime.now(timezone.utc) + timedelta(seconds=10)
-# set_reminder(message="Пора сделать задачу!", time=remind_time, remind_at=remind_time)
-# time.sleep(15)
\ No newline at end of file
+# remind_time = datetime.now() + timedelta(days=1)
+# set_reminder(obligation_id=1, remind_at=remind_time)
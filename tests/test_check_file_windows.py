@@ -0,0 +1,79 @@
+from src.docs_checker.check_file import WindowScanner, build_tracker
+from src.docs_checker.utils_checker.windows import iter_windows
+
+
+def _track(citations, size, overlap):
+    tracker = build_tracker()
+    windows = list(iter_windows(citations, size, overlap))
+    for window in windows:
+        tracker.process(window)
+    return tracker, windows
+
+
+def test_amount_straddling_window_boundary_found_once():
+    citations = [
+        (1, "Договор поставки заключен 12.03.2024 между сторонами"),
+        (2, "Стоимость составляет 1 250"),
+        (3, "000 руб. в том числе НДС и прочие сборы по договору"),
+    ]
+    tracker, windows = _track(citations, size=60, overlap=30)
+
+    # Первое окно обрывается на «1 250»: сумма целиком есть только во втором, через границу окон
+    assert [[citation_id for _, citation_id in window] for window in windows] == [[1, 2], [2, 3]]
+    assert tracker.values["amount"] == {"1 250 000 руб.": [2, 3]}
+    assert tracker.values["currency"] == {"руб.": [3]}
+    assert tracker.values["contract_date"] == {"12.03.2024": [1]}
+
+
+def test_match_inside_overlap_is_not_reported_again():
+    first = [(["Договор заключен 01.02.2024"], 1), (["Оплата до 15.03.2024"], 2)]
+    second = [(["Оплата до 15.03.2024"], 2), (["Прочие условия договора"], 3)]
+    scanner = WindowScanner()
+
+    assert scanner.dates(first, scanner.scan(first, ["contract_date"])) == {"contract_date": {"01.02.2024": [1]}}
+    # Дату из цитаты 2 предыдущее окно уже разобрало
+    assert scanner.scan(second, ["contract_date"]).candidates == {"contract_date": []}
+
+
+def test_party_role_after_window_boundary_is_found():
+    first = [(["Договор поставки"], 1), (["ООО «Ромашка»,"], 2)]
+    second = [(["ООО «Ромашка»,"], 2), (["именуемое в дальнейшем Исполнитель"], 3)]
+    scanner = WindowScanner()
+    fields = ["party_1_name", "party_2_name"]
+
+    assert scanner.parties(first, scanner.scan(first, fields))["party_1_name"] is None
+    # Название лежит в перекрытии, но роль видна только во втором окне
+    assert scanner.parties(second, scanner.scan(second, fields))["party_1_name"] == {"ООО «Ромашка»": [2]}
+
+
+def test_resolved_groups_are_not_scanned_again():
+    citations = [
+        (1, "Договор от 12.03.2024 на сумму 5 000 руб."),
+        (2, "ИНН 7701234567 КПП 770101001"),
+        (3, "Прочие условия договора без реквизитов и дат"),
+        (4, "Подписи сторон и печати организаций договора"),
+    ]
+    tracker, windows = _track(citations, size=40, overlap=30)
+    stats = tracker.stats()
+
+    assert [[citation_id for _, citation_id in window] for window in windows] == [[1], [2, 3], [4]]
+    assert tracker.values["requisites.inn"] == {"7701234567": [2]}
+    assert tracker.values["requisites.kpp"] == {"770101001": [2]}
+    # Дата и сумма найдены в первом окне: их экстракторы дальше не вызываются, стороны ищутся во всех окнах
+    assert stats["dates"]["calls"] == stats["amounts"]["calls"] == 1
+    assert stats["parties"]["calls"] == stats["scan"]["calls"] == 3
+
+
+def test_citation_longer_than_size_is_not_carried_over():
+    citations = [
+        (1, "Договор поставки"),
+        (2, "Условия поставки товара " * 5),
+        (3, "Оплата до 15.03.2024"),
+        (4, "Прочие условия договора"),
+    ]
+    windows = list(iter_windows(citations, size=60, overlap=20))
+
+    assert len(citations[1][1]) > 60
+    # Длинная цитата попадает в одно окно и не тянется хвостом в следующие
+    assert [[citation_id for _, citation_id in window] for window in windows] == [[1, 2], [3, 4]]
+    assert all(sum(len(text[0]) + 1 for text, _ in window[:-1]) < 60 for window in windows)
@@ -0,0 +1,38 @@
+from src.docs_checker import check_file
+from src.docs_checker.ner.inference import entities_to_matches
+from src.docs_checker.ner.labels import decode_entities, window_words
+
+
+class _TaggingModel:
+    """Модель-заглушка: метки слов задаются словарем, остальные слова — "O" """
+
+    def __init__(self, tags):
+        self.tags = tags
+
+    def predict_windows(self, windows):
+        result = []
+        for window in windows:
+            words, ids = window_words(window)
+            result.append(decode_entities(words, ids, [self.tags.get(word, "O") for word in words]))
+        return result
+
+
+def test_entities_to_matches_uses_find_party_shape():
+    window = [(["Исполнитель: ООО"], 1), (["Ромашка обязуется"], 2)]
+    words, ids = window_words(window)
+    labels = ["O", "B-ORG", "I-ORG", "O"]
+
+    assert entities_to_matches(decode_entities(words, ids, labels)) == {"ORG": [{"ООО Ромашка": [1, 2]}]}
+
+
+def test_ner_extractor_fills_tracker_fields(monkeypatch):
+    model = _TaggingModel({"01.02.2024": "B-DATE_START", "31.12.2024": "B-DATE_END"})
+    monkeypatch.setattr(check_file, "get_ner_model", lambda: model)
+    tracker = check_file.build_tracker(ner=True)
+
+    tracker.process([(["Договор от 15.01.2024"], 1), (["действует с 01.02.2024 по 31.12.2024"], 2)])
+
+    assert tracker.values["contract_start"] == {"01.02.2024": [2]}
+    assert tracker.values["contract_end"] == {"31.12.2024": [2]}
+    assert tracker.values["contract_date"] == {"15.01.2024": [1]}
+    assert tracker.stats()["ner"]["calls"] == 1
@@ -0,0 +1,46 @@
+import os
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, text
+
+from src.data.db.query_plans import HOT_CALLS, capture_hot_queries, check_query_plans
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _migrated_sqlite(tmp_path) -> str:
+    url = f"sqlite:///{tmp_path / 'plans.db'}"
+    config = Config(os.path.join(ROOT, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(ROOT, "migrations"))
+    config.set_main_option("sqlalchemy.url", url)
+    command.upgrade(config, "head")
+    return url
+
+
+def test_hot_repository_queries_use_indexes(tmp_path):
+    assert check_query_plans(_migrated_sqlite(tmp_path)) == {}
+
+
+def test_every_hot_call_runs_queries_and_leaves_no_rows(tmp_path):
+    engine = create_engine(_migrated_sqlite(tmp_path))
+    try:
+        with engine.connect() as connection:
+            captured = capture_hot_queries(connection)
+            assert set(captured) == set(HOT_CALLS)
+            assert all(captured.values())
+            # Захват напоминаний: выбор кандидатов, UPDATE захвата и выборка строк для отправки
+            assert len(captured["claim_due_reminders"]) == 3
+            assert connection.execute(text("SELECT count(*) FROM documents")).scalar() == 0
+    finally:
+        engine.dispose()
+
+
+def test_missing_index_is_reported(tmp_path):
+    url = _migrated_sqlite(tmp_path)
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        connection.execute(text("DROP INDEX ix_reminders_due"))
+    engine.dispose()
+
+    assert "claim_due_reminders" in check_query_plans(url)